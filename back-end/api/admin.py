@@ -1,11 +1,14 @@
-import json
+import os
+import time
 from typing import Dict, Any
+from api.encoding import dumps
 from database.models import UserCreate, AuthResult
-from database.queries import is_admin, get_all_users, delete_user, create_user, get_all_global_vocab, delete_global_vocab, update_global_vocab_translation
+from database.connection import PoolTimeout
+from api.search import encode_cursor, decode_cursor, parse_limit
+from database.queries import is_admin, get_users_page, iter_users, delete_user, create_user, get_global_vocab_page, iter_global_vocab, delete_global_vocab, update_global_vocab_translation, get_last_audio_index_run, get_orphaned_audio, get_missing_audio
 
-def handle_admin_login(data: bytes) -> Dict[str, Any]:
+def handle_admin_login(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         username = json_data.get('username', '')
         password = json_data.get('password', '')
         
@@ -13,21 +16,32 @@ def handle_admin_login(data: bytes) -> Dict[str, Any]:
             return {'success': True, 'admin': True}
         else:
             return {'success': False, 'error': 'invalid_credentials'}
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_admin_list_users() -> Dict[str, Any]:
+# Listings are keyset-paged; clients pass back next_cursor until it is null
+ADMIN_PAGE_DEFAULT = 500
+ADMIN_PAGE_MAX = 5000
+
+def handle_admin_list_users(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        users = get_all_users()
-        return {'success': True, 'users': users}
+        after = decode_cursor(json_data.get('cursor'), size=1)
+        users, last_id = get_users_page(
+            parse_limit(json_data.get('limit'), ADMIN_PAGE_DEFAULT, ADMIN_PAGE_MAX),
+            after[0] if after else None
+        )
+        return {'success': True, 'users': users, 'next_cursor': encode_cursor((last_id,) if last_id is not None else None)}
+    except (ValueError, TypeError):
+        return {'success': False, 'error': 'invalid_params'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_admin_delete_user(data: bytes) -> Dict[str, Any]:
+def handle_admin_delete_user(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         user_id = json_data.get('user_id')
         
         if user_id is None:
@@ -38,14 +52,13 @@ def handle_admin_delete_user(data: bytes) -> Dict[str, Any]:
             return {'success': True}
         else:
             return {'success': False, 'error': 'user_not_found'}
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_admin_add_user(data: bytes) -> Dict[str, Any]:
+def handle_admin_add_user(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         user_data = UserCreate(
             username=json_data.get('username', ''),
             email=json_data.get('email', ''),
@@ -71,21 +84,66 @@ def handle_admin_add_user(data: bytes) -> Dict[str, Any]:
             }
         else:
             return {'success': False, 'error': result.error}
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_admin_list_vocab() -> Dict[str, Any]:
+def handle_admin_list_vocab(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        vocab = get_all_global_vocab()
-        return {'success': True, 'vocab': vocab}
+        vocab, after = get_global_vocab_page(
+            parse_limit(json_data.get('limit'), ADMIN_PAGE_DEFAULT, ADMIN_PAGE_MAX),
+            decode_cursor(json_data.get('cursor'), size=2)
+        )
+        return {'success': True, 'vocab': vocab, 'next_cursor': encode_cursor(after)}
+    except (ValueError, TypeError):
+        return {'success': False, 'error': 'invalid_params'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_admin_delete_vocab(data: bytes) -> Dict[str, Any]:
+# An export holds a request thread and a pooled connection while it streams, so one request
+# sends at most this many rows or runs this long. A cut-short export ends with a
+# {"next_cursor": ...} line; posting that cursor back continues where it stopped.
+EXPORT_MAX_ROWS = int(os.getenv('ADMIN_EXPORT_MAX_ROWS', '50000'))
+EXPORT_MAX_SECONDS = float(os.getenv('ADMIN_EXPORT_MAX_SECONDS', '10'))
+
+# kind: (row iterator, cursor size, cursor key of a row)
+ADMIN_EXPORTS = {
+    'users': (iter_users, 1, lambda row: (row['id'],)),
+    'vocab': (iter_global_vocab, 2, lambda row: (row['base'], row['pos'])),
+}
+
+def admin_export_lines(kind: str, cursor: str = None):
+    # NDJSON export ({"format": "ndjson"}): one encoded object per line, produced as rows
+    # arrive from the server-side cursor. Raises ValueError for a malformed cursor.
+    rows, size, key = ADMIN_EXPORTS[kind]
+    return _export_lines(rows(decode_cursor(cursor, size=size)), key)
+
+def _export_lines(rows, key):
+    deadline = time.monotonic() + EXPORT_MAX_SECONDS
+    sent = 0
+    last = None
+    try:
+        for row in rows:
+            # The first row always goes out, so a slow first fetch still moves the cursor on
+            # and `last` is set by the time an export is cut short
+            if sent and (sent >= EXPORT_MAX_ROWS or time.monotonic() > deadline):
+                yield dumps({'next_cursor': encode_cursor(key(last))}) + b'\n'
+                return
+            yield dumps(row) + b'\n'
+            last = row
+            sent += 1
+    finally:
+        rows.close()
+
+def handle_admin_search_vocab(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    from api.search import handle_global_vocab_search
+    return handle_global_vocab_search(json_data)
+
+def handle_admin_delete_vocab(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         base = json_data.get('base')
         pos = json_data.get('pos')
         
@@ -97,14 +155,13 @@ def handle_admin_delete_vocab(data: bytes) -> Dict[str, Any]:
             return {'success': True}
         else:
             return {'success': False, 'error': 'vocab_not_found'}
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_admin_update_translation(data: bytes) -> Dict[str, Any]:
+def handle_admin_update_translation(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         base = json_data.get('base')
         pos = json_data.get('pos')
         translation = json_data.get('translation', '')
@@ -118,9 +175,72 @@ def handle_admin_update_translation(data: bytes) -> Dict[str, Any]:
             return {'success': True}
         else:
             return {'success': False, 'error': 'vocab_not_found'}
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
+def handle_admin_audio_status(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        limit = min(max(int(json_data.get('limit', 100)), 1), 1000)
+        
+        from storage.audio_index import verify_in_background, verify_running
+        started = False
+        if json_data.get('verify'):
+            started = verify_in_background(full=bool(json_data.get('full')))
+        
+        last_run = get_last_audio_index_run()
+        if last_run:
+            last_run['started_at'] = last_run['started_at'].isoformat() if last_run['started_at'] else ''
+            last_run['finished_at'] = last_run['finished_at'].isoformat() if last_run['finished_at'] else ''
+        return {
+            'success': True,
+            'last_run': last_run,
+            'verify_started': started,
+            'verify_running': verify_running(),
+            'missing': get_missing_audio(limit),
+            'orphaned': get_orphaned_audio(limit)
+        }
+    except ValueError:
+        return {'success': False, 'error': 'invalid_params'}
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
 
+def handle_admin_profile(query: Dict[str, list]) -> Dict[str, Any]:
+    from observability import profiler
+    
+    def param(name, default=None):
+        values = query.get(name)
+        return values[0] if values else default
+    
+    try:
+        profile_id = param('id')
+        if profile_id:
+            session = profiler.get(profile_id)
+            if not session:
+                return {'success': False, 'error': 'profile_not_found'}
+            out = {'success': True, **session.summary()}
+            if session.done:
+                fmt = param('format', 'collapsed')
+                out['format'] = fmt
+                out['profile'] = session.speedscope() if fmt == 'speedscope' else session.collapsed()
+            return out
+        
+        threads = param('threads')
+        session = profiler.start(
+            float(param('seconds', '10')),
+            float(param('interval_ms', '5')) / 1000,
+            route=param('route'),
+            threads=threads.split(',') if threads else None
+        )
+        if not session:
+            return {'success': False, 'error': 'profile_in_progress'}
+        return {'success': True, **session.summary()}
+    except ValueError:
+        return {'success': False, 'error': 'invalid_params'}
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
@@ -1,11 +1,10 @@
-import json
 from typing import Dict, Any
 from database.models import UserCreate, UserLogin, AuthResult
+from database.connection import PoolTimeout
 from database.queries import create_user, authenticate_user
 
-def handle_register(data: bytes) -> Dict[str, Any]:
+def handle_register(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         user_data = UserCreate(
             username=json_data.get('username', ''),
             email=json_data.get('email', ''),
@@ -30,17 +29,18 @@ def handle_register(data: bytes) -> Dict[str, Any]:
                 },
                 'token': result.token
             }
+        elif result.retry_after is not None:
+            return {'success': False, 'error': result.error, 'retry_after': round(result.retry_after, 1)}
         else:
             return {'success': False, 'error': result.error}
             
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def handle_login(data: bytes) -> Dict[str, Any]:
+def handle_login(json_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        json_data = json.loads(data.decode('utf-8'))
         login_data = UserLogin(
             username=json_data.get('username', ''),
             password=json_data.get('password', '')
@@ -62,10 +62,12 @@ def handle_login(data: bytes) -> Dict[str, Any]:
                 },
                 'token': result.token
             }
+        elif result.retry_after is not None:
+            return {'success': False, 'error': result.error, 'retry_after': round(result.retry_after, 1)}
         else:
             return {'success': False, 'error': result.error}
             
-    except json.JSONDecodeError:
-        return {'success': False, 'error': 'invalid_json'}
+    except PoolTimeout:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
@@ -0,0 +1,112 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENABLED = os.getenv('HTTP_COMPRESSION', '1') != '0'
+# Bodies smaller than this go out as-is: headers and framing would eat most of the saving
+MIN_BYTES = int(os.getenv('HTTP_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('HTTP_GZIP_LEVEL', '6'))
+# Brotli 4-5 compresses better than gzip -6 at a similar cost. Static files are compressed once
+# and cached, so they get a higher quality (11 is too slow for the multi-megabyte data CSVs).
+BROTLI_QUALITY = int(os.getenv('HTTP_BROTLI_QUALITY', '5'))
+BROTLI_STATIC_QUALITY = int(os.getenv('HTTP_BROTLI_STATIC_QUALITY', '9'))
+STATIC_CACHE_ENTRIES = int(os.getenv('HTTP_COMPRESS_CACHE_ENTRIES', '256'))
+STATIC_CACHE_BYTES = int(os.getenv('HTTP_COMPRESS_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+# Preferred first when a client accepts both with the same q-value
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Audio, images and archives are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml')
+
+def compressible(content_type: str) -> bool:
+    return ENABLED and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    # Accept-Encoding: "gzip, deflate, br;q=0.9" -> the best supported coding, or None for identity
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_STATIC_QUALITY if static else BROTLI_QUALITY)
+    c = gzip_compressor(9 if static else GZIP_LEVEL)
+    return c.compress(body) + c.flush()
+
+def gzip_compressor(level: int = GZIP_LEVEL):
+    # wbits 31: deflate with a gzip header and trailer
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+class StreamCompressor:
+    # Incremental compression for bodies written in chunks. Each chunk is flushed so the client
+    # can start parsing before the body ends, at a small cost in ratio.
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._c = gzip_compressor()
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._c.finish()
+        return self._c.flush()
+
+class StaticCache:
+    # Compressed static files keyed by (path, mtime, size, encoding); an edited file gets a new
+    # key and its old entries age out of the LRU.
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, body: bytes, encoding: str):
+        # Returns (compressed, hit)
+        key = (*key, encoding)
+        with self._lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                return data, True
+        data = compress(body, encoding, static=True)
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = data
+                self.bytes += len(data)
+            while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, old = self.entries.popitem(last=False)
+                self.bytes -= len(old)
+        return data, False
+
+static_cache = StaticCache(STATIC_CACHE_ENTRIES, STATIC_CACHE_BYTES)
@@ -0,0 +1,52 @@
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson when installed; JSON_ENCODER=json forces the stdlib path (to compare output or rule
+# the fast encoder out). Either way the result is UTF-8 bytes and datetimes become ISO 8601
+# strings, so query code can hand rows over without formatting them first.
+BACKEND = 'orjson' if orjson is not None and os.getenv('JSON_ENCODER', 'orjson') != 'json' else 'json'
+# Arrays at least this long are sent as a stream of encoded batches instead of one buffer
+STREAM_MIN_ITEMS = int(os.getenv('JSON_STREAM_MIN_ITEMS', '5000'))
+STREAM_BATCH = 1000
+
+def _default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'item'):
+        # numpy scalars from pandas frames
+        return obj.item()
+    raise TypeError(f'{type(obj).__name__} is not JSON serializable')
+
+if BACKEND == 'orjson':
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode('utf-8')
+
+def iter_with_array(obj: dict, key: str, batch: int = STREAM_BATCH):
+    # The encoding of obj, with the list under `key` written batch by batch, so the encoded
+    # document is never held in one buffer. The list itself is already in memory; this saves
+    # the encoded copy, not the rows.
+    rest = dumps({k: v for k, v in obj.items() if k != key})
+    yield rest[:-1] + (b',' if len(rest) > 2 else b'') + dumps(key) + b':['
+    items = obj[key]
+    for i in range(0, len(items), batch):
+        chunk = dumps(items[i:i + batch])[1:-1]
+        yield (b',' if i else b'') + chunk
+    yield b']}'
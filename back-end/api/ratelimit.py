@@ -0,0 +1,128 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from observability.metrics import counter
+from .router import Request, Response, json_response
+
+try:
+    from database.queries import charge_quota, get_quota_usage
+except Exception:
+    charge_quota = None
+    get_quota_usage = None
+
+# Costs are in units per request, set per route in server.py. Each client (a user id, or the
+# address of an anonymous caller) has a token bucket refilled at RATE units per second up to
+# BURST. Signed-in users also have DAILY_QUOTA units per UTC day in Postgres (api_usage), which
+# holds across workers and restarts; buckets are per process.
+ENABLED = os.getenv('RATE_LIMIT', '1') != '0'
+USER_RATE = float(os.getenv('RATE_LIMIT_USER_RATE', '1'))
+USER_BURST = float(os.getenv('RATE_LIMIT_USER_BURST', '30'))
+# An address can be a whole classroom or office behind one NAT, so the anonymous bucket is sized
+# for several people sharing it rather than for one
+ANON_RATE = float(os.getenv('RATE_LIMIT_ANON_RATE', '1'))
+ANON_BURST = float(os.getenv('RATE_LIMIT_ANON_BURST', '60'))
+DAILY_QUOTA = int(os.getenv('DAILY_QUOTA_UNITS', '2000'))
+MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000'))
+# Sign-in and registration attempts, per client address and per username. Each one takes a
+# slot in the process-wide bcrypt pool (database/passwords.py) that every other user's sign-in
+# draws on, so one client must not be able to fill its queue.
+PASSWORD_IP_RATE = float(os.getenv('RATE_LIMIT_PASSWORD_IP_RATE', '0.5'))
+PASSWORD_IP_BURST = float(os.getenv('RATE_LIMIT_PASSWORD_IP_BURST', '20'))
+PASSWORD_USER_RATE = float(os.getenv('RATE_LIMIT_PASSWORD_USER_RATE', '0.1'))
+PASSWORD_USER_BURST = float(os.getenv('RATE_LIMIT_PASSWORD_USER_BURST', '5'))
+# Behind a reverse proxy every caller has the proxy's address; only then trust X-Forwarded-For
+TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', '0') == '1'
+
+RATE_LIMITED = counter('rate_limited_total', 'Requests refused with 429 by route and reason', ('route', 'reason'))
+COST_CHARGED = counter('rate_limit_units_total', 'Cost units admitted by route', ('route',))
+
+class TokenBuckets:
+    # One bucket per key; idle buckets are full again after burst / rate seconds, so the least
+    # recently used ones can be dropped once MAX_CLIENTS is reached without being unfair
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost: float) -> float:
+        # 0 when admitted, otherwise seconds until `cost` tokens will be available
+        # A request costing more than the burst would never fit; it takes a full bucket instead
+        cost = min(cost, self.burst)
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                tokens, wait = tokens - cost, 0.0
+            else:
+                wait = (cost - tokens) / self.rate if self.rate > 0 else 3600.0
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return wait
+
+users = TokenBuckets(USER_RATE, USER_BURST, MAX_CLIENTS)
+anonymous = TokenBuckets(ANON_RATE, ANON_BURST, MAX_CLIENTS)
+password_ips = TokenBuckets(PASSWORD_IP_RATE, PASSWORD_IP_BURST, MAX_CLIENTS)
+password_users = TokenBuckets(PASSWORD_USER_RATE, PASSWORD_USER_BURST, MAX_CLIENTS)
+
+def client_address(req: Request) -> str:
+    if TRUST_FORWARDED:
+        forwarded = req.headers.get('X-Forwarded-For')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return req.handler.client_address[0]
+
+def seconds_until_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    return (datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc) - now).total_seconds()
+
+def too_many(route: str, reason: str, retry_after: float, extra: dict = None) -> Response:
+    RATE_LIMITED.inc((route, reason))
+    seconds = max(1, math.ceil(retry_after))
+    body = {'success': False, 'error': reason, 'retry_after': seconds, **(extra or {})}
+    return json_response(body, 429, {'Retry-After': str(seconds)})
+
+def limit(req: Request, route: str, cost: int) -> Optional[Response]:
+    # Router hook for routes declared with cost=...; None lets the request through
+    if not ENABLED or cost <= 0:
+        return None
+    if req.user:
+        wait = users.take(('user', req.user['id']), cost)
+    else:
+        wait = anonymous.take(('ip', client_address(req)), cost)
+    if wait:
+        return too_many(route, 'rate_limited', wait)
+    if req.user and DAILY_QUOTA > 0 and charge_quota:
+        used = charge_quota(req.user['id'], cost, DAILY_QUOTA)
+        if used == -1:
+            return too_many(route, 'quota_exceeded', seconds_until_utc_midnight(), {'daily_quota': DAILY_QUOTA})
+    COST_CHARGED.inc((route,), cost)
+    return None
+
+def password_attempt(req: Request, route: str, username: str = None) -> Optional[Response]:
+    # Called by /login and /register before any password work; None lets the attempt through
+    if not ENABLED:
+        return None
+    wait = password_ips.take(('ip', client_address(req)), 1)
+    if not wait and isinstance(username, str) and username:
+        wait = password_users.take(('user', username.lower()), 1)
+    if wait:
+        return too_many(route, 'password_rate_limited', wait)
+    return None
+
+def quota_status(user_id: int) -> dict:
+    used = get_quota_usage(user_id) if get_quota_usage else 0
+    return {
+        'daily_quota': DAILY_QUOTA,
+        'used': used,
+        'remaining': max(DAILY_QUOTA - used, 0) if DAILY_QUOTA > 0 else None,
+        'resets_in_seconds': int(seconds_until_utc_midnight()),
+    }
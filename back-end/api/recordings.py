@@ -0,0 +1,126 @@
+import base64
+import hashlib
+import json
+import os
+import urllib.parse
+from typing import Dict, Any, Tuple
+from database.connection import PoolTimeout
+from database.queries import save_recording
+from storage.audio_index import index_file
+from storage.recordings import new_recording_path
+
+RECORDING_MAX_BYTES = int(os.getenv('RECORDING_MAX_BYTES', str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+AUDIO_CONTENT_TYPES = {
+    'audio/webm': '.webm',
+    'video/webm': '.webm',
+    'audio/ogg': '.ogg',
+    'audio/wav': '.wav',
+    'audio/mpeg': '.mp3',
+    'application/octet-stream': '.webm',
+}
+
+def is_streaming_upload(content_type: str) -> bool:
+    return content_type.split(';', 1)[0].strip().lower() in AUDIO_CONTENT_TYPES
+
+def fsync_dir(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def store_recording(user: Dict[str, Any], role: str, transcript, language, extension: str, chunks) -> Dict[str, Any]:
+    # Chunks go to a hidden .part file that is fsynced and renamed into place, so a crash
+    # mid-upload never leaves a truncated recording and the DB row only points at durable data.
+    relative_path, audio_path = new_recording_path(user['id'], extension)
+    shard_dir, audio_filename = os.path.split(audio_path)
+    tmp_path = os.path.join(shard_dir, f".{audio_filename}.part")
+
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > RECORDING_MAX_BYTES:
+                    raise ValueError('too_large')
+                h.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        if size == 0:
+            raise ValueError('no_audio')
+        os.replace(tmp_path, audio_path)
+        fsync_dir(shard_dir)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    success = save_recording(user['id'], role, relative_path, transcript, language, size)
+    if not success:
+        os.remove(audio_path)
+        return {'success': False, 'error': 'db_error'}
+    index_file(relative_path, 'recording', content_hash=h.hexdigest())
+    return {'success': True, 'size': size, 'sha256': h.hexdigest()}
+
+def read_chunks(rfile, length: int):
+    remaining = length
+    while remaining > 0:
+        chunk = rfile.read(min(UPLOAD_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError('incomplete_body')
+        remaining -= len(chunk)
+        yield chunk
+
+def recording_header(headers, name: str):
+    # Metadata headers are URL-encoded by the client so they can carry any text
+    value = headers.get(name)
+    return urllib.parse.unquote(value) if value else None
+
+def handle_recording_stream(rfile, headers, user: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    try:
+        length = int(headers.get('Content-Length', 0))
+    except ValueError:
+        length = 0
+    if length <= 0:
+        return 411, {'success': False, 'error': 'length_required'}
+    if length > RECORDING_MAX_BYTES:
+        return 413, {'success': False, 'error': 'too_large', 'max_bytes': RECORDING_MAX_BYTES}
+
+    content_type = headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    role = recording_header(headers, 'X-Recording-Role') or 'speak'
+    language = recording_header(headers, 'X-Recording-Language')
+    transcript = recording_header(headers, 'X-Recording-Transcript')
+    try:
+        out = store_recording(user, role, transcript, language, AUDIO_CONTENT_TYPES.get(content_type, '.webm'), read_chunks(rfile, length))
+        return 200, out
+    except ValueError as e:
+        return (413 if str(e) == 'too_large' else 400), {'success': False, 'error': str(e)}
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print(f"Error saving recording: {e}", flush=True)
+        return 500, {'success': False, 'error': str(e)[:100]}
+
+def handle_recording_json(b: bytes, user: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        j = json.loads(b.decode('utf-8'))
+        audio_base64 = j.get('audio', '')
+        if not audio_base64:
+            return {'success': False, 'error': 'no_audio'}
+        audio_data = base64.b64decode(audio_base64)
+        return store_recording(user, j.get('role', 'speak'), j.get('transcript'), j.get('language'), '.webm', [audio_data])
+    except ValueError as e:
+        return {'success': False, 'error': str(e)[:100]}
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print(f"Error saving recording: {e}", flush=True)
+        return {'success': False, 'error': str(e)[:100]}
@@ -0,0 +1,204 @@
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+from .encoding import dumps, iter_with_array, STREAM_MIN_ITEMS
+
+# Bodies above this are refused with 413 before they are read; routes can raise or lower it
+DEFAULT_MAX_BODY = int(os.getenv('HTTP_MAX_BODY', str(1024 * 1024)))
+
+JSON_TYPE = 'application/json; charset=utf-8'
+# Seconds a client is told to wait when a shared resource (the database pool) is saturated
+UNAVAILABLE_RETRY_AFTER = int(os.getenv('HTTP_UNAVAILABLE_RETRY_AFTER', '2'))
+
+class Request:
+    __slots__ = ('handler', 'method', 'path', 'query', 'headers', 'body', 'json', 'user')
+
+    def __init__(self, handler, method: str, path: str, query: Dict[str, list]):
+        self.handler = handler
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = handler.headers
+        self.body = b''
+        self.json = {}
+        self.user = None
+
+    @property
+    def rfile(self):
+        return self.handler.rfile
+
+    def param(self, name: str, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+class Response:
+    __slots__ = ('status', 'body', 'content_type', 'headers', 'stream', 'cache_key')
+
+    def __init__(self, body: bytes = b'', content_type: str = 'text/plain; charset=utf-8', status: int = 200,
+                 headers: Optional[Dict[str, str]] = None, stream=None, cache_key=None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+        # An iterator of byte chunks sent without Content-Length (exports, large arrays)
+        self.stream = stream
+        # Set for bodies that only change with a file on disk, so their compressed form is reused
+        self.cache_key = cache_key
+
+def json_response(obj: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(dumps(obj), JSON_TYPE, status, headers)
+
+def json_array_response(obj: Dict[str, Any], key: str) -> Response:
+    # Like json_response, but a long list under `key` is encoded and sent in batches
+    if len(obj.get(key) or ()) < STREAM_MIN_ITEMS:
+        return json_response(obj)
+    return Response(content_type=JSON_TYPE, stream=iter_with_array(obj, key))
+
+def not_found() -> Response:
+    return Response(b'Not Found', status=404)
+
+def unavailable(retry_after: int = UNAVAILABLE_RETRY_AFTER, extra: Optional[Dict[str, Any]] = None) -> Response:
+    body = {**(extra or {}), 'success': False, 'error': 'unavailable', 'retry_after': retry_after}
+    return json_response(body, 503, {'Retry-After': str(retry_after)})
+
+class Route:
+    __slots__ = ('method', 'path', 'fn', 'auth', 'max_body', 'body', 'json_body', 'unauthorized', 'metric', 'cost')
+
+    def __init__(self, method, path, fn, auth, max_body, body, json_body, unauthorized, metric, cost=0):
+        self.method = method
+        self.path = path
+        self.fn = fn
+        self.auth = auth
+        self.max_body = max_body
+        self.body = body
+        self.json_body = json_body
+        self.unauthorized = unauthorized
+        self.metric = metric
+        self.cost = cost
+
+class Router:
+    # Exact paths are one dict lookup; prefix routes (static trees, /data/<file>) are
+    # checked in registration order only when no exact route matches.
+    #
+    # Route options:
+    #   auth          None, 'user' (Bearer token), 'optional' (req.user when a valid token is
+    #                 sent, no 401 otherwise) or 'admin' (credentials in the JSON body)
+    #   body          read the request body; False leaves rfile to the handler (streaming uploads)
+    #   json_body     decode the body into req.json; an empty body decodes to {}
+    #   max_body      413 above this many bytes
+    #   unauthorized  extra keys for the 401 payload, for clients that expect e.g. 'items'
+    #   cost          rate-limit units charged after auth, an int or fn(req) -> int; the
+    #                 limiter answers instead of the handler when the client is over its limit
+    #
+    # Exceptions listed in `saturated` (a pool checkout timing out) escaping auth, the limiter
+    # or the handler are answered with 503 and Retry-After rather than 500.
+    def __init__(self, user_auth: Callable = None, admin_auth: Callable = None, limiter: Callable = None,
+                 saturated=()):
+        self.user_auth = user_auth
+        self.admin_auth = admin_auth
+        self.limiter = limiter
+        self.saturated = saturated
+        self.routes = {}
+        self.prefixes = []
+        self.fallback = {}
+        self.hooks = []
+
+    def add(self, method: str, path: str, fn, auth: str = None, max_body: int = DEFAULT_MAX_BODY,
+            body: bool = True, json_body: bool = True, unauthorized: Dict[str, Any] = None, metric: str = None,
+            cost=0):
+        route = Route(method, path, fn, auth, max_body, body, json_body, unauthorized or {}, metric or path, cost)
+        if path.endswith('/') and path != '/':
+            self.prefixes.append(route)
+        else:
+            self.routes[(method, path)] = route
+        return route
+
+    def route(self, method: str, *paths: str, **options):
+        def decorator(fn):
+            for path in paths:
+                self.add(method, path, fn, **options)
+            return fn
+        return decorator
+
+    def get(self, *paths: str, **options):
+        return self.route('GET', *paths, **options)
+
+    def post(self, *paths: str, **options):
+        return self.route('POST', *paths, **options)
+
+    def set_fallback(self, method: str, fn, metric: str = 'other'):
+        self.fallback[method] = Route(method, None, fn, None, DEFAULT_MAX_BODY, False, False, {}, metric)
+
+    def on_timing(self, fn):
+        # fn(route, status, seconds) after each handler returns; seconds exclude socket I/O
+        self.hooks.append(fn)
+        return fn
+
+    def resolve(self, method: str, path: str) -> Optional[Route]:
+        route = self.routes.get((method, path))
+        if route is not None:
+            return route
+        for route in self.prefixes:
+            if route.method == method and path.startswith(route.path):
+                return route
+        return self.fallback.get(method)
+
+    def paths(self):
+        return {path for (_, path) in self.routes}
+
+    def _admin_ok(self, data: dict) -> bool:
+        # Listing routes send username/password; mutating ones send admin_username/admin_password
+        # next to fields (such as a new user's username) of their own
+        if 'admin_username' in data:
+            username, password = data.get('admin_username', ''), data.get('admin_password', '')
+        else:
+            username, password = data.get('username', ''), data.get('password', '')
+        return bool(self.admin_auth and self.admin_auth(username, password))
+
+    def dispatch(self, route: Route, req: Request) -> Response:
+        try:
+            return self._dispatch(route, req)
+        except self.saturated as e:
+            print(f"unavailable {req.method} {req.path}: {e}", flush=True)
+            return unavailable(extra=route.unauthorized)
+
+    def _dispatch(self, route: Route, req: Request) -> Response:
+        if route.body:
+            try:
+                n = int(req.headers.get('Content-Length', 0) or 0)
+            except ValueError:
+                return json_response({'success': False, 'error': 'bad_content_length'}, 400)
+            if n > route.max_body:
+                # The unread body would be parsed as the next request, so drop the connection
+                req.handler.close_connection = True
+                return json_response({'success': False, 'error': 'too_large', 'max_bytes': route.max_body}, 413)
+            req.body = req.rfile.read(n) if n > 0 else b''
+            if route.json_body and req.body:
+                try:
+                    req.json = json.loads(req.body.decode('utf-8'))
+                except ValueError:
+                    return json_response({'success': False, 'error': 'bad_json'}, 400)
+                if not isinstance(req.json, dict):
+                    return json_response({'success': False, 'error': 'bad_json'}, 400)
+
+        if route.auth == 'user':
+            req.user = self.user_auth(dict(req.headers)) if self.user_auth else None
+            if not req.user:
+                return json_response({**route.unauthorized, 'success': False, 'error': 'unauthorized'}, 401)
+        elif route.auth == 'optional':
+            req.user = self.user_auth(dict(req.headers)) if self.user_auth and req.headers.get('Authorization') else None
+        elif route.auth == 'admin' and not self._admin_ok(req.json):
+            return json_response({'success': False, 'error': 'unauthorized'}, 401)
+
+        if route.cost and self.limiter:
+            limited = self.limiter(req, route.metric, route.cost(req) if callable(route.cost) else route.cost)
+            if limited is not None:
+                return limited
+
+        started = time.perf_counter()
+        response = route.fn(req)
+        elapsed = time.perf_counter() - started
+        for hook in self.hooks:
+            hook(route, response.status, elapsed)
+        return response
@@ -0,0 +1,65 @@
+import base64
+import json
+from typing import Dict, Any, Optional
+from database.connection import PoolTimeout
+from database.queries import search_user_vocab, search_global_vocab
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Cursors are the sort key of the last row on a page, opaque to clients
+def encode_cursor(after) -> Optional[str]:
+    if after is None:
+        return None
+    raw = json.dumps(list(after), ensure_ascii=False, default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str], size: int = 3):
+    if not cursor:
+        return None
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    after = json.loads(raw.decode('utf-8'))
+    if not isinstance(after, list) or len(after) != size:
+        raise ValueError('invalid_cursor')
+    return after
+
+def parse_limit(value, default: int = DEFAULT_LIMIT, maximum: int = MAX_LIMIT) -> int:
+    return min(max(int(value if value not in (None, '') else default), 1), maximum)
+
+def handle_vocab_search(query: Dict[str, list], user: Dict[str, Any]) -> Dict[str, Any]:
+    def param(name, default=None):
+        values = query.get(name)
+        return values[0] if values else default
+
+    try:
+        q = param('q', '').strip()
+        if not q:
+            return {'success': False, 'error': 'missing_query', 'items': []}
+        items, after = search_user_vocab(
+            user['id'], q, user.get('native_language') or 'en',
+            limit=parse_limit(param('limit')), after=decode_cursor(param('cursor'))
+        )
+        return {'success': True, 'items': items, 'next_cursor': encode_cursor(after)}
+    except (ValueError, TypeError):
+        return {'success': False, 'error': 'invalid_params', 'items': []}
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        return {'success': False, 'error': str(e), 'items': []}
+
+def handle_global_vocab_search(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        q = str(json_data.get('q', '')).strip()
+        if not q:
+            return {'success': False, 'error': 'missing_query'}
+        items, after = search_global_vocab(
+            q, json_data.get('lang', 'en'),
+            limit=parse_limit(json_data.get('limit')), after=decode_cursor(json_data.get('cursor'), size=2)
+        )
+        return {'success': True, 'vocab': items, 'next_cursor': encode_cursor(after)}
+    except (ValueError, TypeError):
+        return {'success': False, 'error': 'invalid_params'}
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
@@ -0,0 +1,59 @@
+import sys
+import os
+import gzip
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api import compression
+from api.compression import negotiate, compress, StreamCompressor, StaticCache
+
+def test_no_header_means_identity():
+    assert negotiate(None) is None
+    assert negotiate('') is None
+    assert negotiate('identity') is None
+
+def test_gzip_is_picked_when_offered():
+    assert negotiate('gzip') == 'gzip'
+    assert negotiate('deflate, GZIP;q=0.5') == 'gzip'
+
+def test_zero_weight_refuses_a_coding():
+    assert negotiate('gzip;q=0') is None
+    assert negotiate('*;q=0') is None
+
+def test_wildcard_covers_unlisted_codings(monkeypatch):
+    monkeypatch.setattr(compression, 'ENCODINGS', ('gzip',))
+    assert negotiate('*') == 'gzip'
+    assert negotiate('*, gzip;q=0') is None
+
+def test_weights_and_preference_order(monkeypatch):
+    monkeypatch.setattr(compression, 'ENCODINGS', ('br', 'gzip'))
+    assert negotiate('gzip, br') == 'br'
+    assert negotiate('gzip, br;q=0.5') == 'gzip'
+    assert negotiate('br;q=bad, gzip;q=0.1') == 'gzip'
+
+def test_compressible_types(monkeypatch):
+    monkeypatch.setattr(compression, 'ENABLED', True)
+    assert compression.compressible('application/json')
+    assert compression.compressible('text/html; charset=utf-8')
+    assert not compression.compressible('audio/mpeg')
+    monkeypatch.setattr(compression, 'ENABLED', False)
+    assert not compression.compressible('application/json')
+
+def test_gzip_round_trip():
+    body = b'{"word": "\xed\x95\x9c"}' * 200
+    assert gzip.decompress(compress(body, 'gzip')) == body
+    assert gzip.decompress(compress(body, 'gzip', static=True)) == body
+
+def test_stream_chunks_decode_as_one_body():
+    c = StreamCompressor('gzip')
+    chunks = [b'{"a": 1}\n', b'{"b": 2}\n', b'']
+    out = b''.join(c.chunk(chunk) for chunk in chunks) + c.finish()
+    assert gzip.decompress(out) == b''.join(chunks)
+
+def test_static_cache_hits_and_evicts():
+    cache = StaticCache(max_entries=1, max_bytes=1 << 20)
+    data, hit = cache.get(('/a.js', 1.0, 3), b'abc', 'gzip')
+    assert not hit and gzip.decompress(data) == b'abc'
+    assert cache.get(('/a.js', 1.0, 3), b'abc', 'gzip') == (data, True)
+    cache.get(('/b.js', 1.0, 3), b'xyz', 'gzip')
+    assert list(cache.entries) == [('/b.js', 1.0, 3, 'gzip')]
+    assert cache.bytes == len(cache.entries[('/b.js', 1.0, 3, 'gzip')])
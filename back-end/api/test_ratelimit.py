@@ -0,0 +1,88 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api import ratelimit
+from api.ratelimit import TokenBuckets, too_many
+from api.router import Request
+
+class FakeHandler:
+    def __init__(self, address='203.0.113.9', headers=None):
+        self.headers = dict(headers or {})
+        self.client_address = (address, 50000)
+        self.close_connection = False
+
+def test_burst_is_admitted_then_waits():
+    buckets = TokenBuckets(rate=2, burst=3, max_keys=10)
+    assert [buckets.take('a', 1) for _ in range(3)] == [0, 0, 0]
+    wait = buckets.take('a', 1)
+    assert 0 < wait <= 0.5
+
+def test_keys_have_separate_buckets():
+    buckets = TokenBuckets(rate=1, burst=1, max_keys=10)
+    assert buckets.take('a', 1) == 0
+    assert buckets.take('b', 1) == 0
+    assert buckets.take('a', 1) > 0
+
+def test_tokens_refill_over_time():
+    buckets = TokenBuckets(rate=1, burst=5, max_keys=10)
+    buckets.buckets['a'] = (0.0, time.monotonic() - 3)
+    assert buckets.take('a', 3) == 0
+    assert buckets.take('a', 1) > 0
+
+def test_refill_is_capped_at_burst():
+    buckets = TokenBuckets(rate=1, burst=2, max_keys=10)
+    buckets.buckets['a'] = (0.0, time.monotonic() - 3600)
+    assert buckets.take('a', 2) == 0
+    assert buckets.take('a', 1) > 0
+
+def test_cost_over_burst_takes_a_full_bucket():
+    buckets = TokenBuckets(rate=1, burst=4, max_keys=10)
+    assert buckets.take('a', 100) == 0
+    assert 0 < buckets.take('a', 100) <= 4
+
+def test_zero_rate_waits_without_dividing_by_zero():
+    buckets = TokenBuckets(rate=0, burst=1, max_keys=10)
+    assert buckets.take('a', 1) == 0
+    assert buckets.take('a', 1) == 3600.0
+
+def test_least_recently_used_keys_are_evicted():
+    buckets = TokenBuckets(rate=1, burst=1, max_keys=2)
+    buckets.take('a', 1)
+    buckets.take('b', 1)
+    buckets.take('a', 0)
+    buckets.take('c', 1)
+    assert list(buckets.buckets) == ['a', 'c']
+    # An evicted key starts again with a full bucket
+    assert buckets.take('b', 1) == 0
+
+def test_too_many_rounds_retry_after_up():
+    response = too_many('/t', 'rate_limited', 0.2, {'daily_quota': 10})
+    assert response.status == 429
+    assert response.headers['Retry-After'] == '1'
+    assert b'"daily_quota"' in response.body
+
+def test_limit_uses_the_address_bucket_for_anonymous_callers(monkeypatch):
+    monkeypatch.setattr(ratelimit, 'ENABLED', True)
+    monkeypatch.setattr(ratelimit, 'anonymous', TokenBuckets(rate=1, burst=2, max_keys=10))
+    req = Request(FakeHandler(), 'POST', '/t', {})
+    assert ratelimit.limit(req, '/t', 2) is None
+    assert ratelimit.limit(req, '/t', 1).status == 429
+    other = Request(FakeHandler('198.51.100.1'), 'POST', '/t', {})
+    assert ratelimit.limit(other, '/t', 1) is None
+
+def test_limit_ignores_free_routes_and_disabled_limits(monkeypatch):
+    monkeypatch.setattr(ratelimit, 'anonymous', TokenBuckets(rate=0, burst=0, max_keys=10))
+    req = Request(FakeHandler(), 'GET', '/t', {})
+    monkeypatch.setattr(ratelimit, 'ENABLED', True)
+    assert ratelimit.limit(req, '/t', 0) is None
+    monkeypatch.setattr(ratelimit, 'ENABLED', False)
+    assert ratelimit.limit(req, '/t', 5) is None
+
+def test_forwarded_address_is_only_trusted_when_enabled(monkeypatch):
+    req = Request(FakeHandler(headers={'X-Forwarded-For': '192.0.2.7, 10.0.0.1'}), 'GET', '/t', {})
+    monkeypatch.setattr(ratelimit, 'TRUST_FORWARDED', False)
+    assert ratelimit.client_address(req) == '203.0.113.9'
+    monkeypatch.setattr(ratelimit, 'TRUST_FORWARDED', True)
+    assert ratelimit.client_address(req) == '192.0.2.7'
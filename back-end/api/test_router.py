@@ -0,0 +1,116 @@
+import io
+import json
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.router import Router, Request, Response, json_response
+
+class FakeHandler:
+    def __init__(self, body: bytes = b'', headers=None):
+        self.headers = dict(headers or {})
+        if body:
+            self.headers.setdefault('Content-Length', str(len(body)))
+        self.rfile = io.BytesIO(body)
+        self.close_connection = False
+        self.client_address = ('127.0.0.1', 50000)
+
+def call(router, method, path, body=b'', headers=None):
+    route = router.resolve(method, path)
+    response = router.dispatch(route, Request(FakeHandler(body, headers), method, path, {}))
+    return response, json.loads(response.body) if response.body.startswith(b'{') else None
+
+def echo(req):
+    return json_response({'json': req.json, 'user': req.user})
+
+def test_exact_prefix_and_fallback():
+    router = Router()
+    router.get('/a', body=False)(lambda req: Response(b'exact'))
+    router.get('/files/', body=False)(lambda req: Response(b'prefix'))
+    router.set_fallback('GET', lambda req: Response(b'fallback'))
+    assert router.dispatch(router.resolve('GET', '/a'), Request(FakeHandler(), 'GET', '/a', {})).body == b'exact'
+    assert router.resolve('GET', '/files/x.mp3').path == '/files/'
+    assert router.resolve('GET', '/nothing').fn(None).body == b'fallback'
+    assert router.resolve('POST', '/a') is None
+
+def test_json_body_is_decoded():
+    router = Router()
+    router.post('/echo')(echo)
+    response, out = call(router, 'POST', '/echo', b'{"text": "hi"}')
+    assert response.status == 200
+    assert out['json'] == {'text': 'hi'}
+
+def test_bad_json_and_non_object_bodies_are_400():
+    router = Router()
+    router.post('/echo')(echo)
+    assert call(router, 'POST', '/echo', b'{not json')[1]['error'] == 'bad_json'
+    assert call(router, 'POST', '/echo', b'[1, 2]')[0].status == 400
+
+def test_body_over_limit_is_413_and_closes_the_connection():
+    router = Router()
+    router.post('/small', max_body=4)(echo)
+    handler = FakeHandler(b'{"a": 12345}')
+    response = router.dispatch(router.resolve('POST', '/small'), Request(handler, 'POST', '/small', {}))
+    assert response.status == 413
+    assert handler.close_connection
+
+def test_user_auth():
+    router = Router(user_auth=lambda headers: {'id': 7} if headers.get('Authorization') == 'Bearer ok' else None)
+    router.get('/me', body=False, auth='user', unauthorized={'items': []})(echo)
+    router.get('/maybe', body=False, auth='optional')(echo)
+    response, out = call(router, 'GET', '/me')
+    assert response.status == 401 and out['items'] == []
+    assert call(router, 'GET', '/me', headers={'Authorization': 'Bearer ok'})[1]['user'] == {'id': 7}
+    assert call(router, 'GET', '/maybe')[1]['user'] is None
+    assert call(router, 'GET', '/maybe', headers={'Authorization': 'Bearer ok'})[1]['user'] == {'id': 7}
+
+def test_admin_auth_reads_either_credential_pair():
+    router = Router(admin_auth=lambda username, password: (username, password) == ('root', 'pw'))
+    router.post('/admin/x', auth='admin')(echo)
+    assert call(router, 'POST', '/admin/x', b'{"username": "root", "password": "pw"}')[0].status == 200
+    assert call(router, 'POST', '/admin/x', b'{"admin_username": "root", "admin_password": "pw", "username": "new"}')[0].status == 200
+    assert call(router, 'POST', '/admin/x', b'{"username": "root", "password": "no"}')[0].status == 401
+
+def test_limiter_answers_instead_of_the_handler():
+    charged = []
+    def limiter(req, route, cost):
+        charged.append((route, cost))
+        return json_response({'error': 'rate_limited'}, 429) if cost > 2 else None
+    router = Router(limiter=limiter)
+    router.post('/cheap', cost=1)(echo)
+    router.post('/dear', cost=lambda req: len(req.json.get('text', '')))(echo)
+    assert call(router, 'POST', '/cheap', b'{}')[0].status == 200
+    assert call(router, 'POST', '/dear', b'{"text": "abcd"}')[0].status == 429
+    assert charged == [('/cheap', 1), ('/dear', 4)]
+
+def test_saturated_errors_become_503_with_retry_after():
+    class Saturated(Exception):
+        pass
+    def handler(req):
+        raise Saturated('pool empty')
+    router = Router(saturated=Saturated)
+    router.get('/busy', body=False, unauthorized={'items': []})(handler)
+    response, out = call(router, 'GET', '/busy')
+    assert response.status == 503
+    assert int(response.headers['Retry-After']) >= 1
+    assert out['error'] == 'unavailable' and out['items'] == []
+
+def test_other_errors_propagate():
+    def handler(req):
+        raise KeyError('boom')
+    router = Router(saturated=TimeoutError)
+    router.get('/boom', body=False)(handler)
+    try:
+        call(router, 'GET', '/boom')
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('expected KeyError')
+
+def test_timing_hooks_see_status():
+    seen = []
+    router = Router()
+    router.on_timing(lambda route, status, seconds: seen.append((route.path, status)))
+    router.get('/t', body=False)(lambda req: Response(b'', status=204))
+    call(router, 'GET', '/t')
+    assert seen == [('/t', 204)]
@@ -0,0 +1,44 @@
+import sys
+import os
+import base64
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.search import encode_cursor, decode_cursor, parse_limit
+
+def test_cursor_round_trip():
+    after = ['한국', 'noun', 42]
+    cursor = encode_cursor(after)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == after
+    assert decode_cursor(encode_cursor(('사과', 'noun')), size=2) == ['사과', 'noun']
+
+def test_no_cursor():
+    assert encode_cursor(None) is None
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+
+def test_cursor_of_the_wrong_size_is_rejected():
+    for cursor, size in ((encode_cursor(('a', 'b')), 3), (base64.urlsafe_b64encode(b'{"a": 1}').decode(), 1)):
+        try:
+            decode_cursor(cursor, size=size)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'{cursor} accepted')
+
+def test_garbage_cursor_raises_value_error():
+    for cursor in ('!!!', 'bm90IGpzb24'):
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'{cursor} accepted')
+
+def test_parse_limit():
+    assert parse_limit(None) == 50
+    assert parse_limit('') == 50
+    assert parse_limit('10') == 10
+    assert parse_limit(0) == 1
+    assert parse_limit(10 ** 6) == 200
+    assert parse_limit(None, 500, 5000) == 500
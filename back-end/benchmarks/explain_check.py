@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+def walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk(child)
+
+def explain(sql: str, params):
+    from database.connection import db_pool
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+        conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+def vacuum_analyze(*tables):
+    # Index-only scans need an up-to-date visibility map, which only VACUUM sets
+    from database.connection import db_pool
+    conn = db_pool.open_dedicated()
+    try:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        for t in tables:
+            cursor.execute(f"VACUUM ANALYZE {t}")
+    finally:
+        conn.close()
+
+def expect_index_only(plan, relation: str, index: str, max_heap_fetch_ratio: float = 0.01):
+    problems = []
+    nodes = [n for n in walk(plan['Plan']) if n.get('Relation Name') == relation]
+    if not nodes:
+        return [f"{relation} is not scanned at all"]
+    for n in nodes:
+        if n['Node Type'] != 'Index Only Scan' or n.get('Index Name') != index:
+            problems.append(f"{relation}: expected Index Only Scan using {index}, got {n['Node Type']} {n.get('Index Name', '')}".rstrip())
+        elif n.get('Actual Rows') and n.get('Heap Fetches', 0) > n['Actual Rows'] * max_heap_fetch_ratio:
+            problems.append(f"{relation}: {n['Heap Fetches']} heap fetches for {n['Actual Rows']} rows")
+    return problems
+
+def expect_no_node(plan, node_type: str):
+    return [f"plan contains a {node_type} node"] if any(n['Node Type'] == node_type for n in walk(plan['Plan'])) else []
+
+def check_user_vocab_list(fixtures, rows):
+    from database import prepared
+    user_id = fixtures.reset_user(f'explain_{rows}')
+    fixtures.seed_user_vocab(user_id, rows)
+    vacuum_analyze('vocab', 'global_vocab', 'vocab_translation')
+    plan = explain(prepared.STATEMENTS['user_vocab_list'], ('en', user_id))
+    problems = expect_index_only(plan, 'vocab', 'idx_vocab_user_last_added') + expect_no_node(plan, 'Sort')
+    return plan, problems
+
+CHECKS = {
+    'user_vocab_list.100k': lambda fixtures: check_user_vocab_list(fixtures, 100000),
+    'user_vocab_list.1k': lambda fixtures: check_user_vocab_list(fixtures, 1000),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail when hot queries lose their intended plan shape')
+    parser.add_argument('--only', help='run only checks whose name contains this substring')
+    parser.add_argument('--show-plans', action='store_true')
+    args = parser.parse_args()
+
+    bench_db = os.getenv('BENCH_DATABASE_URL')
+    if not bench_db:
+        print("BENCH_DATABASE_URL is not set; refusing to run against the default database", flush=True)
+        sys.exit(2)
+    os.environ['DATABASE_URL'] = bench_db
+    os.environ.setdefault('TRACING', '0')
+
+    import init_db
+    init_db.init_database()
+    from database.connection import db_pool
+    db_pool.init_pool()
+    import fixtures
+
+    failed = 0
+    for name, check in CHECKS.items():
+        if args.only and args.only not in name:
+            continue
+        plan, problems = check(fixtures)
+        status = 'FAIL' if problems else 'ok'
+        print(f"{status:4} {name}  execution {plan.get('Execution Time', 0):.1f}ms", flush=True)
+        for p in problems:
+            print(f"     - {p}", flush=True)
+        if args.show_plans or problems:
+            print(json.dumps(plan['Plan'], indent=2), flush=True)
+        failed += bool(problems)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
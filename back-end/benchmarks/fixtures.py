@@ -0,0 +1,61 @@
+import random
+from database.connection import db_pool
+from database.queries import generate_token
+
+BENCH_PREFIX = 'bench_'
+
+SYLLABLES = list('가나다라마바사아자차카타파하거너더러머버서어저처커터퍼허고노도로모보소오조초코토포호구누두루무부수우주추')
+PARTICLES = ['는', '가', '를', '에', '도', '와']
+
+def korean_text(words: int, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(words):
+        noun = ''.join(rnd.choice(SYLLABLES) for _ in range(rnd.choice((2, 2, 3))))
+        out.append(noun + rnd.choice(PARTICLES))
+    return ' '.join(out) + '.'
+
+def execute(sql: str, params=()):
+    conn = db_pool.get_connection()
+    if not conn:
+        raise RuntimeError('no database connection; set BENCH_DATABASE_URL')
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        row = cursor.fetchone() if cursor.description else None
+        conn.commit()
+        return row
+    finally:
+        db_pool.return_connection(conn)
+
+def reset_user(name: str) -> int:
+    username = BENCH_PREFIX + name
+    execute("DELETE FROM users WHERE username = %s", (username,))
+    row = execute("""
+        INSERT INTO users (username, email, password_hash, native_language, target_language)
+        VALUES (%s, %s, '$2b$12$bench', 'en', 'ko') RETURNING id
+    """, (username, f"{username}@bench.local"))
+    return row[0]
+
+def seed_user_vocab(user_id: int, rows: int):
+    execute("""
+        INSERT INTO global_vocab (base, pos, count, base_jamo)
+        SELECT 'bw' || i, 'NNG', i, 'bw' || i FROM generate_series(1, %s) AS i
+        ON CONFLICT (base, pos) DO NOTHING
+    """, (rows,))
+    execute("""
+        INSERT INTO vocab_translation (base, pos, lang, text, source)
+        SELECT 'bw' || i, 'NNG', 'en', 'word ' || i, 'bench' FROM generate_series(1, %s) AS i
+        ON CONFLICT (base, pos, lang) DO NOTHING
+    """, (rows,))
+    execute("""
+        INSERT INTO vocab (user_id, base, pos, count, last_added)
+        SELECT %s, 'bw' || i, 'NNG', 1 + i %% 7, now() - (i || ' seconds')::interval FROM generate_series(1, %s) AS i
+        ON CONFLICT (user_id, base, pos) DO NOTHING
+    """, (user_id, rows))
+    execute("ANALYZE vocab")
+    execute("ANALYZE global_vocab")
+    execute("ANALYZE vocab_translation")
+
+def auth_header(user_id: int) -> dict:
+    return {'Authorization': 'Bearer ' + generate_token(user_id)}
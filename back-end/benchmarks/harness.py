@@ -0,0 +1,60 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+def measure(fn, repeat: int = 20, warmup: int = 2, ops: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        'n': repeat,
+        'median_ms': round(median * 1000, 3),
+        'p95_ms': round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 3),
+        'min_ms': round(samples[0] * 1000, 3),
+        'ops_per_sec': round(ops / median, 1) if median > 0 else None,
+    }
+
+def git_revision(root: str) -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ''
+
+def write_results(path: str, results: dict, root: str):
+    doc = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(root),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'stub_latency': os.getenv('BENCH_STUB_LATENCY', '0'),
+        },
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, indent=2, ensure_ascii=False)
+    return doc
+
+def compare(results: dict, baseline_path: str, threshold: float):
+    # A case regresses when its median is more than `threshold` slower than the baseline
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {})
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or 'median_ms' not in current or 'median_ms' not in base or not base['median_ms']:
+            continue
+        ratio = current['median_ms'] / base['median_ms']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['median_ms'], current['median_ms'], ratio))
+    return regressions
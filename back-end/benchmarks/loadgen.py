@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import harness
+from seed import LOAD_PREFIX, Zipf, load_words
+
+DEFAULT_MIX = 'list=40,learn=30,ingest=15,tts=10,translate=5'
+
+def parse_mix(spec: str):
+    ops, weights = [], []
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        ops.append(name.strip())
+        weights.append(float(weight or 1))
+    unknown = set(ops) - {'list', 'learn', 'ingest', 'tts', 'translate'}
+    if unknown:
+        raise SystemExit(f"unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return ops, weights
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    return round(samples[min(int(len(samples) * q), len(samples) - 1)] * 1000, 2)
+
+class Target:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def call(self, method: str, path: str, token: str = None, payload=None):
+        headers = {}
+        body = None
+        if token:
+            headers['Authorization'] = 'Bearer ' + token
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        finally:
+            conn.close()
+
+class Workload:
+    def __init__(self, target: Target, tokens, words, zipf_s: float, seed: int):
+        self.target = target
+        self.tokens = tokens
+        self.words = words
+        self.rnd = random.Random(seed)
+        self.zipf = Zipf(len(words), zipf_s, self.rnd)
+        self._lock = threading.Lock()
+
+    def _pick(self):
+        with self._lock:
+            return self.rnd.choice(self.tokens), self.words[self.zipf.sample()], self.rnd.random()
+
+    def _sentence(self, n: int) -> str:
+        with self._lock:
+            return ' '.join(self.words[self.zipf.sample()][0] for _ in range(n)) + '.'
+
+    def run(self, op: str):
+        token, (base, pos), coin = self._pick()
+        if op == 'list':
+            return self.target.call('GET', '/vocab/list', token)
+        if op == 'learn':
+            path = '/learn/remember' if coin < 0.7 else '/learn/dont-remember'
+            return self.target.call('POST', path, token, {'base': base, 'pos': pos})
+        if op == 'ingest':
+            return self.target.call('POST', '/vocab/ingest', token, {'text': self._sentence(40)})
+        if op == 'tts':
+            return self.target.call('POST', '/tts', None, {'text': base, 'lang': 'ko'})
+        return self.target.call('POST', '/translate', None, {'text': self._sentence(8), 'source': 'ko', 'target': 'en'})
+
+def is_error(status: int, body: bytes) -> bool:
+    if status >= 400:
+        return True
+    try:
+        out = json.loads(body.decode('utf-8'))
+    except ValueError:
+        return True
+    return isinstance(out, dict) and (out.get('success') is False or bool(out.get('error')))
+
+def login_users(target: Target, prefix: str, password: str, count: int):
+    # Logins are shed with 503 + retry_after once the server's bcrypt budget is used up
+    tokens = []
+    for i in range(count):
+        while True:
+            status, body = target.call('POST', '/login', None, {'username': f"{prefix}{i}", 'password': password})
+            try:
+                out = json.loads(body.decode('utf-8'))
+            except ValueError:
+                out = {}
+            if status != 503:
+                break
+            time.sleep(out.get('retry_after') or 1)
+        if status == 200 and out.get('token'):
+            tokens.append(out['token'])
+    return tokens
+
+def run_load(workload: Workload, ops, weights, rps: float, duration: float, concurrency: int):
+    # Open-loop schedule: request i is due at start + i / rps whether or not earlier ones
+    # finished, and latency counts from that due time so a stalled server is not hidden
+    # by the generator slowing down with it.
+    stats = {op: {'latencies': [], 'errors': 0, 'exceptions': 0} for op in ops}
+    lock = threading.Lock()
+    rnd = random.Random(7)
+
+    def one(op, due):
+        error = False
+        exception = False
+        try:
+            status, body = workload.run(op)
+            error = is_error(status, body)
+        except Exception:
+            exception = True
+        elapsed = time.perf_counter() - due
+        with lock:
+            s = stats[op]
+            s['latencies'].append(elapsed)
+            s['errors'] += error or exception
+            s['exceptions'] += exception
+
+    total = int(rps * duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='loadgen') as pool:
+        for i in range(total):
+            due = started + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, rnd.choices(ops, weights)[0], due)
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for op, s in stats.items():
+        lat = sorted(s['latencies'])
+        if not lat:
+            continue
+        report[op] = {
+            'n': len(lat),
+            'error_rate': round(s['errors'] / len(lat), 4),
+            'exceptions': s['exceptions'],
+            'p50_ms': percentile(lat, 0.50),
+            'p90_ms': percentile(lat, 0.90),
+            'p99_ms': percentile(lat, 0.99),
+            'max_ms': round(lat[-1] * 1000, 2),
+        }
+    done = sum(r['n'] for r in report.values())
+    report['total'] = {
+        'n': done,
+        'target_rps': rps,
+        'achieved_rps': round(done / elapsed, 1) if elapsed > 0 else None,
+        'error_rate': round(sum(s['errors'] for s in stats.values()) / done, 4) if done else None,
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay mixed traffic at a target request rate')
+    parser.add_argument('--url', help='server to load (default: an in-process SimpleHandler on BENCH_DATABASE_URL)')
+    parser.add_argument('--rps', type=float, default=50)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--concurrency', type=int, default=64, help='max requests in flight')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='weighted operations, e.g. list=40,learn=30,ingest=15,tts=10,translate=5')
+    parser.add_argument('--users', type=int, default=50, help='seeded users to log in and spread traffic over')
+    parser.add_argument('--prefix', default=LOAD_PREFIX)
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--words', type=int, default=50000, help='vocabulary size to draw request words from')
+    parser.add_argument('--zipf-s', type=float, default=1.07)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='write the report as JSON')
+    args = parser.parse_args()
+    ops, weights = parse_mix(args.mix)
+
+    httpd = None
+    if args.url:
+        u = urllib.parse.urlsplit(args.url)
+        target = Target(u.hostname, u.port or 80, args.timeout)
+    else:
+        bench_db = os.getenv('BENCH_DATABASE_URL')
+        if not bench_db:
+            print("BENCH_DATABASE_URL is not set; pass --url or point it at a seeded database", flush=True)
+            sys.exit(2)
+        os.environ['DATABASE_URL'] = bench_db
+        os.environ.setdefault('TRACING', '0')
+        os.environ.setdefault('RECORDING_LIFECYCLE', '0')
+        from run import load_server, start_http
+        server = load_server()
+        server.db_pool.init_pool()
+        httpd = start_http(server)
+        target = Target('127.0.0.1', httpd.server_address[1], args.timeout)
+
+    try:
+        tokens = login_users(target, args.prefix, args.password, args.users)
+        if not tokens:
+            print(f"could not log in any {args.prefix}* user; run benchmarks/seed.py first", flush=True)
+            sys.exit(1)
+        print(f"logged in {len(tokens)} users; {args.rps} rps for {args.duration}s ({args.mix})", flush=True)
+        workload = Workload(target, tokens, load_words(args.words, args.seed), args.zipf_s, args.seed)
+        report = run_load(workload, ops, weights, args.rps, args.duration, args.concurrency)
+    finally:
+        if httpd:
+            httpd.shutdown()
+
+    print(f"{'op':<10} {'n':>7} {'err%':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for op in ops:
+        r = report.get(op)
+        if r:
+            print(f"{op:<10} {r['n']:>7} {r['error_rate'] * 100:>6.2f}% {r['p50_ms']:>8}ms {r['p90_ms']:>8}ms {r['p99_ms']:>8}ms {r['max_ms']:>8}ms")
+    t = report['total']
+    print(f"total: {t['n']} requests, {t['achieved_rps']} rps achieved of {t['target_rps']}, error rate {t['error_rate']}")
+    if args.out:
+        harness.write_results(args.out, report, backend_root)
+
+if __name__ == '__main__':
+    main()
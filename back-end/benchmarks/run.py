@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import http.client
+import importlib.util
+import json
+import os
+import sys
+import threading
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import harness
+import stubs
+
+def load_server():
+    spec = importlib.util.spec_from_file_location('lexipark_server', os.path.join(backend_root, 'server', 'server.py'))
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    stubs.install(server)
+    return server
+
+def start_http(server):
+    class QuietHandler(server.SimpleHandler):
+        def log_message(self, *args):
+            pass
+    httpd = server.ThreadedHTTPServer(('127.0.0.1', 0), QuietHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+def request(port, method, path, headers=None, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+class FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = messages
+        self.sent = 0
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for m in self.messages:
+            yield m
+
+    async def send(self, data):
+        self.sent += 1
+
+def define_cases(server, fixtures, repeat):
+    from database.queries import get_user_vocab
+    cases = {}
+    has_mecab = bool(server.save_freq) and getattr(sys.modules.get('logic.text.analysis'), 'mecab', None) is not None
+
+    if has_mecab:
+        short_text = fixtures.korean_text(12)
+        long_text = fixtures.korean_text(2000)
+        cases['save_freq.short'] = lambda: harness.measure(lambda: server.save_freq(short_text), repeat)
+        cases['save_freq.long'] = lambda: harness.measure(lambda: server.save_freq(long_text), max(repeat // 4, 3))
+
+        def ingest_case(words):
+            def run():
+                user_id = fixtures.reset_user(f'ingest_{words}')
+                body = {'text': fixtures.korean_text(words, seed=words)}
+                return harness.measure(lambda: server.handle_vocab_ingest(body, user_id, 'en'), max(repeat // (1 + words // 100), 3), warmup=1)
+            return run
+        for words in (10, 100, 1000):
+            cases[f'vocab_ingest.{words}_words'] = ingest_case(words)
+
+    def user_vocab_case(rows):
+        def run():
+            user_id = fixtures.reset_user(f'vocab_{rows}')
+            fixtures.seed_user_vocab(user_id, rows)
+            return harness.measure(lambda: get_user_vocab(user_id, 'en'), max(repeat // (rows // 10000), 3))
+        return run
+    cases['get_user_vocab.10k'] = user_vocab_case(10000)
+    cases['get_user_vocab.100k'] = user_vocab_case(100000)
+
+    def prepared_case(name, params, use_prepared):
+        def run():
+            from database import prepared
+            user_id = fixtures.reset_user('prepared')
+            fixtures.seed_user_vocab(user_id, 50)
+            args = tuple(user_id if p == 'user_id' else p for p in params)
+            batch = 200
+            with server.db_pool.connection() as conn:
+                was_prepared = name in conn.prepared
+                if use_prepared and not was_prepared:
+                    raise RuntimeError(f'{name} is not prepared on this connection')
+                # Hiding the name makes prepared.execute send the full SQL text instead
+                conn.prepared.discard(name)
+                if use_prepared:
+                    conn.prepared.add(name)
+                cursor = conn.cursor()
+                def fn():
+                    for _ in range(batch):
+                        prepared.execute(cursor, name, args)
+                        cursor.fetchall()
+                    conn.rollback()
+                try:
+                    return harness.measure(fn, repeat, ops=batch)
+                finally:
+                    if was_prepared:
+                        conn.prepared.add(name)
+        return run
+    for name, params in (('user_by_id', ('user_id',)), ('global_vocab_get', ('bw1', 'NNG')),
+                         ('translation_get', ('bw1', 'NNG', 'en')), ('user_vocab_list', ('en', 'user_id'))):
+        cases[f'sql.{name}.plain'] = prepared_case(name, params, False)
+        cases[f'sql.{name}.prepared'] = prepared_case(name, params, True)
+
+    def http_case(path_method):
+        def run():
+            user_id = fixtures.reset_user('http')
+            fixtures.seed_user_vocab(user_id, 500)
+            headers = fixtures.auth_header(user_id)
+            httpd = start_http(server)
+            port = httpd.server_address[1]
+            batch = 50
+            try:
+                if path_method == 'vocab_list':
+                    fn = lambda: [request(port, 'GET', '/vocab/list', headers) for _ in range(batch)]
+                else:
+                    body = json.dumps({'base': 'bw1', 'pos': 'NNG'})
+                    h = dict(headers, **{'Content-Type': 'application/json'})
+                    fn = lambda: [request(port, 'POST', '/learn/' + path_method, h, body) for _ in range(batch)]
+                return harness.measure(fn, max(repeat // 4, 3), warmup=1, ops=batch)
+            finally:
+                httpd.shutdown()
+        return run
+    cases['http.vocab_list'] = http_case('vocab_list')
+    cases['http.learn_remember'] = http_case('remember')
+    cases['http.learn_dont_remember'] = http_case('dont-remember')
+
+    def encode_case(fast):
+        def run():
+            # /vocab/list-shaped payload with datetimes left for the encoder, as get_user_vocab returns it
+            from datetime import datetime, timedelta
+            from api import encoding
+            if fast and encoding.BACKEND != 'orjson':
+                raise RuntimeError('orjson is not installed')
+            started = datetime(2024, 1, 1)
+            rows = [{'base': f'bw{i}', 'translation': f'word {i}', 'pos': 'NNG', 'frequency': i % 50,
+                     'last_seen': started + timedelta(minutes=i), 'audio_path': f'audio/bw{i}.mp3',
+                     'remember_count': i % 7, 'dont_remember_count': i % 3,
+                     'last_remember_at': started + timedelta(minutes=i), 'retention': 0.5} for i in range(50000)]
+            payload = {'items': rows}
+            if fast:
+                fn = lambda: encoding.dumps(payload)
+            else:
+                fn = lambda: json.dumps(payload, ensure_ascii=False, default=encoding._default).encode('utf-8')
+            return harness.measure(fn, max(repeat // 4, 3), ops=len(rows))
+        return run
+    cases['json.vocab_list_50k.stdlib'] = encode_case(False)
+    cases['json.vocab_list_50k.fast'] = encode_case(True)
+
+    def ws_case():
+        frames = 1000
+        messages = [json.dumps({'type': 'ping'}) if i % 2 else json.dumps({'type': 'audio', 'frames': [0] * 160}) for i in range(frames)]
+        def one():
+            asyncio.run(server.ws_handler(FakeWebSocket(messages), '/'))
+        return harness.measure(one, repeat, ops=frames)
+    cases['ws.frames_1000'] = ws_case
+    return cases
+
+def main():
+    parser = argparse.ArgumentParser(description='LexiPark backend benchmarks')
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help='previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed median slowdown before failing (0.2 = 20%%)')
+    parser.add_argument('--only', help='run only cases whose name contains this substring')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    bench_db = os.getenv('BENCH_DATABASE_URL')
+    if not bench_db:
+        print("BENCH_DATABASE_URL is not set; refusing to run against the default database", flush=True)
+        sys.exit(2)
+    os.environ['DATABASE_URL'] = bench_db
+    os.environ.setdefault('TRACING', '0')
+    os.environ.setdefault('RECORDING_LIFECYCLE', '0')
+
+    import init_db
+    init_db.init_database()
+    server = load_server()
+    server.db_pool.init_pool()
+    import fixtures
+
+    results = {}
+    for name, case in define_cases(server, fixtures, args.repeat).items():
+        if args.only and args.only not in name:
+            continue
+        print(f"running {name} ...", flush=True)
+        try:
+            results[name] = case()
+        except Exception as e:
+            results[name] = {'error': str(e)[:200]}
+        print(f"  {results[name]}", flush=True)
+
+    harness.write_results(args.out, results, backend_root)
+    print(f"results written to {args.out}", flush=True)
+
+    if args.baseline:
+        regressions = harness.compare(results, args.baseline, args.threshold)
+        for name, base, current, ratio in regressions:
+            print(f"REGRESSION {name}: {base}ms -> {current}ms ({(ratio - 1) * 100:.0f}% slower)", flush=True)
+        if regressions:
+            sys.exit(1)
+        print("no regressions over threshold", flush=True)
+
+if __name__ == '__main__':
+    main()
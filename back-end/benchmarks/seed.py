@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+import argparse
+import bisect
+import csv
+import itertools
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+FREQUENCY_CSV = os.path.join(backend_root, 'database', 'data', 'frequency.csv')
+POS_TAGS = ['NNG', 'NNG', 'NNG', 'VV', 'VA', 'MAG', 'NP']
+LOAD_PREFIX = 'load_'
+BATCH = 5000
+
+def load_words(limit: int, seed: int = 42):
+    # Real words ranked by corpus frequency when frequency.csv exists, padded with synthetic ones
+    from fixtures import SYLLABLES
+    words = []
+    seen = set()
+    if os.path.exists(FREQUENCY_CSV):
+        with open(FREQUENCY_CSV, newline='', encoding='utf-8') as f:
+            rows = [r for r in csv.DictReader(f) if r.get('word') and r.get('pos')]
+        rows.sort(key=lambda r: -float(r.get('freq') or 0))
+        for r in rows:
+            key = (r['word'], r['pos'])
+            if key not in seen:
+                seen.add(key)
+                words.append(key)
+            if len(words) >= limit:
+                return words
+    rnd = random.Random(seed)
+    while len(words) < limit:
+        key = (''.join(rnd.choice(SYLLABLES) for _ in range(rnd.choice((1, 2, 2, 3)))), rnd.choice(POS_TAGS))
+        if key not in seen:
+            seen.add(key)
+            words.append(key)
+    return words
+
+class Zipf:
+    def __init__(self, n: int, s: float, rnd: random.Random):
+        self.cum = list(itertools.accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+        self.rnd = rnd
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self.cum, self.rnd.random() * self.cum[-1])
+
+def insert_batches(cursor, sql: str, rows, fetch=False):
+    from psycopg2.extras import execute_values
+    out = []
+    for i in range(0, len(rows), BATCH):
+        res = execute_values(cursor, sql, rows[i:i + BATCH], fetch=fetch)
+        if fetch:
+            out += res
+    return out
+
+def seed(args):
+    from database.connection import db_pool
+    from database.queries import hash_password
+    from logic.text import jamo
+
+    rnd = random.Random(args.seed)
+    words = load_words(args.global_vocab, args.seed)
+    zipf = Zipf(len(words), args.zipf_s, rnd)
+    now = datetime.now()
+    # One real bcrypt hash shared by every seeded user, so loadgen can log in
+    password_hash = hash_password(args.password)
+
+    conn = db_pool.get_connection()
+    if not conn:
+        raise RuntimeError('no database connection')
+    try:
+        cursor = conn.cursor()
+        if args.reset:
+            cursor.execute("DELETE FROM users WHERE username LIKE %s", (args.prefix + '%',))
+            print(f"removed {cursor.rowcount} {args.prefix}* users", flush=True)
+
+        # global_vocab.count follows the same curve the per-user draws use
+        expected = args.users * args.vocab_per_user
+        rows = [(b, p, max(int(expected / (i + 1) ** args.zipf_s), 1), jamo.decompose(b)) for i, (b, p) in enumerate(words)]
+        insert_batches(cursor, """
+            INSERT INTO global_vocab (base, pos, count, base_jamo) VALUES %s
+            ON CONFLICT (base, pos) DO NOTHING
+        """, rows)
+        print(f"global_vocab: {len(rows)} rows", flush=True)
+
+        # Popular words are translated into more languages than rare ones
+        translations = [(b, p, lang, f"{b} ({p}, {lang})", 'seed') for i, (b, p) in enumerate(words)
+                        for j, lang in enumerate(('en', 'ru', 'zh', 'vi')) if j == 0 or rnd.random() < 1.0 / (1 + i / 1000.0)]
+        insert_batches(cursor, """
+            INSERT INTO vocab_translation (base, pos, lang, text, source) VALUES %s
+            ON CONFLICT (base, pos, lang) DO NOTHING
+        """, translations)
+        print(f"vocab_translation: {len(translations)} rows", flush=True)
+
+        users = [(f"{args.prefix}{i}", f"{args.prefix}{i}@load.local", password_hash, rnd.choice(['en', 'ru', 'zh', 'vi']), 'ko')
+                 for i in range(args.users)]
+        user_ids = [r[0] for r in insert_batches(cursor, """
+            INSERT INTO users (username, email, password_hash, native_language, target_language) VALUES %s
+            ON CONFLICT (username) DO UPDATE SET password_hash = EXCLUDED.password_hash
+            RETURNING id
+        """, users, fetch=True)]
+        print(f"users: {len(user_ids)} rows", flush=True)
+
+        vocab_sql = """
+            INSERT INTO vocab (user_id, base, pos, count, last_added, remember_count, dont_remember_count) VALUES %s
+            ON CONFLICT (user_id, base, pos) DO NOTHING
+        """
+        vocab_total = 0
+        pending = []
+        for user_id in user_ids:
+            # Heavy-tailed vocab sizes: most learners are light, a few are very heavy
+            size = min(int(rnd.paretovariate(1.5) * args.vocab_per_user / 3), len(words))
+            picked = {}
+            while len(picked) < size:
+                idx = zipf.sample()
+                picked[idx] = picked.get(idx, 0) + 1
+            for idx, count in picked.items():
+                base, pos = words[idx]
+                pending.append((user_id, base, pos, count, now - timedelta(seconds=rnd.randint(0, 90 * 86400)),
+                                rnd.randint(0, 5), rnd.randint(0, 3)))
+            if len(pending) >= BATCH:
+                insert_batches(cursor, vocab_sql, pending)
+                vocab_total += len(pending)
+                pending = []
+        insert_batches(cursor, vocab_sql, pending)
+        vocab_total += len(pending)
+        print(f"vocab: {vocab_total} rows", flush=True)
+
+        recordings = []
+        for user_id in user_ids:
+            n = int(rnd.expovariate(1.0 / args.recordings_per_user)) if args.recordings_per_user > 0 else 0
+            for _ in range(n):
+                recordings.append((user_id, rnd.choice(['speak', 'listen']), f"recordings/seed/{user_id}_{rnd.getrandbits(64):016x}.webm",
+                                   None, rnd.choice(['ko', 'en']), now - timedelta(seconds=rnd.randint(0, 180 * 86400)),
+                                   rnd.randint(20_000, 2_000_000)))
+        insert_batches(cursor, """
+            INSERT INTO recordings (user_id, role, audio_path, transcript, language, created_at, size_bytes) VALUES %s
+        """, recordings)
+        print(f"recordings: {len(recordings)} rows (metadata only, no audio files)", flush=True)
+
+        conn.commit()
+        cursor.execute("ANALYZE users; ANALYZE global_vocab; ANALYZE vocab_translation; ANALYZE vocab; ANALYZE recordings;")
+        conn.commit()
+    finally:
+        db_pool.return_connection(conn)
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill users, global_vocab, vocab and recordings with synthetic data')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--global-vocab', type=int, default=50000)
+    parser.add_argument('--vocab-per-user', type=int, default=300, help='mean vocab rows per user')
+    parser.add_argument('--recordings-per-user', type=float, default=2.0, help='mean recordings per user')
+    parser.add_argument('--zipf-s', type=float, default=1.07, help='Zipf exponent of word popularity')
+    parser.add_argument('--prefix', default=LOAD_PREFIX, help='username prefix of seeded users')
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='delete previously seeded users first')
+    args = parser.parse_args()
+
+    bench_db = os.getenv('BENCH_DATABASE_URL')
+    if not bench_db:
+        print("BENCH_DATABASE_URL is not set; refusing to seed the default database", flush=True)
+        sys.exit(2)
+    os.environ['DATABASE_URL'] = bench_db
+    os.environ.setdefault('TRACING', '0')
+
+    import init_db
+    init_db.init_database()
+    from database.connection import db_pool
+    if not db_pool.init_pool():
+        sys.exit(1)
+    seed(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import os
+import time
+
+# Offline stand-ins for the external providers. Each sleeps for a fixed, small
+# latency so results reflect our own code paths rather than network jitter.
+STUB_LATENCY = float(os.getenv('BENCH_STUB_LATENCY', '0'))
+
+class StubTranslator:
+    def __init__(self, source='auto', target='en'):
+        self.source = source
+        self.target = target
+
+    def translate(self, text):
+        if STUB_LATENCY:
+            time.sleep(STUB_LATENCY)
+        return f"{text}:{self.target}"
+
+def stub_translation_api_call(text, speaker_lang, listener_lang):
+    if STUB_LATENCY:
+        time.sleep(STUB_LATENCY)
+    return f"{text}:{listener_lang}"
+
+def stub_save_to_file(text, lang='en', filename='output.mp3'):
+    if STUB_LATENCY:
+        time.sleep(STUB_LATENCY)
+    with open(filename, 'wb') as f:
+        f.write(b'ID3' + text.encode('utf-8'))
+    return filename
+
+def stub_generate_audio_file(base, pos):
+    return True
+
+def install(server):
+    server.GoogleTranslator = StubTranslator
+    server.translation_api_call = stub_translation_api_call
+    server.save_to_file = stub_save_to_file
+    server.generate_audio_file = stub_generate_audio_file
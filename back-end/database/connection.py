@@ -1,55 +1,267 @@
 import psycopg2
-import psycopg2.pool
+import psycopg2.extensions
+from contextlib import contextmanager
 from typing import Optional
 import os
+import threading
+import time
+
+POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+MAX_AGE = float(os.getenv('DB_POOL_MAX_AGE', '1800'))
+# Idle connections older than this are pinged before being handed out
+PING_AFTER_IDLE = float(os.getenv('DB_POOL_PING_AFTER', '30'))
+
+class PoolTimeout(Exception):
+    pass
+
+class PooledConnection(psycopg2.extensions.connection):
+    # Per-connection state the pool and query layer need: age and prepared statement names
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.born = time.monotonic()
+        self.prepared = set()
 
 class DatabasePool:
     def __init__(self):
-        self.pool = None
-    
+        self.ready = False
+        self.minconn = POOL_MIN
+        self.maxconn = POOL_MAX
+        self.timeout = CHECKOUT_TIMEOUT
+        self.max_age = MAX_AGE
+        self.in_use = 0
+        self.exhausted = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+        self.broken = 0
+        self.recycled = 0
+        self._connect_args = None
+        self._on_connect = []
+        self._idle = []
+        self._out = set()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+    def on_connect(self, fn):
+        # fn(conn) runs once for every new physical connection; failures are logged, not raised
+        self._on_connect.append(fn)
+        return fn
+
+    def _connect(self):
+        args, kwargs = self._connect_args
+        conn = psycopg2.connect(*args, connection_factory=PooledConnection, **kwargs)
+        for fn in self._on_connect:
+            try:
+                fn(conn)
+            except Exception as e:
+                print(f"db_on_connect_error: {e}", flush=True)
+        return conn
+
+    def _open_initial(self, args, kwargs) -> bool:
+        self._connect_args = (args, kwargs)
+        conns = [self._connect() for _ in range(max(self.minconn, 1))]
+        with self._lock:
+            now = time.monotonic()
+            self._idle = [(c, now) for c in conns]
+            self._opened = len(conns)
+            self.ready = True
+        return True
+
     def init_pool(self) -> bool:
         db_url = os.getenv('DATABASE_URL')
         if db_url:
             try:
-                self.pool = psycopg2.pool.ThreadedConnectionPool(
-                    minconn=1,
-                    maxconn=10,
-                    dsn=db_url
-                )
-                print("✓ Database connected (via DATABASE_URL)", flush=True)
+                self._open_initial((db_url,), {})
+                print(f"✓ Database connected (via DATABASE_URL), pool {self.minconn}-{self.maxconn}", flush=True)
                 return True
             except Exception as e:
                 print(f"db_init_error (url): {e}", flush=True)
-        
+
         try:
             # Try to get current user as fallback if DB_USER not set
             default_user = os.getenv('DB_USER', os.getenv('USER', 'postgres'))
-            self.pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=10,
+            self._open_initial((), dict(
                 host=os.getenv('DB_HOST', 'localhost'),
                 port=os.getenv('DB_PORT', '5432'),
                 database=os.getenv('DB_NAME', 'lexipark'),
                 user=default_user,
                 password=os.getenv('DB_PASSWORD', 'lexipark2024')
-            )
-            print("✓ Database connected to local PostgreSQL", flush=True)
+            ))
+            print(f"✓ Database connected to local PostgreSQL, pool {self.minconn}-{self.maxconn}", flush=True)
             return True
         except Exception as e:
             print(f"db_init_error: {e}", flush=True)
             return False
-    
-    def get_connection(self) -> Optional[psycopg2.extensions.connection]:
-        if not self.pool:
-            return None
+
+    def open_dedicated(self):
+        # A connection outside the pool for long-lived work such as LISTEN
+        if not self._connect_args:
+            raise PoolTimeout('pool_not_initialized')
+        args, kwargs = self._connect_args
+        return psycopg2.connect(*args, **kwargs)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _check(self, conn, idle_since: float) -> str:
+        if conn.closed:
+            return 'broken'
+        if time.monotonic() - conn.born > self.max_age:
+            return 'recycled'
+        if time.monotonic() - idle_since < PING_AFTER_IDLE:
+            return 'ok'
         try:
-            return self.pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            conn.rollback()
+            return 'ok'
         except Exception:
+            return 'broken'
+
+    def checkout(self, timeout: float = None):
+        # Waits up to `timeout` for a free slot; raises PoolTimeout when the pool stays saturated
+        if not self.ready:
+            raise PoolTimeout('pool_not_initialized')
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        with self._available:
+            while not self._idle and self._opened >= self.maxconn:
+                if not self.ready:
+                    raise PoolTimeout('pool_closed')
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.exhausted += 1
+                    self.wait_seconds += time.monotonic() - started
+                    raise PoolTimeout(f'no connection available after {timeout:.1f}s ({self.maxconn} in use)')
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                self.waiting += 1
+                self._available.wait(remaining)
+                self.waiting -= 1
+            if waited:
+                self.wait_seconds += time.monotonic() - started
+            self.checkouts += 1
+            self.in_use += 1
+            if self._idle:
+                conn, idle_since = self._idle.pop()
+            else:
+                conn, idle_since = None, None
+                self._opened += 1
+
+        # Validation and connecting happen outside the lock; the slot is already reserved
+        try:
+            if conn is not None:
+                state = self._check(conn, idle_since)
+                if state != 'ok':
+                    with self._lock:
+                        if state == 'recycled':
+                            self.recycled += 1
+                        else:
+                            self.broken += 1
+                    self._discard(conn)
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+            with self._lock:
+                self._out.add(conn)
+            return conn
+        except Exception:
+            with self._available:
+                self.in_use -= 1
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def get_connection(self) -> Optional[psycopg2.extensions.connection]:
+        try:
+            return self.checkout()
+        except PoolTimeout as e:
+            print(f"db_pool_timeout: {e}", flush=True)
+            return None
+        except Exception as e:
+            print(f"db_connect_error: {e}", flush=True)
             return None
-    
-    def return_connection(self, conn: psycopg2.extensions.connection):
-        if self.pool and conn:
-            self.pool.putconn(conn)
 
-db_pool = DatabasePool()
+    def return_connection(self, conn: psycopg2.extensions.connection, discard: bool = False):
+        if not conn:
+            return
+        with self._lock:
+            if conn not in self._out:
+                return
+            self._out.discard(conn)
+            # Connections handed out before closeall() are closed as they come back
+            closing = not self.ready
+        if not discard and not closing and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        broken = discard or conn.closed
+        if broken or closing:
+            self._discard(conn)
+        with self._available:
+            if broken:
+                self.broken += 1
+            self.in_use -= 1
+            if broken or closing:
+                self._opened -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.checkout(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.return_connection(conn, discard)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'min': self.minconn,
+                'max': self.maxconn,
+                'open': self._opened,
+                'idle': len(self._idle),
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_seconds': round(self.wait_seconds, 3),
+                'timeouts': self.exhausted,
+                'broken': self.broken,
+                'recycled': self.recycled,
+            }
 
+    def closeall(self) -> int:
+        # Closes the idle connections and fails any waiting checkout. A connection still checked
+        # out is closed when it is returned rather than under the query using it; the count of
+        # those is returned.
+        with self._available:
+            self.ready = False
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            out = len(self._out)
+            self._available.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+        return out
+
+db_pool = DatabasePool()
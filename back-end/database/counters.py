@@ -0,0 +1,119 @@
+import atexit
+import os
+import threading
+import time
+from psycopg2.extras import execute_values
+from .connection import db_pool
+
+WRITE_BEHIND = os.getenv('GLOBAL_VOCAB_WRITE_BEHIND', '1') != '0'
+FLUSH_INTERVAL = float(os.getenv('GLOBAL_VOCAB_FLUSH_INTERVAL', '2'))
+FLUSH_MAX_KEYS = int(os.getenv('GLOBAL_VOCAB_FLUSH_MAX_KEYS', '5000'))
+# While flushes keep failing, deltas for words not yet buffered are dropped past this many keys
+MAX_PENDING_KEYS = int(os.getenv('GLOBAL_VOCAB_MAX_PENDING_KEYS', '100000'))
+
+class CountBuffer:
+    # Accumulates global_vocab.count deltas in memory and applies them in one
+    # UPDATE ... FROM (VALUES ...), so hot words take one row lock per flush instead of
+    # one per ingest.
+    def __init__(self, interval: float, max_keys: int, max_pending: int):
+        self.interval = interval
+        self.max_keys = max_keys
+        self.max_pending = max_pending
+        self.pending = {}
+        self.oldest = None
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_staleness = 0.0
+        self.max_staleness = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, base: str, pos: str, delta: int = 1):
+        with self._lock:
+            key = (base, pos)
+            if key not in self.pending and len(self.pending) >= self.max_pending:
+                self.dropped += delta
+                return
+            self.pending[key] = self.pending.get(key, 0) + delta
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            full = len(self.pending) >= self.max_keys
+        if self._thread is None:
+            self._start()
+        if full:
+            self._wake.set()
+
+    def staleness(self) -> float:
+        oldest = self.oldest
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self.pending = self.pending, {}
+                oldest, self.oldest = self.oldest, None
+            if not batch:
+                return 0
+            # Sorted keys give every process the same lock order, so concurrent flushes cannot deadlock
+            rows = sorted((b, p, d) for (b, p), d in batch.items() if d)
+            try:
+                with db_pool.connection() as conn:
+                    cursor = conn.cursor()
+                    execute_values(cursor, """
+                        UPDATE global_vocab AS g SET count = g.count + v.delta
+                        FROM (VALUES %s) AS v(base, pos, delta)
+                        WHERE g.base = v.base AND g.pos = v.pos
+                    """, rows, template='(%s, %s, %s::integer)', page_size=1000)
+                    conn.commit()
+            except Exception as e:
+                print(f"global_vocab_flush_error: {e}", flush=True)
+                with self._lock:
+                    for key, delta in batch.items():
+                        if key not in self.pending and len(self.pending) >= self.max_pending:
+                            self.dropped += delta
+                            continue
+                        self.pending[key] = self.pending.get(key, 0) + delta
+                    if oldest is not None and (self.oldest is None or oldest < self.oldest):
+                        self.oldest = oldest
+                    self.failures += 1
+                return 0
+            staleness = time.monotonic() - oldest if oldest is not None else 0.0
+            with self._lock:
+                self.flushes += 1
+                self.flushed_rows += len(rows)
+                self.last_staleness = staleness
+                self.max_staleness = max(self.max_staleness, staleness)
+            return len(rows)
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name='global-vocab-counts', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending_keys': len(self.pending),
+                'staleness_seconds': round(self.staleness(), 3),
+                'last_flush_staleness_seconds': round(self.last_staleness, 3),
+                'max_staleness_seconds': round(self.max_staleness, 3),
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows,
+                'failures': self.failures,
+                'dropped': self.dropped,
+            }
+
+global_vocab_counts = CountBuffer(FLUSH_INTERVAL, FLUSH_MAX_KEYS, MAX_PENDING_KEYS)
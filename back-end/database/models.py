@@ -32,5 +32,6 @@ class AuthResult:
     user: Optional[User] = None
     token: Optional[str] = None
     error: str = ""
+    retry_after: Optional[float] = None
 
 
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from observability.startup import deferred
+
+# Loaded by the first sign-in or the background warm-up
+bcrypt = deferred('bcrypt', 'bcrypt')
+
+# Cost factor for new hashes; existing hashes with another cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# Hashes and checks run on PASSWORD_WORKERS threads of their own (bcrypt releases the GIL, so
+# request threads keep serving other routes meanwhile). At most PASSWORD_QUEUE more wait
+# behind them; past that, work is refused with PasswordBusy and answered with 503.
+WORKERS = int(os.getenv('PASSWORD_WORKERS', '2'))
+QUEUE = int(os.getenv('PASSWORD_QUEUE', '16'))
+# Roughly what one operation costs at cost factor 12 on a server core, until measured
+INITIAL_COST = 0.25 * 2 ** (BCRYPT_ROUNDS - 12)
+
+class PasswordBusy(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f'password work saturated, retry in {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+class PasswordUnavailable(Exception):
+    pass
+
+class PasswordPool:
+    # A fixed set of bcrypt threads with bounded admission. Each operation's duration feeds a
+    # moving average, which turns the backlog into the Retry-After a refused caller is given.
+    # Per-client limits are applied before this, in api/ratelimit.py.
+    def __init__(self, workers: int, queue: int, initial_cost: float):
+        self.workers = max(workers, 1)
+        self.limit = self.workers + max(queue, 0)
+        self.cost = initial_cost
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+
+    def _admit(self):
+        if not bcrypt:
+            raise PasswordUnavailable('bcrypt is not installed')
+        with self._lock:
+            if self.pending >= self.limit:
+                self.rejected += 1
+                raise PasswordBusy((self.pending - self.workers + 1) * self.cost / self.workers)
+            self.pending += 1
+
+    def _timed(self, fn, args):
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.completed += 1
+                self.busy_seconds += elapsed
+                self.cost += (elapsed - self.cost) * 0.2
+
+    def run(self, fn, *args):
+        # Blocks the calling request thread only; raises PasswordBusy without waiting when the
+        # queue is full
+        self._admit()
+        try:
+            return self._executor.submit(self._timed, fn, args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    @property
+    def queued(self) -> int:
+        return max(self.pending - self.workers, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pending': self.pending,
+                'queued': self.queued,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'cost_seconds': round(self.cost, 4),
+            }
+
+pool = PasswordPool(WORKERS, QUEUE, INITIAL_COST)
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(password: str, hash: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hash.encode('utf-8'))
+
+def hash_password(password: str, rounds: int = None) -> str:
+    return pool.run(_hash, password, rounds or BCRYPT_ROUNDS)
+
+def verify_password(password: str, hash: str) -> bool:
+    try:
+        return pool.run(_check, password, hash)
+    except ValueError:
+        # Not a bcrypt hash (e.g. a placeholder from a migration)
+        return False
+
+def needs_rehash(hash: str) -> bool:
+    # "$2b$12$..." -> 12
+    try:
+        return int(hash.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
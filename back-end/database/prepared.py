@@ -0,0 +1,45 @@
+import os
+import re
+
+PREPARED_STATEMENTS = os.getenv('DB_PREPARED', '1') != '0'
+
+STATEMENTS = {}
+
+def statement(name: str, sql: str):
+    STATEMENTS[name] = sql
+    return name
+
+def to_positional(sql: str) -> str:
+    n = 0
+    def repl(_):
+        nonlocal n
+        n += 1
+        return f'${n}'
+    return re.sub(r'%s', repl, sql)
+
+def prepare_all(conn):
+    # Each PREPARE runs in its own autocommit transaction so one failure (e.g. a table that
+    # init_db has not created yet) leaves the others usable; unprepared names fall back to
+    # plain execution.
+    if not PREPARED_STATEMENTS:
+        return
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        for name, sql in STATEMENTS.items():
+            try:
+                cursor.execute(f"PREPARE {name} AS {to_positional(sql)}")
+                conn.prepared.add(name)
+            except Exception as e:
+                print(f"db_prepare_error {name}: {e}", flush=True)
+    finally:
+        conn.autocommit = False
+
+def execute(cursor, name: str, params=()):
+    if name in getattr(cursor.connection, 'prepared', ()):
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+    else:
+        cursor.execute(STATEMENTS[name], params)
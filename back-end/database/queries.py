@@ -1,118 +1,194 @@
 import psycopg2
+from psycopg2.extras import execute_values
 from typing import Optional
 from .connection import db_pool
+from . import prepared
+from . import vocab_cache
+from .counters import global_vocab_counts, WRITE_BEHIND
 from .models import User, UserCreate, UserLogin, AuthResult
-import bcrypt
+from .passwords import hash_password, verify_password, needs_rehash, PasswordBusy, PasswordUnavailable
+from observability.tracing import traced
+from observability.metrics import record_cache
+from logic.text import jamo
 import jwt
 import os
 from datetime import datetime, timedelta, timezone
 import math
 
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+# Languages are rows in vocab_translation, so supporting another one is a config change
+TRANSLATION_LANGS = tuple(l.strip() for l in os.getenv('TRANSLATION_LANGS', 'en,ru,zh,vi').split(',') if l.strip())
 
-def verify_password(password: str, hash: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hash.encode('utf-8'))
+def translation_lang(lang: str) -> str:
+    return lang if lang in TRANSLATION_LANGS else TRANSLATION_LANGS[0]
 
+USER_COLUMNS = "id, username, email, password_hash, created_at, native_language, target_language, last_login"
+prepared.statement('user_by_name', f"SELECT {USER_COLUMNS} FROM users WHERE username = %s")
+prepared.statement('user_by_id', f"SELECT {USER_COLUMNS} FROM users WHERE id = %s")
+prepared.statement('global_vocab_get', f"SELECT {vocab_cache.ROW_SQL} FROM global_vocab WHERE base = %s AND pos = %s")
+prepared.statement('global_vocab_increment', "UPDATE global_vocab SET count = count + 1 WHERE base = %s AND pos = %s")
+prepared.statement('user_vocab_upsert', """
+    INSERT INTO vocab (user_id, base, pos, count, last_added)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (user_id, base, pos)
+    DO UPDATE SET
+        count = vocab.count + EXCLUDED.count,
+        last_added = EXCLUDED.last_added
+""")
+prepared.statement('vocab_remember', """
+    UPDATE vocab
+    SET remember_count = remember_count + 1,
+        last_remember_at = %s
+    WHERE user_id = %s AND base = %s AND pos = %s
+""")
+prepared.statement('vocab_dont_remember', """
+    UPDATE vocab
+    SET dont_remember_count = dont_remember_count + 1
+    WHERE user_id = %s AND base = %s AND pos = %s
+""")
+prepared.statement('user_vocab_list', """
+    SELECT v.base, t.text, v.pos, v.count, v.last_added, g.audio_path,
+           v.remember_count, v.dont_remember_count, v.last_remember_at
+    FROM vocab v
+    LEFT JOIN global_vocab g ON v.base = g.base AND v.pos = g.pos
+    LEFT JOIN vocab_translation t ON t.base = v.base AND t.pos = v.pos AND t.lang = %s
+    WHERE v.user_id = %s
+    ORDER BY v.last_added DESC
+""")
+prepared.statement('global_vocab_upsert', f"""
+    INSERT INTO global_vocab (base, pos, audio_path, count, base_jamo)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (base, pos)
+    DO UPDATE SET count = global_vocab.count + EXCLUDED.count
+    RETURNING {vocab_cache.ROW_SQL}
+""")
+# Adds units to today's (UTC) row only while the total stays within the limit, the day's first
+# charge included; no row comes back when it would not, so the check and the charge are one
+# statement across all workers
+prepared.statement('quota_charge', """
+    INSERT INTO api_usage (user_id, day, units)
+    SELECT %s, (now() AT TIME ZONE 'utc')::date, %s::integer
+    WHERE %s::integer <= %s::integer
+    ON CONFLICT (user_id, day)
+    DO UPDATE SET units = api_usage.units + EXCLUDED.units
+    WHERE api_usage.units + EXCLUDED.units <= %s
+    RETURNING units
+""")
+prepared.statement('translation_get', "SELECT text FROM vocab_translation WHERE base = %s AND pos = %s AND lang = %s")
+prepared.statement('translation_upsert', """
+    INSERT INTO vocab_translation (base, pos, lang, text, source, updated_at)
+    VALUES (%s, %s, %s, %s, %s, now())
+    ON CONFLICT (base, pos, lang)
+    DO UPDATE SET text = EXCLUDED.text, source = EXCLUDED.source, updated_at = EXCLUDED.updated_at
+""")
+
+db_pool.on_connect(prepared.prepare_all)
+
+@traced('db.create_user')
 def create_user(user_data: UserCreate) -> AuthResult:
-    conn = db_pool.get_connection()
-    if not conn:
-        return AuthResult(success=False, error="db_connection_failed")
+    if user_data.native_language and user_data.target_language:
+        if user_data.native_language == user_data.target_language:
+            return AuthResult(success=False, error="same_languages")
     
+    # Hash before checking out a connection so the pool is not held for the bcrypt work
     try:
-        if user_data.native_language and user_data.target_language:
-            if user_data.native_language == user_data.target_language:
-                return AuthResult(success=False, error="same_languages")
-        
-        cursor = conn.cursor()
         password_hash = hash_password(user_data.password)
+    except PasswordBusy as e:
+        return AuthResult(success=False, error="auth_busy", retry_after=e.retry_after)
+    except PasswordUnavailable:
+        return AuthResult(success=False, error="auth_unavailable")
+    
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO users (username, email, password_hash, native_language, target_language, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id, username, email, password_hash, created_at, native_language, target_language
+            """, (user_data.username, user_data.email, password_hash, 
+                  user_data.native_language, user_data.target_language, datetime.now()))
         
-        cursor.execute("""
-            INSERT INTO users (username, email, password_hash, native_language, target_language, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id, username, email, password_hash, created_at, native_language, target_language
-        """, (user_data.username, user_data.email, password_hash, 
-              user_data.native_language, user_data.target_language, datetime.now()))
-        
-        row = cursor.fetchone()
-        user = User(id=row[0], username=row[1], email=row[2], 
-                   password_hash=row[3], created_at=row[4], 
-                   native_language=row[5], target_language=row[6])
+            row = cursor.fetchone()
+            user = User(id=row[0], username=row[1], email=row[2], 
+                       password_hash=row[3], created_at=row[4], 
+                       native_language=row[5], target_language=row[6])
         
-        token = generate_token(user.id)
-        conn.commit()
-        return AuthResult(success=True, user=user, token=token)
+            token = generate_token(user.id)
+            conn.commit()
+            return AuthResult(success=True, user=user, token=token)
         
-    except psycopg2.IntegrityError:
-        return AuthResult(success=False, error="user_exists")
-    except Exception as e:
-        return AuthResult(success=False, error=str(e))
-    finally:
-        db_pool.return_connection(conn)
+        except psycopg2.IntegrityError:
+            return AuthResult(success=False, error="user_exists")
+        except Exception as e:
+            return AuthResult(success=False, error=str(e))
 
+@traced('db.authenticate_user')
 def authenticate_user(login_data: UserLogin) -> AuthResult:
-    conn = db_pool.get_connection()
-    if not conn:
-        return AuthResult(success=False, error="db_connection_failed")
+    # Two short checkouts around the password check rather than one held through it
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'user_by_name', (login_data.username,))
+            row = cursor.fetchone()
+        except Exception as e:
+            return AuthResult(success=False, error=str(e))
+    
+    if not row:
+        return AuthResult(success=False, error="user_not_found")
+    
+    user = User(id=row[0], username=row[1], email=row[2], 
+               password_hash=row[3], created_at=row[4],
+               native_language=row[5], target_language=row[6],
+               last_login=row[7])
     
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, username, email, password_hash, created_at, native_language, target_language, last_login
-            FROM users WHERE username = %s
-        """, (login_data.username,))
-        
-        row = cursor.fetchone()
-        if not row:
-            return AuthResult(success=False, error="user_not_found")
-        
-        user = User(id=row[0], username=row[1], email=row[2], 
-                   password_hash=row[3], created_at=row[4],
-                   native_language=row[5], target_language=row[6],
-                   last_login=row[7])
-        
         if not verify_password(login_data.password, user.password_hash):
             return AuthResult(success=False, error="invalid_password")
+    except PasswordBusy as e:
+        return AuthResult(success=False, error="auth_busy", retry_after=e.retry_after)
+    except PasswordUnavailable:
+        return AuthResult(success=False, error="auth_unavailable")
+    
+    # Hashes made with another cost factor are replaced while the plaintext is at hand; under
+    # load the upgrade is simply left for a later login
+    new_hash = None
+    if needs_rehash(user.password_hash):
+        try:
+            new_hash = hash_password(login_data.password)
+        except PasswordBusy:
+            pass
+    
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE users SET last_login = %s, password_hash = COALESCE(%s, password_hash) WHERE id = %s
+            """, (datetime.now(), new_hash, user.id))
         
-        cursor.execute("""
-            UPDATE users SET last_login = %s WHERE id = %s
-        """, (datetime.now(), user.id))
-        
-        token = generate_token(user.id)
-        conn.commit()
-        return AuthResult(success=True, user=user, token=token)
+            token = generate_token(user.id)
+            conn.commit()
+            return AuthResult(success=True, user=user, token=token)
         
-    except Exception as e:
-        return AuthResult(success=False, error=str(e))
-    finally:
-        db_pool.return_connection(conn)
+        except Exception as e:
+            return AuthResult(success=False, error=str(e))
 
+@traced('db.get_user_by_id')
 def get_user_by_id(user_id: int) -> Optional[User]:
-    conn = db_pool.get_connection()
-    if not conn:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, username, email, password_hash, created_at, native_language, target_language, last_login
-            FROM users WHERE id = %s
-        """, (user_id,))
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'user_by_id', (user_id,))
         
-        row = cursor.fetchone()
-        if not row:
-            return None
+            row = cursor.fetchone()
+            if not row:
+                return None
         
-        return User(id=row[0], username=row[1], email=row[2], 
-                   password_hash=row[3], created_at=row[4], 
-                   native_language=row[5], target_language=row[6],
-                   last_login=row[7])
+            return User(id=row[0], username=row[1], email=row[2], 
+                       password_hash=row[3], created_at=row[4], 
+                       native_language=row[5], target_language=row[6],
+                       last_login=row[7])
         
-    except Exception:
-        return None
-    finally:
-        db_pool.return_connection(conn)
+        except Exception:
+            return None
 
 def generate_token(user_id: int) -> str:
     payload = {
@@ -132,43 +208,95 @@ def verify_token(token: str) -> Optional[int]:
     except jwt.InvalidTokenError:
         return None
 
+@traced('db.get_all_vocab')
 def get_all_vocab():
-    conn = db_pool.get_connection()
-    if not conn:
-        return []
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT base, translation, pos, count, last_added, audio_path
-            FROM vocab
-            ORDER BY last_added DESC
-        """)
-        rows = cursor.fetchall()
-        return [{'base': r[0], 'translation': r[1], 'pos': r[2], 'frequency': r[3], 'last_seen': r[4].isoformat() if r[4] else '', 'audio_path': r[5]} for r in rows]
-    except Exception:
-        return []
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT base, translation, pos, count, last_added, audio_path
+                FROM vocab
+                ORDER BY last_added DESC
+            """)
+            rows = cursor.fetchall()
+            return [{'base': r[0], 'translation': r[1], 'pos': r[2], 'frequency': r[3], 'last_seen': r[4].isoformat() if r[4] else '', 'audio_path': r[5]} for r in rows]
+        except Exception:
+            return []
+
+# Admin listings and exports page by primary key, so keyset pages are range scans and a row
+# cannot move between pages while it is being paged through (count changes all the time).
+STREAM_BATCH = int(os.getenv('DB_STREAM_BATCH', '2000'))
+
+GLOBAL_VOCAB_LIST_SQL = """
+    SELECT g.base, g.pos, g.audio_path, g.count,
+           (SELECT COALESCE(json_object_agg(t.lang, t.text), '{}')
+            FROM vocab_translation t WHERE t.base = g.base AND t.pos = g.pos)
+    FROM global_vocab g
+    {where}
+    ORDER BY g.base, g.pos
+"""
+USER_LIST_SQL = """
+    SELECT id, username, email, native_language, target_language, created_at, last_login
+    FROM users
+    {where}
+    ORDER BY id DESC
+"""
+
+def global_vocab_entry(r):
+    entry = {'base': r[0], 'pos': r[1], 'audio_path': r[2], 'count': r[3], 'translations': r[4]}
+    for lang in TRANSLATION_LANGS:
+        entry[f'translation_{lang}'] = r[4].get(lang)
+    return entry
 
+def user_list_entry(r):
+    return {'id': r[0], 'username': r[1], 'email': r[2], 'native_language': r[3], 'target_language': r[4], 'created_at': r[5] or '', 'last_login': r[6] or ''}
+
+def stream_rows(name: str, sql: str, params=()):
+    # Rows from a server-side (named) cursor, fetched STREAM_BATCH at a time, so memory stays
+    # flat however large the table is. The connection is held until the generator is exhausted
+    # or closed. Unlike the other query helpers this raises on failure: a stream that already
+    # started cannot be turned into an empty result.
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(name=name)
+        cursor.itersize = STREAM_BATCH
+        cursor.execute(sql, params)
+        yield from cursor
+
+def iter_global_vocab(after=None):
+    where, params = ("WHERE (g.base, g.pos) > (%s, %s)", tuple(after)) if after else ('', ())
+    for r in stream_rows('global_vocab_export', GLOBAL_VOCAB_LIST_SQL.format(where=where), params):
+        yield global_vocab_entry(r)
+
+def iter_users(after=None):
+    where, params = ("WHERE id < %s", tuple(after)) if after else ('', ())
+    for r in stream_rows('users_export', USER_LIST_SQL.format(where=where), params):
+        yield user_list_entry(r)
+
+@traced('db.get_all_global_vocab')
 def get_all_global_vocab():
-    conn = db_pool.get_connection()
-    if not conn:
-        return []
-    
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT base, pos, translation_en, translation_ru, translation_zh, translation_vi, audio_path, count
-            FROM global_vocab
-            ORDER BY count DESC
-        """)
-        rows = cursor.fetchall()
-        return [{'base': r[0], 'pos': r[1], 'translation_en': r[2], 'translation_ru': r[3], 'translation_zh': r[4], 'translation_vi': r[5], 'audio_path': r[6], 'count': r[7]} for r in rows]
+        return list(iter_global_vocab())
     except Exception:
         return []
-    finally:
-        db_pool.return_connection(conn)
+
+@traced('db.get_global_vocab_page')
+def get_global_vocab_page(limit: int, after=None):
+    # after is the (base, pos) of the previous page's last row; returns (items, next_after)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            if after:
+                sql = GLOBAL_VOCAB_LIST_SQL.format(where="WHERE (g.base, g.pos) > (%s, %s)")
+                params = [after[0], after[1]]
+            else:
+                sql = GLOBAL_VOCAB_LIST_SQL.format(where='')
+                params = []
+            cursor.execute(sql + " LIMIT %s", params + [limit + 1])
+            rows = cursor.fetchall()
+            last = rows[limit - 1] if len(rows) > limit else None
+            return [global_vocab_entry(r) for r in rows[:limit]], (last[0], last[1]) if last else None
+        except Exception:
+            return [], None
 
 def normalize_dt(value):
     if not value:
@@ -191,346 +319,809 @@ def compute_retention(entry):
     k = remember_count / (dont_count + 1)
     return math.exp(-10 * x / math.exp(k))
 
+def user_vocab_entry(r):
+    # r is a row in user_vocab_list column order. Timestamps stay datetimes; the response
+    # encoder writes them as ISO 8601 strings.
+    entry = {
+        'base': r[0],
+        'translation': r[1],
+        'pos': r[2],
+        'frequency': r[3],
+        'last_seen': r[4] or '',
+        'audio_path': r[5],
+        'remember_count': r[6] or 0,
+        'dont_remember_count': r[7] or 0,
+        'last_remember_at': r[8]
+    }
+    entry['retention'] = compute_retention(entry)
+    entry['last_remember_at'] = entry['last_remember_at'] or ''
+    return entry
+
+@traced('db.get_user_vocab')
 def get_user_vocab(user_id: int, native_language: str = 'en'):
-    conn = db_pool.get_connection()
-    if not conn:
-        return []
-    
-    valid_langs = {'en', 'ru', 'zh', 'vi'}
-    lang = native_language if native_language in valid_langs else 'en'
-    translation_col = f'translation_{lang}'
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            SELECT v.base, g.{translation_col}, v.pos, v.count, v.last_added, g.audio_path,
-                   v.remember_count, v.dont_remember_count, v.last_remember_at
-            FROM vocab v
-            LEFT JOIN global_vocab g ON v.base = g.base AND v.pos = g.pos
-            WHERE v.user_id = %s
-            ORDER BY v.last_added DESC
-        """, (user_id,))
-        rows = cursor.fetchall()
-        result = []
-        for r in rows:
-            entry = {
-                'base': r[0],
-                'translation': r[1],
-                'pos': r[2],
-                'frequency': r[3],
-                'last_seen': r[4].isoformat() if r[4] else '',
-                'audio_path': r[5],
-                'remember_count': r[6] or 0,
-                'dont_remember_count': r[7] or 0,
-                'last_remember_at': r[8]
-            }
-            entry['retention'] = compute_retention(entry)
-            entry['last_remember_at'] = entry['last_remember_at'].isoformat() if entry['last_remember_at'] else ''
-            result.append(entry)
-        return result
-    except Exception:
-        return []
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'user_vocab_list', (translation_lang(native_language), user_id))
+            rows = cursor.fetchall()
+            return [user_vocab_entry(r) for r in rows]
+        except Exception:
+            return []
+
+def get_global_vocab_row(base: str, pos: str):
+    # Row tuple in vocab_cache.COLUMNS order, MISSING when the word does not exist, None on error
+    row = vocab_cache.lookup(base, pos)
+    if vocab_cache.CACHE_ENABLED:
+        record_cache('global_vocab', row is not None)
+    if row is not None:
+        return row
+    generation = vocab_cache.cache.generation
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'global_vocab_get', (base, pos))
+            row = cursor.fetchone() or vocab_cache.MISSING
+            vocab_cache.store(base, pos, row, overwrite=False, generation=generation)
+            return row
+        except Exception:
+            return None
 
+@traced('db.get_global_vocab')
 def get_global_vocab(base: str, pos: str):
-    conn = db_pool.get_connection()
-    if not conn:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT base, pos, translation_en, translation_ru, translation_zh, translation_vi, audio_path, count
-            FROM global_vocab
-            WHERE base = %s AND pos = %s
-        """, (base, pos))
-        row = cursor.fetchone()
-        if row:
-            return {'base': row[0], 'pos': row[1], 'translation_en': row[2], 'translation_ru': row[3], 'translation_zh': row[4], 'translation_vi': row[5], 'audio_path': row[6], 'count': row[7]}
-        return None
-    except Exception:
-        return None
-    finally:
-        db_pool.return_connection(conn)
+    return vocab_cache.as_dict(base, pos, get_global_vocab_row(base, pos))
 
-def upsert_global_vocab(base: str, pos: str, translation: str, audio_path: str, target_lang: str = 'en'):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    valid_langs = {'en', 'ru', 'zh', 'vi'}
-    lang = target_lang if target_lang in valid_langs else 'en'
-    translation_col = f'translation_{lang}'
+@traced('db.get_top_global_vocab')
+def get_top_global_vocab(limit: int):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT base, pos, {vocab_cache.ROW_SQL} FROM global_vocab ORDER BY count DESC LIMIT %s", (limit,))
+            return cursor.fetchall()
+        except Exception:
+            return []
+
+def warm_global_vocab_cache(limit: int = vocab_cache.PRELOAD_ROWS) -> int:
+    if not vocab_cache.CACHE_ENABLED or limit <= 0:
+        return 0
+    generation = vocab_cache.cache.generation
+    rows = get_top_global_vocab(limit)
+    for r in rows:
+        vocab_cache.store(r[0], r[1], r[2:], overwrite=False, generation=generation)
+    return len(rows)
+
+@traced('db.upsert_global_vocab')
+def upsert_global_vocab(base: str, pos: str, translation: str, audio_path: str, target_lang: str = 'en', source: str = 'machine'):
+    lang = translation_lang(target_lang)
     
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            INSERT INTO global_vocab (base, pos, {translation_col}, audio_path, count)
-            VALUES (%s, %s, %s, %s, 1)
-            ON CONFLICT (base, pos)
-            DO UPDATE SET 
-                {translation_col} = COALESCE(EXCLUDED.{translation_col}, global_vocab.{translation_col}),
-                count = global_vocab.count + 1
-        """, (base, pos, translation, audio_path))
-        conn.commit()
-        return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            # With write-behind the +1 goes through the counter buffer instead of this row update
+            prepared.execute(cursor, 'global_vocab_upsert', (base, pos, audio_path, 0 if WRITE_BEHIND else 1, jamo.decompose(base)))
+            row = cursor.fetchone()
+            if translation:
+                prepared.execute(cursor, 'translation_upsert', (base, pos, lang, translation, source))
+            vocab_cache.notify(cursor, base, pos)
+            conn.commit()
+            vocab_cache.store(base, pos, row)
+            if translation:
+                vocab_cache.store_translation(base, pos, lang, translation)
+            if WRITE_BEHIND:
+                global_vocab_counts.add(base, pos)
+                vocab_cache.cache.add_count((base, pos), 1)
+            return True
+        except Exception:
+            return False
 
+@traced('db.increment_global_vocab_count')
 def increment_global_vocab_count(base: str, pos: str):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE global_vocab 
-            SET count = count + 1
-            WHERE base = %s AND pos = %s
-        """, (base, pos))
-        conn.commit()
+    if WRITE_BEHIND:
+        global_vocab_counts.add(base, pos)
+        vocab_cache.cache.add_count((base, pos), 1)
         return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
 
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'global_vocab_increment', (base, pos))
+            conn.commit()
+            # Counts are not broadcast; other processes see them on their next read of the row
+            vocab_cache.cache.add_count((base, pos), 1)
+            return True
+        except Exception:
+            return False
+
+@traced('db.upsert_user_vocab')
 def upsert_user_vocab(user_id: int, base: str, pos: str, count_delta: int):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO vocab (user_id, base, pos, count, last_added)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (user_id, base, pos)
-            DO UPDATE SET
-                count = vocab.count + %s,
-                last_added = %s
-        """, (user_id, base, pos, count_delta, datetime.now(), count_delta, datetime.now()))
-        conn.commit()
-        return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'user_vocab_upsert', (user_id, base, pos, count_delta, datetime.now()))
+            conn.commit()
+            return True
+        except Exception:
+            return False
 
+@traced('db.get_vocab_translation')
 def get_vocab_translation(base: str, pos: str, target_lang: str = 'en'):
-    conn = db_pool.get_connection()
-    if not conn:
-        return None
-    
-    valid_langs = {'en', 'ru', 'zh', 'vi'}
-    lang = target_lang if target_lang in valid_langs else 'en'
-    translation_col = f'translation_{lang}'
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            SELECT {translation_col} FROM global_vocab WHERE base = %s AND pos = %s
-        """, (base, pos))
-        row = cursor.fetchone()
-        return row[0] if row and row[0] else None
-    except Exception:
-        return None
-    finally:
-        db_pool.return_connection(conn)
+    lang = translation_lang(target_lang)
+    hit, text = vocab_cache.lookup_translation(base, pos, lang)
+    if vocab_cache.CACHE_ENABLED:
+        record_cache('vocab_translation', hit)
+    if hit:
+        return text
+
+    generation = vocab_cache.translations.generation
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'translation_get', (base, pos, lang))
+            row = cursor.fetchone()
+            text = row[0] if row and row[0] else None
+            vocab_cache.store_translation(base, pos, lang, text, generation)
+            return text
+        except Exception:
+            return None
+
+@traced('db.get_translation_gaps')
+def get_translation_gaps(keys, langs=None):
+    # One anti-join over a batch of (base, pos): returns {(base, pos): {'missing', 'source_lang',
+    # 'source_text'}} for words that lack some language but have at least one translation to
+    # translate from
+    keys = list(keys)
+    if not keys:
+        return {}
+    langs = list(langs or TRANSLATION_LANGS)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT k.base, k.pos, array_agg(l.lang), src.lang, src.text
+                FROM unnest(%s::varchar[], %s::varchar[]) AS k(base, pos)
+                CROSS JOIN unnest(%s::varchar[]) AS l(lang)
+                CROSS JOIN LATERAL (
+                    SELECT t.lang, t.text FROM vocab_translation t
+                    WHERE t.base = k.base AND t.pos = k.pos
+                    ORDER BY array_position(%s::varchar[], t.lang) NULLS LAST
+                    LIMIT 1
+                ) src
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM vocab_translation t
+                    WHERE t.base = k.base AND t.pos = k.pos AND t.lang = l.lang
+                )
+                GROUP BY k.base, k.pos, src.lang, src.text
+            """, ([k[0] for k in keys], [k[1] for k in keys], langs, langs))
+            return {(r[0], r[1]): {'missing': r[2], 'source_lang': r[3], 'source_text': r[4]} for r in cursor.fetchall()}
+        except Exception:
+            return {}
 
+# Translation substring matches are only attempted from this length on: shorter patterns
+# cannot use the trigram index and would scan every translation row
+SEARCH_MIN_TRIGRAM = 3
+
+def like_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_hits_sql(q: str):
+    # (sql, params) selecting the (base, pos) keys that match q. The query is decomposed into
+    # keyboard jamo and matched as a prefix of global_vocab.base_jamo, so "한" finds "하나";
+    # non-Korean queries also match translations by substring through the pg_trgm index.
+    parts = ["SELECT base, pos FROM global_vocab WHERE base_jamo LIKE %s"]
+    params = [like_escape(jamo.decompose(q)) + '%']
+    if translation_search(q):
+        parts.append("SELECT base, pos FROM vocab_translation WHERE text ILIKE %s")
+        params.append('%' + like_escape(q) + '%')
+    return ' UNION '.join(parts), params
+
+def search_match_sql(q: str):
+    # The same test as search_hits_sql as a condition on one joined row (global_vocab g, key
+    # v.base / v.pos), for scans that already walk a small set of keys
+    sql = "g.base_jamo LIKE %s"
+    params = [like_escape(jamo.decompose(q)) + '%']
+    if translation_search(q):
+        sql = f"""({sql} OR EXISTS (
+            SELECT 1 FROM vocab_translation m WHERE m.base = v.base AND m.pos = v.pos AND m.text ILIKE %s
+        ))"""
+        params.append('%' + like_escape(q) + '%')
+    return sql, params
+
+def translation_search(q: str) -> bool:
+    return not jamo.has_hangul(q) and len(q) >= SEARCH_MIN_TRIGRAM
+
+@traced('db.search_global_vocab')
+def search_global_vocab(q: str, lang: str = 'en', limit: int = 50, after=None):
+    # Ordered by base, pos, which nothing rewrites: count moves with every ingest (and the
+    # write-behind flush), so paging on it would skip or repeat rows. `after` is the (base,
+    # pos) of the last row of the previous page. Returns (items, next_after), next_after being
+    # None on the last page.
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            hits, params = search_hits_sql(q)
+            params.append(translation_lang(lang))
+            keyset = ''
+            if after:
+                keyset = "WHERE (g.base, g.pos) > (%s, %s)"
+                params += [after[0], after[1]]
+            params.append(limit + 1)
+            cursor.execute(f"""
+                WITH hits AS ({hits})
+                SELECT g.base, g.pos, g.count, g.audio_path, t.text
+                FROM hits h
+                JOIN global_vocab g ON g.base = h.base AND g.pos = h.pos
+                LEFT JOIN vocab_translation t ON t.base = g.base AND t.pos = g.pos AND t.lang = %s
+                {keyset}
+                ORDER BY g.base, g.pos
+                LIMIT %s
+            """, params)
+            rows = cursor.fetchall()
+            items = [{'base': r[0], 'pos': r[1], 'count': r[2], 'audio_path': r[3], 'translation': r[4] or ''} for r in rows[:limit]]
+            last = rows[limit - 1] if len(rows) > limit else None
+            return items, (last[0], last[1]) if last else None
+        except Exception as e:
+            print(f"db_search_error: {e}", flush=True)
+            return [], None
+
+@traced('db.search_user_vocab')
+def search_user_vocab(user_id: int, q: str, native_language: str = 'en', limit: int = 50, after=None):
+    # Same matching as search_global_vocab, restricted to one user's words and ordered like
+    # /vocab/list; `after` is the (last_added, base, pos) of the previous page's last row.
+    # The user's rows are walked in idx_vocab_user_last_added order and each is tested on its
+    # own, so a one-letter query costs at most that user's vocabulary, not every match in
+    # global_vocab.
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            match, match_params = search_match_sql(q)
+            params = [translation_lang(native_language), user_id]
+            keyset = ''
+            if after:
+                keyset = "AND (v.last_added < %s OR (v.last_added = %s AND (v.base, v.pos) > (%s, %s)))"
+                params += [after[0], after[0], after[1], after[2]]
+            params += match_params
+            params.append(limit + 1)
+            cursor.execute(f"""
+                SELECT v.base, t.text, v.pos, v.count, v.last_added, g.audio_path,
+                       v.remember_count, v.dont_remember_count, v.last_remember_at
+                FROM vocab v
+                JOIN global_vocab g ON v.base = g.base AND v.pos = g.pos
+                LEFT JOIN vocab_translation t ON t.base = v.base AND t.pos = v.pos AND t.lang = %s
+                WHERE v.user_id = %s {keyset} AND {match}
+                ORDER BY v.last_added DESC, v.base, v.pos
+                LIMIT %s
+            """, params)
+            rows = cursor.fetchall()
+            items = [user_vocab_entry(r) for r in rows[:limit]]
+            last = rows[limit - 1] if len(rows) > limit else None
+            return items, (last[4].isoformat(), last[0], last[2]) if last else None
+        except Exception as e:
+            print(f"db_search_error: {e}", flush=True)
+            return [], None
+
+@traced('db.upsert_vocab_item')
 def upsert_vocab_item(base: str, pos: str, translation: str, count_delta: int):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO vocab (base, pos, translation, count, last_added)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (base, pos)
-            DO UPDATE SET
-                count = vocab.count + %s,
-                translation = COALESCE(EXCLUDED.translation, vocab.translation),
-                last_added = %s
-        """, (base, pos, translation, count_delta, datetime.now(), count_delta, datetime.now()))
-        conn.commit()
-        return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO vocab (base, pos, translation, count, last_added)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (base, pos)
+                DO UPDATE SET
+                    count = vocab.count + %s,
+                    translation = COALESCE(EXCLUDED.translation, vocab.translation),
+                    last_added = %s
+            """, (base, pos, translation, count_delta, datetime.now(), count_delta, datetime.now()))
+            conn.commit()
+            return True
+        except Exception:
+            return False
 
+@traced('db.record_remember')
 def record_remember(user_id: int, base: str, pos: str):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE vocab 
-            SET remember_count = remember_count + 1,
-                last_remember_at = %s
-            WHERE user_id = %s AND base = %s AND pos = %s
-        """, (datetime.utcnow(), user_id, base, pos))
-        conn.commit()
-        return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'vocab_remember', (datetime.utcnow(), user_id, base, pos))
+            conn.commit()
+            return True
+        except Exception:
+            return False
 
+@traced('db.record_dont_remember')
 def record_dont_remember(user_id: int, base: str, pos: str):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE vocab 
-            SET dont_remember_count = dont_remember_count + 1
-            WHERE user_id = %s AND base = %s AND pos = %s
-        """, (user_id, base, pos))
-        conn.commit()
-        return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'vocab_dont_remember', (user_id, base, pos))
+            conn.commit()
+            return True
+        except Exception:
+            return False
 
+@traced('db.update_vocab_audio_path')
 def update_vocab_audio_path(base: str, pos: str, audio_path: str):
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE global_vocab 
-            SET audio_path = %s
-            WHERE base = %s AND pos = %s
-        """, (audio_path, base, pos))
-        conn.commit()
-        return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE global_vocab 
+                SET audio_path = %s
+                WHERE base = %s AND pos = %s
+                RETURNING {vocab_cache.ROW_SQL}
+            """, (audio_path, base, pos))
+            row = cursor.fetchone()
+            vocab_cache.notify(cursor, base, pos)
+            conn.commit()
+            vocab_cache.store(base, pos, row)
+            return True
+        except Exception:
+            return False
 
+@traced('db.get_vocab_without_audio')
 def get_vocab_without_audio():
-    conn = db_pool.get_connection()
-    if not conn:
-        return []
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT base, pos
-            FROM global_vocab
-            WHERE audio_path IS NULL OR audio_path = ''
-        """)
-        rows = cursor.fetchall()
-        return [{'base': r[0], 'pos': r[1]} for r in rows]
-    except Exception:
-        return []
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT base, pos
+                FROM global_vocab
+                WHERE audio_path IS NULL OR audio_path = ''
+            """)
+            rows = cursor.fetchall()
+            return [{'base': r[0], 'pos': r[1]} for r in rows]
+        except Exception:
+            return []
 
 def is_admin(username: str, password: str) -> bool:
     return username == 'admin' and password == 'lexiadmin2306'
 
-def get_all_users():
-    conn = db_pool.get_connection()
-    if not conn:
-        return []
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, username, email, native_language, target_language, created_at, last_login
-            FROM users
-            ORDER BY created_at DESC
-        """)
-        rows = cursor.fetchall()
-        return [{'id': r[0], 'username': r[1], 'email': r[2], 'native_language': r[3], 'target_language': r[4], 'created_at': r[5].isoformat() if r[5] else '', 'last_login': r[6].isoformat() if r[6] else ''} for r in rows]
-    except Exception:
-        return []
-    finally:
-        db_pool.return_connection(conn)
+@traced('db.get_users_page')
+def get_users_page(limit: int, after_id: int = None):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            if after_id is not None:
+                cursor.execute(USER_LIST_SQL.format(where="WHERE id < %s") + " LIMIT %s", (after_id, limit + 1))
+            else:
+                cursor.execute(USER_LIST_SQL.format(where='') + " LIMIT %s", (limit + 1,))
+            rows = cursor.fetchall()
+            return [user_list_entry(r) for r in rows[:limit]], rows[limit - 1][0] if len(rows) > limit else None
+        except Exception:
+            return [], None
 
+@traced('db.delete_user')
 def delete_user(user_id: int) -> bool:
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
-        conn.commit()
-        return cursor.rowcount > 0
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE audio_assets SET referenced = FALSE
+                WHERE path IN (SELECT audio_path FROM recordings WHERE user_id = %s)
+            """, (user_id,))
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+            deleted = cursor.rowcount > 0
+            conn.commit()
+            return deleted
+        except Exception:
+            return False
 
+@traced('db.delete_global_vocab')
 def delete_global_vocab(base: str, pos: str) -> bool:
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM global_vocab WHERE base = %s AND pos = %s", (base, pos))
-        conn.commit()
-        return cursor.rowcount > 0
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
-
-def update_global_vocab_translation(base: str, pos: str, translation: str, target_lang: str) -> bool:
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
-    
-    valid_langs = {'en', 'ru', 'zh', 'vi'}
-    lang = target_lang if target_lang in valid_langs else 'en'
-    translation_col = f'translation_{lang}'
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            UPDATE global_vocab 
-            SET {translation_col} = %s
-            WHERE base = %s AND pos = %s
-        """, (translation, base, pos))
-        conn.commit()
-        return cursor.rowcount > 0
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
-
-def save_recording(user_id: int, role: str, audio_path: str, transcript: str = None, language: str = None) -> bool:
-    conn = db_pool.get_connection()
-    if not conn:
-        return False
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM global_vocab WHERE base = %s AND pos = %s RETURNING audio_path", (base, pos))
+            row = cursor.fetchone()
+            if row and row[0]:
+                cursor.execute("""
+                    UPDATE audio_assets SET referenced = FALSE WHERE path = regexp_replace(%s, '^data/', '')
+                """, (row[0],))
+            vocab_cache.notify(cursor, base, pos)
+            conn.commit()
+            vocab_cache.forget(base, pos)
+            vocab_cache.store(base, pos, vocab_cache.MISSING)
+            return row is not None
+        except Exception:
+            return False
+
+@traced('db.update_global_vocab_translation')
+def update_global_vocab_translation(base: str, pos: str, translation: str, target_lang: str, source: str = 'admin') -> bool:
+    lang = translation_lang(target_lang)
     
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO recordings (user_id, role, audio_path, transcript, language, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (user_id, role, audio_path, transcript, language, datetime.now()))
-        conn.commit()
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM global_vocab WHERE base = %s AND pos = %s", (base, pos))
+            if not cursor.fetchone():
+                return False
+            if translation:
+                prepared.execute(cursor, 'translation_upsert', (base, pos, lang, translation, source))
+            else:
+                cursor.execute("DELETE FROM vocab_translation WHERE base = %s AND pos = %s AND lang = %s", (base, pos, lang))
+            vocab_cache.notify(cursor, base, pos)
+            conn.commit()
+            vocab_cache.store_translation(base, pos, lang, translation)
+            return True
+        except Exception:
+            return False
+
+@traced('db.charge_quota')
+def charge_quota(user_id: int, units: int, daily_limit: int) -> Optional[int]:
+    # Units used today after the charge, -1 when it would exceed daily_limit, None when the
+    # query failed (callers let the request through)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            prepared.execute(cursor, 'quota_charge', (user_id, units, units, daily_limit, daily_limit))
+            row = cursor.fetchone()
+            conn.commit()
+            return row[0] if row else -1
+        except Exception as e:
+            print(f"db_quota_error: {e}", flush=True)
+            conn.rollback()
+            return None
+
+@traced('db.get_quota_usage')
+def get_quota_usage(user_id: int) -> int:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT units FROM api_usage WHERE user_id = %s AND day = (now() AT TIME ZONE 'utc')::date", (user_id,))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        except Exception:
+            return 0
+
+@traced('db.save_recording')
+def save_recording(user_id: int, role: str, audio_path: str, transcript: str = None, language: str = None, size_bytes: int = None) -> bool:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO recordings (user_id, role, audio_path, transcript, language, created_at, size_bytes)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (user_id, role, audio_path, transcript, language, datetime.now(), size_bytes))
+            conn.commit()
+            return True
+        except Exception:
+            return False
+
+
+@traced('db.upsert_audio_asset')
+def upsert_audio_asset(path: str, kind: str, size_bytes: int, content_hash: str, mtime: float, referenced: Optional[bool] = None) -> bool:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO audio_assets (path, kind, size_bytes, content_hash, mtime, referenced, missing, indexed_at)
+                VALUES (%s, %s, %s, %s, %s, COALESCE(%s, FALSE), FALSE, %s)
+                ON CONFLICT (path)
+                DO UPDATE SET
+                    kind = EXCLUDED.kind,
+                    size_bytes = EXCLUDED.size_bytes,
+                    content_hash = EXCLUDED.content_hash,
+                    mtime = EXCLUDED.mtime,
+                    referenced = COALESCE(%s, audio_assets.referenced),
+                    missing = FALSE,
+                    indexed_at = EXCLUDED.indexed_at
+            """, (path, kind, size_bytes, content_hash, mtime, referenced, datetime.now(), referenced))
+            conn.commit()
+            return True
+        except Exception:
+            return False
+
+@traced('db.mark_audio_assets_missing')
+def mark_audio_assets_missing(paths) -> int:
+    if not paths:
+        return 0
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE audio_assets SET missing = TRUE, indexed_at = %s
+                WHERE path = ANY(%s) AND NOT missing
+            """, (datetime.now(), list(paths)))
+            conn.commit()
+            return cursor.rowcount
+        except Exception:
+            return 0
+
+@traced('db.get_audio_assets_under')
+def get_audio_assets_under(prefix: str):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            cursor.execute("""
+                SELECT path, size_bytes, mtime, missing FROM audio_assets WHERE path LIKE %s
+            """, (pattern,))
+            return {r[0]: {'size_bytes': r[1], 'mtime': r[2], 'missing': r[3]} for r in cursor.fetchall()}
+        except Exception:
+            return {}
+
+@traced('db.sync_audio_references')
+def sync_audio_references() -> bool:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO audio_assets (path, kind, referenced, missing)
+                SELECT DISTINCT regexp_replace(audio_path, '^data/', ''), 'tts', TRUE, TRUE
+                FROM global_vocab WHERE audio_path IS NOT NULL AND audio_path <> ''
+                ON CONFLICT (path) DO NOTHING
+            """)
+            cursor.execute("""
+                INSERT INTO audio_assets (path, kind, referenced, missing)
+                SELECT DISTINCT audio_path, 'recording', TRUE, TRUE
+                FROM recordings WHERE audio_path IS NOT NULL AND audio_path <> ''
+                ON CONFLICT (path) DO NOTHING
+            """)
+            cursor.execute("""
+                UPDATE audio_assets a SET referenced = (
+                    EXISTS (SELECT 1 FROM global_vocab g WHERE regexp_replace(g.audio_path, '^data/', '') = a.path)
+                    OR EXISTS (SELECT 1 FROM recordings r WHERE r.audio_path = a.path)
+                )
+            """)
+            conn.commit()
+            return True
+        except Exception:
+            return False
+
+@traced('db.resolve_audio_references')
+def resolve_audio_references(paths) -> int:
+    # Sets referenced for assets first seen on disk, matching the rules in sync_audio_references
+    if not paths:
+        return 0
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE audio_assets SET referenced = TRUE
+                WHERE path = ANY(%s) AND (
+                    path IN (SELECT regexp_replace(audio_path, '^data/', '') FROM global_vocab WHERE audio_path IS NOT NULL)
+                    OR path IN (SELECT audio_path FROM recordings WHERE audio_path IS NOT NULL)
+                )
+            """, (list(paths),))
+            conn.commit()
+            return cursor.rowcount
+        except Exception:
+            return 0
+
+@traced('db.get_audio_index_dirs')
+def get_audio_index_dirs(top: str):
+    # Directory -> mtime it had when the verifier last listed it, for top and everything under it
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            pattern = top.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '/%'
+            cursor.execute("SELECT path, mtime FROM audio_index_dirs WHERE path = %s OR path LIKE %s", (top, pattern))
+            return dict(cursor.fetchall())
+        except Exception:
+            return {}
+
+@traced('db.save_audio_index_dirs')
+def save_audio_index_dirs(listed: dict, gone) -> bool:
+    if not listed and not gone:
         return True
-    except Exception:
-        return False
-    finally:
-        db_pool.return_connection(conn)
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            if listed:
+                execute_values(cursor, """
+                    INSERT INTO audio_index_dirs (path, mtime) VALUES %s
+                    ON CONFLICT (path) DO UPDATE SET mtime = EXCLUDED.mtime
+                """, sorted(listed.items()), page_size=1000)
+            if gone:
+                cursor.execute("DELETE FROM audio_index_dirs WHERE path = ANY(%s)", (list(gone),))
+            conn.commit()
+            return True
+        except Exception:
+            return False
+
+@traced('db.start_audio_index_run')
+def start_audio_index_run() -> Optional[int]:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO audio_index_runs (started_at) VALUES (%s) RETURNING id", (datetime.now(),))
+            run_id = cursor.fetchone()[0]
+            conn.commit()
+            return run_id
+        except Exception:
+            return None
+
+@traced('db.finish_audio_index_run')
+def finish_audio_index_run(run_id: int, dirs_scanned: int, files_hashed: int, missing_found: int) -> bool:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE audio_index_runs SET
+                    finished_at = %s,
+                    dirs_scanned = %s,
+                    files_hashed = %s,
+                    missing_found = %s,
+                    orphaned_total = (SELECT COUNT(*) FROM audio_assets WHERE NOT referenced AND NOT missing),
+                    missing_total = (SELECT COUNT(*) FROM audio_assets WHERE missing)
+                WHERE id = %s
+            """, (datetime.now(), dirs_scanned, files_hashed, missing_found, run_id))
+            conn.commit()
+            return True
+        except Exception:
+            return False
+
+@traced('db.get_last_audio_index_run')
+def get_last_audio_index_run():
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, started_at, finished_at, dirs_scanned, files_hashed, missing_found, orphaned_total, missing_total
+                FROM audio_index_runs
+                WHERE finished_at IS NOT NULL
+                ORDER BY id DESC
+                LIMIT 1
+            """)
+            r = cursor.fetchone()
+            if not r:
+                return None
+            return {'id': r[0], 'started_at': r[1], 'finished_at': r[2], 'dirs_scanned': r[3], 'files_hashed': r[4], 'missing_found': r[5], 'orphaned_total': r[6], 'missing_total': r[7]}
+        except Exception:
+            return None
+
+@traced('db.get_orphaned_audio')
+def get_orphaned_audio(limit: int = 100):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT path, kind, size_bytes, indexed_at FROM audio_assets
+                WHERE NOT referenced AND NOT missing
+                ORDER BY path
+                LIMIT %s
+            """, (limit,))
+            rows = cursor.fetchall()
+            return [{'path': r[0], 'kind': r[1], 'size_bytes': r[2], 'indexed_at': r[3].isoformat() if r[3] else ''} for r in rows]
+        except Exception:
+            return []
+
+@traced('db.get_missing_audio')
+def get_missing_audio(limit: int = 100):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT path, kind, referenced, indexed_at FROM audio_assets
+                WHERE missing
+                ORDER BY path
+                LIMIT %s
+            """, (limit,))
+            rows = cursor.fetchall()
+            return [{'path': r[0], 'kind': r[1], 'referenced': r[2], 'indexed_at': r[3].isoformat() if r[3] else ''} for r in rows]
+        except Exception:
+            return []
+
+@traced('db.get_unsharded_recordings')
+def get_unsharded_recordings(limit: int = 500):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, audio_path, size_bytes FROM recordings
+                WHERE audio_path !~ '^recordings/[0-9a-f]{2}/[0-9a-f]{2}/'
+                ORDER BY id
+                LIMIT %s
+            """, (limit,))
+            return [{'id': r[0], 'audio_path': r[1], 'size_bytes': r[2]} for r in cursor.fetchall()]
+        except Exception:
+            return []
+
+@traced('db.get_recordings_missing_size')
+def get_recordings_missing_size(limit: int = 500):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, audio_path FROM recordings
+                WHERE size_bytes IS NULL
+                ORDER BY id
+                LIMIT %s
+            """, (limit,))
+            return [{'id': r[0], 'audio_path': r[1]} for r in cursor.fetchall()]
+        except Exception:
+            return []
+
+@traced('db.get_recordings_to_transcode')
+def get_recordings_to_transcode(older_than: datetime, limit: int = 100):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, audio_path, size_bytes FROM recordings
+                WHERE created_at < %s AND COALESCE(tier, 'original') = 'original'
+                ORDER BY transcode_attempts, created_at
+                LIMIT %s
+            """, (older_than, limit))
+            return [{'id': r[0], 'audio_path': r[1], 'size_bytes': r[2]} for r in cursor.fetchall()]
+        except Exception:
+            return []
+
+@traced('db.update_recording_storage')
+def update_recording_storage(recording_id: int, audio_path: str, size_bytes: int, tier: str = None) -> bool:
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE recordings
+                SET audio_path = %s, size_bytes = %s, tier = COALESCE(%s, tier)
+                WHERE id = %s
+            """, (audio_path, size_bytes, tier, recording_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception:
+            return False
+
+@traced('db.record_transcode_failure')
+def record_transcode_failure(recording_id: int, max_attempts: int) -> bool:
+    # Retried rows sort after fresh ones; at max_attempts the row leaves the queue as 'failed'
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE recordings
+                SET transcode_attempts = transcode_attempts + 1,
+                    tier = CASE WHEN transcode_attempts + 1 >= %s THEN 'failed' ELSE tier END
+                WHERE id = %s
+            """, (max_attempts, recording_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception:
+            return False
+
+@traced('db.get_recordings_over_quota')
+def get_recordings_over_quota(user_quota_bytes: int, global_quota_bytes: int):
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            # Newest recordings are kept first; anything past the running total is evicted
+            cursor.execute("""
+                SELECT id, audio_path, size_bytes FROM (
+                    SELECT id, audio_path, COALESCE(size_bytes, 0) AS size_bytes,
+                           SUM(COALESCE(size_bytes, 0)) OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS user_total,
+                           SUM(COALESCE(size_bytes, 0)) OVER (ORDER BY created_at DESC, id DESC) AS global_total
+                    FROM recordings
+                ) r
+                WHERE user_total > %s OR global_total > %s
+            """, (user_quota_bytes, global_quota_bytes))
+            return [{'id': r[0], 'audio_path': r[1], 'size_bytes': r[2]} for r in cursor.fetchall()]
+        except Exception:
+            return []
+
+@traced('db.delete_recordings')
+def delete_recordings(recording_ids) -> int:
+    if not recording_ids:
+        return 0
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM recordings WHERE id = ANY(%s) RETURNING audio_path", (list(recording_ids),))
+            paths = [r[0] for r in cursor.fetchall()]
+            cursor.execute("DELETE FROM audio_assets WHERE path = ANY(%s)", (paths,))
+            conn.commit()
+            return len(paths)
+        except Exception:
+            return 0
+
+@traced('db.delete_audio_assets')
+def delete_audio_assets(paths) -> bool:
+    if not paths:
+        return True
+    with db_pool.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM audio_assets WHERE path = ANY(%s)", (list(paths),))
+            conn.commit()
+            return True
+        except Exception:
+            return False
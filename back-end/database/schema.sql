@@ -15,16 +15,26 @@ CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE TABLE IF NOT EXISTS global_vocab (
     base VARCHAR(255) NOT NULL,
     pos VARCHAR(50) NOT NULL,
-    translation_en VARCHAR(500),
-    translation_ru VARCHAR(500),
-    translation_zh VARCHAR(500),
-    translation_vi VARCHAR(500),
     audio_path VARCHAR(500),
     count INTEGER DEFAULT 0,
+    base_jamo VARCHAR(1024),
     PRIMARY KEY (base, pos)
 );
 
 CREATE INDEX IF NOT EXISTS idx_global_vocab_base ON global_vocab(base);
+-- base spelled in keyboard jamo, so a half-typed syllable is a plain prefix match
+CREATE INDEX IF NOT EXISTS idx_global_vocab_base_jamo ON global_vocab(base_jamo text_pattern_ops);
+
+CREATE TABLE IF NOT EXISTS vocab_translation (
+    base VARCHAR(255) NOT NULL,
+    pos VARCHAR(50) NOT NULL,
+    lang VARCHAR(10) NOT NULL,
+    text VARCHAR(500) NOT NULL,
+    source VARCHAR(20),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (base, pos, lang) INCLUDE (text),
+    FOREIGN KEY (base, pos) REFERENCES global_vocab(base, pos) ON DELETE CASCADE
+);
 
 CREATE TABLE IF NOT EXISTS vocab (
     user_id INTEGER NOT NULL,
@@ -41,6 +51,14 @@ CREATE TABLE IF NOT EXISTS vocab (
 
 CREATE INDEX IF NOT EXISTS idx_vocab_user_id ON vocab(user_id);
 CREATE INDEX IF NOT EXISTS idx_vocab_base ON vocab(base);
+-- Covers /vocab/list: rows come out in last_added order without a sort or heap visits.
+-- /learn and ingest update included columns, so those updates are not HOT.
+CREATE INDEX IF NOT EXISTS idx_vocab_user_last_added ON vocab(user_id, last_added DESC)
+    INCLUDE (base, pos, count, remember_count, dont_remember_count, last_remember_at);
+
+-- Substring search over translations; init_db skips this when pg_trgm is not installed
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_vocab_translation_text_trgm ON vocab_translation USING gin (text gin_trgm_ops);
 
 CREATE TABLE IF NOT EXISTS recordings (
     id SERIAL PRIMARY KEY,
@@ -50,8 +68,52 @@ CREATE TABLE IF NOT EXISTS recordings (
     transcript TEXT,
     language VARCHAR(10),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    size_bytes BIGINT,
+    -- original, opus, or the terminal missing / failed (see storage/recordings.py)
+    tier VARCHAR(10) DEFAULT 'original',
+    transcode_attempts SMALLINT DEFAULT 0,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_recordings_user_id ON recordings(user_id);
 CREATE INDEX IF NOT EXISTS idx_recordings_created_at ON recordings(created_at);
+CREATE INDEX IF NOT EXISTS idx_recordings_user_created ON recordings(user_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS audio_assets (
+    path VARCHAR(500) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    size_bytes BIGINT,
+    content_hash CHAR(64),
+    mtime DOUBLE PRECISION,
+    referenced BOOLEAN DEFAULT FALSE,
+    missing BOOLEAN DEFAULT FALSE,
+    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_audio_assets_orphaned ON audio_assets(path) WHERE NOT referenced AND NOT missing;
+CREATE INDEX IF NOT EXISTS idx_audio_assets_missing ON audio_assets(path) WHERE missing;
+
+CREATE TABLE IF NOT EXISTS audio_index_runs (
+    id SERIAL PRIMARY KEY,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    dirs_scanned INTEGER DEFAULT 0,
+    files_hashed INTEGER DEFAULT 0,
+    missing_found INTEGER DEFAULT 0,
+    orphaned_total INTEGER DEFAULT 0,
+    missing_total INTEGER DEFAULT 0
+);
+
+-- mtime of each audio directory when the verifier last listed it; unchanged directories are not listed again
+CREATE TABLE IF NOT EXISTS audio_index_dirs (
+    path VARCHAR(500) PRIMARY KEY,
+    mtime DOUBLE PRECISION
+);
+
+-- Cost units charged per user per UTC day by the rate limiter (api/ratelimit.py)
+CREATE TABLE IF NOT EXISTS api_usage (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
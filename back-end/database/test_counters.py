@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from database import counters
+from database.counters import CountBuffer
+
+def make_buffer(max_keys=100, max_pending=3):
+    buffer = CountBuffer(interval=3600, max_keys=max_keys, max_pending=max_pending)
+    # Keep the background flusher out of the test; flushes are called directly
+    buffer._thread = object()
+    return buffer
+
+def test_deltas_accumulate_per_word():
+    buffer = make_buffer()
+    buffer.add('사과', 'noun')
+    buffer.add('사과', 'noun', 2)
+    buffer.add('먹다', 'verb')
+    assert buffer.pending == {('사과', 'noun'): 3, ('먹다', 'verb'): 1}
+    assert buffer.staleness() >= 0
+
+def test_new_words_past_the_cap_are_dropped():
+    buffer = make_buffer(max_pending=2)
+    buffer.add('a', 'noun')
+    buffer.add('b', 'noun')
+    buffer.add('c', 'noun', 5)
+    buffer.add('a', 'noun')
+    assert buffer.pending == {('a', 'noun'): 2, ('b', 'noun'): 1}
+    assert buffer.dropped == 5
+
+def test_full_buffer_wakes_the_flusher():
+    buffer = make_buffer(max_keys=2)
+    buffer.add('a', 'noun')
+    assert not buffer._wake.is_set()
+    buffer.add('b', 'noun')
+    assert buffer._wake.is_set()
+
+def test_empty_flush_does_nothing():
+    assert make_buffer().flush() == 0
+
+class Unavailable:
+    def __init__(self, during=None):
+        self.during = during
+
+    def connection(self):
+        if self.during:
+            self.during()
+        raise RuntimeError('database down')
+
+def test_failed_flush_puts_deltas_back(monkeypatch):
+    monkeypatch.setattr(counters, 'db_pool', Unavailable())
+    buffer = make_buffer()
+    buffer.add('a', 'noun', 2)
+    buffer.add('b', 'noun')
+    oldest = buffer.oldest
+    assert buffer.flush() == 0
+    assert buffer.pending == {('a', 'noun'): 2, ('b', 'noun'): 1}
+    assert buffer.oldest == oldest
+    assert buffer.failures == 1
+    assert buffer.dropped == 0
+
+def test_failed_flush_respects_the_cap(monkeypatch):
+    buffer = make_buffer(max_pending=2)
+    buffer.add('a', 'noun', 2)
+    buffer.add('b', 'noun')
+    # Words that arrive while the flush is running fill the buffer first
+    def arrive():
+        buffer.add('c', 'noun')
+        buffer.add('b', 'noun')
+    monkeypatch.setattr(counters, 'db_pool', Unavailable(arrive))
+    assert buffer.flush() == 0
+    assert buffer.pending == {('c', 'noun'): 1, ('b', 'noun'): 2}
+    assert buffer.dropped == 2
@@ -0,0 +1,167 @@
+import os
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import psycopg2.extensions
+from .connection import db_pool
+
+CACHE_ENABLED = os.getenv('GLOBAL_VOCAB_CACHE', '1') != '0'
+CACHE_SIZE = int(os.getenv('GLOBAL_VOCAB_CACHE_SIZE', '200000'))
+PRELOAD_ROWS = int(os.getenv('GLOBAL_VOCAB_PRELOAD', '20000'))
+CHANNEL = 'global_vocab_changed'
+INSTANCE_ID = uuid.uuid4().hex[:12]
+
+# Rows are stored as plain tuples in this column order; a negative entry records that
+# (base, pos) is known not to exist. `count` is only as fresh as the last write seen by
+# this process. Translations are cached per (base, pos) as {lang: text or None}, filled
+# one language at a time as requests ask for them.
+COLUMNS = ('audio_path', 'count')
+ROW_SQL = ', '.join(COLUMNS)
+MISSING = ()
+
+class GlobalVocabCache:
+    def __init__(self, size: int):
+        self.size = size
+        # Bumped by every invalidation. A reader records it before going to the database and
+        # hands it back to put(); if an invalidation arrived in between, the row it read may
+        # predate the change and is not cached.
+        self.generation = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                self._rows.move_to_end(key)
+            return row
+
+    def put(self, key, row, overwrite: bool = True, generation: int = None):
+        with self._lock:
+            if not overwrite and key in self._rows:
+                return
+            if generation is not None and generation != self.generation:
+                return
+            self._rows[key] = tuple(row)
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.size:
+                self._rows.popitem(last=False)
+
+    def set_field(self, key, field, value, generation: int = None):
+        # Adds one entry to a cached dict value, creating the dict when the key is absent
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            d = self._rows.get(key)
+            self._rows[key] = dict(d or (), **{field: value})
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.size:
+                self._rows.popitem(last=False)
+
+    def add_count(self, key, delta: int):
+        with self._lock:
+            row = self._rows.get(key)
+            if row:
+                self._rows[key] = row[:-1] + ((row[-1] or 0) + delta,)
+
+    def discard(self, key):
+        with self._lock:
+            self._rows.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self.generation += 1
+
+    def __len__(self):
+        return len(self._rows)
+
+cache = GlobalVocabCache(CACHE_SIZE)
+translations = GlobalVocabCache(CACHE_SIZE)
+
+def lookup(base: str, pos: str):
+    # None when the key is not cached, MISSING for a known miss, otherwise the row tuple
+    if not CACHE_ENABLED:
+        return None
+    return cache.get((base, pos))
+
+def store(base: str, pos: str, row, overwrite: bool = True, generation: int = None):
+    # Readers pass overwrite=False so a row they read before a concurrent write
+    # cannot replace the newer row that write stored, and the cache.generation they
+    # saw before the read so a row read before another process's NOTIFY is dropped
+    if CACHE_ENABLED:
+        cache.put((base, pos), row if row else MISSING, overwrite, generation)
+
+def lookup_translation(base: str, pos: str, lang: str):
+    # (True, text or None) when cached, (False, None) otherwise
+    if not CACHE_ENABLED:
+        return False, None
+    langs = translations.get((base, pos))
+    if langs is None or lang not in langs:
+        return False, None
+    return True, langs[lang]
+
+def store_translation(base: str, pos: str, lang: str, text, generation: int = None):
+    if CACHE_ENABLED:
+        translations.set_field((base, pos), lang, text or None, generation)
+
+def forget(base: str, pos: str):
+    cache.discard((base, pos))
+    translations.discard((base, pos))
+
+def as_dict(base: str, pos: str, row):
+    if not row:
+        return None
+    out = {'base': base, 'pos': pos}
+    out.update(zip(COLUMNS, row))
+    return out
+
+def notify(cursor, base: str, pos: str):
+    # Delivered to other processes when the surrounding transaction commits
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, f"{INSTANCE_ID}\t{base}\t{pos}"))
+
+def _handle(payload: str):
+    sender, _, key = payload.partition('\t')
+    if sender == INSTANCE_ID:
+        return
+    base, _, pos = key.partition('\t')
+    forget(base, pos)
+
+def _listen_loop():
+    connected_before = False
+    while True:
+        conn = None
+        try:
+            conn = db_pool.open_dedicated()
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            if connected_before:
+                # Changes made while we were disconnected were never announced to us
+                cache.clear()
+                translations.clear()
+            connected_before = True
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _handle(conn.notifies.pop(0).payload)
+        except Exception as e:
+            print(f"global_vocab_listen_error: {e}", flush=True)
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+def start_listener():
+    if not CACHE_ENABLED:
+        return None
+    t = threading.Thread(target=_listen_loop, name='global-vocab-listen', daemon=True)
+    t.start()
+    return t
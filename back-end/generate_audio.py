@@ -5,6 +5,8 @@ sys.path.append(os.path.dirname(__file__))
 from database.connection import db_pool
 from database.queries import get_vocab_without_audio, update_vocab_audio_path
 from logic.tss.tss import save_to_file
+from storage.audio_index import index_file
+from observability.metrics import external_call
 
 def generate_audio_file(base, pos):
     backend_dir = os.path.abspath(os.path.dirname(__file__))
@@ -19,11 +21,17 @@ def generate_audio_file(base, pos):
         print(f"save_to_file is None, cannot generate audio for {base}", flush=True)
         return False
     
+    # gTTS writes as the audio streams in; a hidden .part file renamed into place means a
+    # shutdown or crash mid-download never leaves a truncated MP3 under its real name
+    tmp_path = os.path.join(audio_dir, f".{filename}.part")
     try:
-        result = save_to_file(base, lang='ko', filename=filepath)
-        if os.path.exists(filepath):
+        with external_call('gtts'):
+            save_to_file(base, lang='ko', filename=tmp_path)
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, filepath)
             relative_path = f"data/audio/{filename}"
             update_vocab_audio_path(base, pos, relative_path)
+            index_file(relative_path, 'tts')
             print(f"Generated audio: {filepath}", flush=True)
             return True
         else:
@@ -33,6 +41,8 @@ def generate_audio_file(base, pos):
         print(f"Error generating audio for {base}: {e}", flush=True)
         import traceback
         traceback.print_exc()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return False
 
 def generate_all_audio():
@@ -3,7 +3,9 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'database'))
 
+from psycopg2.extras import execute_values
 from connection import db_pool
+from logic.text.jamo import decompose
 
 def init_database():
     if not db_pool.init_pool():
@@ -35,12 +37,9 @@ def init_database():
         CREATE TABLE IF NOT EXISTS global_vocab (
             base VARCHAR(255) NOT NULL,
             pos VARCHAR(50) NOT NULL,
-            translation_en VARCHAR(500),
-            translation_ru VARCHAR(500),
-            translation_zh VARCHAR(500),
-            translation_vi VARCHAR(500),
             audio_path VARCHAR(500),
             count INTEGER DEFAULT 0,
+            base_jamo VARCHAR(1024),
             PRIMARY KEY (base, pos)
         );
 
@@ -100,12 +99,9 @@ def init_database():
                 CREATE TABLE IF NOT EXISTS global_vocab (
                     base VARCHAR(255) NOT NULL,
                     pos VARCHAR(50) NOT NULL,
-                    translation_en VARCHAR(500),
-                    translation_ru VARCHAR(500),
-                    translation_zh VARCHAR(500),
-                    translation_vi VARCHAR(500),
                     audio_path VARCHAR(500),
                     count INTEGER DEFAULT 0,
+                    base_jamo VARCHAR(1024),
                     PRIMARY KEY (base, pos)
                 );
 
@@ -132,9 +128,54 @@ def init_database():
         ALTER TABLE vocab ADD COLUMN IF NOT EXISTS remember_count INTEGER DEFAULT 0;
         ALTER TABLE vocab ADD COLUMN IF NOT EXISTS dont_remember_count INTEGER DEFAULT 0;
         ALTER TABLE vocab ADD COLUMN IF NOT EXISTS last_remember_at TIMESTAMP;
+        ALTER TABLE recordings ADD COLUMN IF NOT EXISTS size_bytes BIGINT;
+        ALTER TABLE recordings ADD COLUMN IF NOT EXISTS tier VARCHAR(10) DEFAULT 'original';
+        ALTER TABLE recordings ADD COLUMN IF NOT EXISTS transcode_attempts SMALLINT DEFAULT 0;
+        CREATE INDEX IF NOT EXISTS idx_recordings_user_created ON recordings(user_id, created_at DESC);
         """
         cursor.execute(alter_sql)
-        
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS audio_assets (
+                path VARCHAR(500) PRIMARY KEY,
+                kind VARCHAR(20) NOT NULL,
+                size_bytes BIGINT,
+                content_hash CHAR(64),
+                mtime DOUBLE PRECISION,
+                referenced BOOLEAN DEFAULT FALSE,
+                missing BOOLEAN DEFAULT FALSE,
+                indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_audio_assets_orphaned ON audio_assets(path) WHERE NOT referenced AND NOT missing;
+            CREATE INDEX IF NOT EXISTS idx_audio_assets_missing ON audio_assets(path) WHERE missing;
+
+            CREATE TABLE IF NOT EXISTS audio_index_runs (
+                id SERIAL PRIMARY KEY,
+                started_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                dirs_scanned INTEGER DEFAULT 0,
+                files_hashed INTEGER DEFAULT 0,
+                missing_found INTEGER DEFAULT 0,
+                orphaned_total INTEGER DEFAULT 0,
+                missing_total INTEGER DEFAULT 0
+            );
+
+            -- mtime of each audio directory when the verifier last listed it; unchanged directories are not listed again
+            CREATE TABLE IF NOT EXISTS audio_index_dirs (
+                path VARCHAR(500) PRIMARY KEY,
+                mtime DOUBLE PRECISION
+            );
+
+            -- Cost units charged per user per UTC day by the rate limiter (api/ratelimit.py)
+            CREATE TABLE IF NOT EXISTS api_usage (
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                units INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day)
+            );
+        """)
+
         cursor.execute("""
             SELECT EXISTS (
                 SELECT 1 FROM information_schema.tables 
@@ -168,46 +209,36 @@ def init_database():
         global_vocab_exists = cursor.fetchone()[0]
         
         if global_vocab_exists:
+            # The primary key includes text so single-language lookups are index-only scans
             cursor.execute("""
-                SELECT EXISTS (
-                    SELECT 1 FROM information_schema.columns 
-                    WHERE table_name='global_vocab' AND column_name='translation'
-                )
+                CREATE TABLE IF NOT EXISTS vocab_translation (
+                    base VARCHAR(255) NOT NULL,
+                    pos VARCHAR(50) NOT NULL,
+                    lang VARCHAR(10) NOT NULL,
+                    text VARCHAR(500) NOT NULL,
+                    source VARCHAR(20),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (base, pos, lang) INCLUDE (text),
+                    FOREIGN KEY (base, pos) REFERENCES global_vocab(base, pos) ON DELETE CASCADE
+                );
             """)
-            has_old_column = cursor.fetchone()[0]
             
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT 1 FROM information_schema.columns 
-                    WHERE table_name='global_vocab' AND column_name='translation_en'
-                )
+            # Move the old per-language columns (and the older single `translation` column,
+            # which held English) into rows; translation_en wins over translation on conflict
+            cursor.execute(r"""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name='global_vocab' AND (column_name = 'translation' OR column_name LIKE 'translation\_%')
+                ORDER BY column_name = 'translation', column_name
             """)
-            has_new_columns = cursor.fetchone()[0]
-            
-            if has_old_column and not has_new_columns:
-                cursor.execute("""
-                    ALTER TABLE global_vocab 
-                    ADD COLUMN translation_en VARCHAR(500),
-                    ADD COLUMN translation_ru VARCHAR(500),
-                    ADD COLUMN translation_zh VARCHAR(500),
-                    ADD COLUMN translation_vi VARCHAR(500)
-                """)
-                cursor.execute("""
-                    UPDATE global_vocab 
-                    SET translation_en = translation 
-                    WHERE translation IS NOT NULL AND translation_en IS NULL
-                """)
-                cursor.execute("""
-                    ALTER TABLE global_vocab DROP COLUMN translation
-                """)
-            elif not has_new_columns:
-                cursor.execute("""
-                    ALTER TABLE global_vocab 
-                    ADD COLUMN IF NOT EXISTS translation_en VARCHAR(500),
-                    ADD COLUMN IF NOT EXISTS translation_ru VARCHAR(500),
-                    ADD COLUMN IF NOT EXISTS translation_zh VARCHAR(500),
-                    ADD COLUMN IF NOT EXISTS translation_vi VARCHAR(500)
-                """)
+            for (column,) in cursor.fetchall():
+                lang = 'en' if column == 'translation' else column[len('translation_'):]
+                cursor.execute(f"""
+                    INSERT INTO vocab_translation (base, pos, lang, text, source)
+                    SELECT base, pos, %s, {column}, 'migrated' FROM global_vocab
+                    WHERE {column} IS NOT NULL AND {column} <> ''
+                    ON CONFLICT (base, pos, lang) DO NOTHING
+                """, (lang,))
+                cursor.execute(f"ALTER TABLE global_vocab DROP COLUMN {column}")
         
         cursor.execute("SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name='vocab')")
         vocab_exists = cursor.fetchone()[0]
@@ -238,14 +269,61 @@ def init_database():
                 has_translation = cursor.fetchone()[0]
                 if has_translation:
                     cursor.execute("""
-                        INSERT INTO global_vocab (base, pos, translation_en, audio_path, count) 
-                        SELECT base, pos, translation, COALESCE(audio_path, ''), count 
+                        INSERT INTO global_vocab (base, pos, audio_path, count) 
+                        SELECT base, pos, COALESCE(audio_path, ''), count 
                         FROM vocab 
                         ON CONFLICT (base, pos) DO NOTHING
                     """)
+                    cursor.execute("""
+                        INSERT INTO vocab_translation (base, pos, lang, text, source)
+                        SELECT base, pos, 'en', translation, 'migrated'
+                        FROM vocab
+                        WHERE translation IS NOT NULL AND translation <> ''
+                        ON CONFLICT (base, pos, lang) DO NOTHING
+                    """)
                     cursor.execute("ALTER TABLE vocab DROP COLUMN IF EXISTS translation")
                 cursor.execute("ALTER TABLE vocab DROP COLUMN IF EXISTS audio_path")
         
+        # Covering index for /vocab/list: the vocab side is read in last_added order straight
+        # from the index. Index-only scans depend on the visibility map, so vocab is vacuumed
+        # more eagerly than the default. The included columns are the ones /learn and ingest
+        # update, so those vocab updates are never HOT; the list read is the trade.
+        # global_vocab is the hottest table for writes and keeps only its primary key for (base,
+        # pos) lookups: the covering copy of it with audio_path and an index on count (which
+        # made every write-behind count update non-HOT) are dropped if an earlier version made them.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_vocab_user_last_added ON vocab(user_id, last_added DESC)
+                INCLUDE (base, pos, count, remember_count, dont_remember_count, last_remember_at);
+            DROP INDEX IF EXISTS idx_global_vocab_key_audio;
+            DROP INDEX IF EXISTS idx_global_vocab_count_key;
+            ALTER TABLE vocab SET (autovacuum_vacuum_scale_factor = 0.02);
+        """)
+        
+        # Search: base_jamo is base spelled in keyboard jamo (see logic/text/jamo.py), filled in
+        # here for rows written before the column existed
+        cursor.execute("ALTER TABLE global_vocab ADD COLUMN IF NOT EXISTS base_jamo VARCHAR(1024)")
+        cursor.execute("SELECT DISTINCT base FROM global_vocab WHERE base_jamo IS NULL")
+        pending = [(base, decompose(base)) for (base,) in cursor.fetchall()]
+        if pending:
+            execute_values(cursor, """
+                UPDATE global_vocab g SET base_jamo = v.base_jamo
+                FROM (VALUES %s) AS v(base, base_jamo)
+                WHERE g.base = v.base
+            """, pending, page_size=5000)
+            print(f"Filled base_jamo for {len(pending)} words")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_global_vocab_base_jamo ON global_vocab(base_jamo text_pattern_ops)")
+        
+        # Translation substring search needs pg_trgm; without it (no extension package or no
+        # privilege) search still works for Korean prefixes and the ILIKE falls back to a scan
+        cursor.execute("SAVEPOINT trgm")
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vocab_translation_text_trgm ON vocab_translation USING gin (text gin_trgm_ops)")
+            cursor.execute("RELEASE SAVEPOINT trgm")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT trgm")
+            print(f"pg_trgm unavailable, translation search will not be indexed: {e}")
+        
         conn.commit()
         print("Database schema initialized successfully")
         return True
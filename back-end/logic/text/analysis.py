@@ -8,6 +8,12 @@ except ImportError:
         print("Warning: MeCab not available. Text analysis features will be limited.", flush=True)
 import pandas as pd
 import os
+try:
+    from observability.tracing import span
+except ImportError:
+    from contextlib import nullcontext
+    def span(name, **attrs):
+        return nullcontext()
 
 backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 # CSV file is only needed for testing, not production
@@ -49,7 +55,8 @@ def save_freq(data):
             print("Error: Failed to initialize MeCab tagger", flush=True)
             return pd.DataFrame(columns=['word', 'pos', 'count', 'prob'])
     #parsed = tagger.parse(text)   #test
-    parsed = tagger.parse(data)
+    with span('mecab.parse', chars=len(data)):
+        parsed = tagger.parse(data)
     tokens = []
     for line in parsed.splitlines():
         if line == "EOS" or not line.strip():
@@ -0,0 +1,39 @@
+import unicodedata
+
+# Hangul syllables decompose arithmetically into lead/vowel/tail indexes; each index maps to
+# the compatibility jamo a keyboard produces, with compound vowels and tails split into the
+# keystrokes that build them. A word and a half-typed prefix of it then share a jamo prefix:
+# "한" (ㅎㅏㄴ) is a prefix of "하나" (ㅎㅏㄴㅏ).
+SYLLABLE_BASE = 0xAC00
+SYLLABLE_COUNT = 11172
+VOWELS_PER_LEAD = 588
+TAILS_PER_VOWEL = 28
+
+LEADS = ['ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+VOWELS = ['ㅏ', 'ㅐ', 'ㅑ', 'ㅒ', 'ㅓ', 'ㅔ', 'ㅕ', 'ㅖ', 'ㅗ', 'ㅗㅏ', 'ㅗㅐ', 'ㅗㅣ', 'ㅛ', 'ㅜ', 'ㅜㅓ', 'ㅜㅔ', 'ㅜㅣ',
+          'ㅠ', 'ㅡ', 'ㅡㅣ', 'ㅣ']
+TAILS = ['', 'ㄱ', 'ㄲ', 'ㄱㅅ', 'ㄴ', 'ㄴㅈ', 'ㄴㅎ', 'ㄷ', 'ㄹ', 'ㄹㄱ', 'ㄹㅁ', 'ㄹㅂ', 'ㄹㅅ', 'ㄹㅌ', 'ㄹㅍ', 'ㄹㅎ', 'ㅁ',
+         'ㅂ', 'ㅂㅅ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+
+# Standalone compound jamo typed on their own (e.g. "ㅘ", "ㄳ") split the same way
+COMPOUNDS = {
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ', 'ㄽ': 'ㄹㅅ',
+    'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+}
+
+def decompose(text: str) -> str:
+    # NFC first so conjoining-jamo input (e.g. from macOS) is treated like precomposed text
+    out = []
+    for ch in unicodedata.normalize('NFC', text):
+        code = ord(ch) - SYLLABLE_BASE
+        if 0 <= code < SYLLABLE_COUNT:
+            out.append(LEADS[code // VOWELS_PER_LEAD])
+            out.append(VOWELS[(code % VOWELS_PER_LEAD) // TAILS_PER_VOWEL])
+            out.append(TAILS[code % TAILS_PER_VOWEL])
+        else:
+            out.append(COMPOUNDS.get(ch, ch))
+    return ''.join(out)
+
+def has_hangul(text: str) -> bool:
+    return any(0 <= ord(ch) - SYLLABLE_BASE < SYLLABLE_COUNT or 0x3131 <= ord(ch) <= 0x318E for ch in text)
@@ -0,0 +1,35 @@
+import sys
+import os
+import unicodedata
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from logic.text.jamo import decompose, has_hangul
+
+def test_syllables_split_into_keystrokes():
+    assert decompose('한') == 'ㅎㅏㄴ'
+    assert decompose('하나') == 'ㅎㅏㄴㅏ'
+    assert decompose('가') == 'ㄱㅏ'
+
+def test_partly_typed_word_is_a_prefix():
+    # "한" is what an IME shows halfway through typing "하나"
+    assert decompose('하나').startswith(decompose('한'))
+    assert decompose('읽다').startswith(decompose('일'))
+
+def test_compound_vowels_and_tails():
+    assert decompose('과') == 'ㄱㅗㅏ'
+    assert decompose('닭') == 'ㄷㅏㄹㄱ'
+    assert decompose('ㅘ') == 'ㅗㅏ'
+    assert decompose('ㄳ') == 'ㄱㅅ'
+
+def test_conjoining_jamo_match_precomposed():
+    assert decompose(unicodedata.normalize('NFD', '한국')) == decompose('한국')
+
+def test_other_text_is_unchanged():
+    assert decompose('apple 12') == 'apple 12'
+    assert decompose('') == ''
+
+def test_has_hangul():
+    assert has_hangul('apple 사과')
+    assert has_hangul('ㅎ')
+    assert not has_hangul('apple')
+    assert not has_hangul('')
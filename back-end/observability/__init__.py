@@ -0,0 +1 @@
+# Observability module
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from .metrics import gauge
+
+# Readiness probes run at most once per TTL and never on the request path: a stale result is
+# returned immediately while one background refresh runs, so a load balancer polling /readyz
+# on every worker adds no load on Postgres or the translation providers beyond one check per
+# TTL. Probes listed in READY_REQUIRED fail readiness; the rest are reported only.
+READY_REQUIRED = {name.strip() for name in os.getenv('READY_REQUIRED', 'db,tagger').split(',') if name.strip()}
+STARTED_AT = time.time()
+# Set when shutdown begins so load balancers stop routing here while requests drain
+draining = threading.Event()
+
+OK = 'ok'
+FAIL = 'fail'
+# The dependency is not installed or not configured, which is a deployment choice, not a fault
+UNAVAILABLE = 'unavailable'
+# The probe has not finished its first run yet
+PENDING = 'pending'
+
+class Unavailable(Exception):
+    pass
+
+class Probe:
+    def __init__(self, name: str, fn, ttl: float, timeout: float):
+        self.name = name
+        self.fn = fn
+        self.ttl = ttl
+        self.timeout = timeout
+        self.result = None
+        self.checked_at = 0.0
+        self._running = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            detail = self.fn()
+            status, error = OK, None
+        except Unavailable as e:
+            status, error, detail = UNAVAILABLE, str(e), None
+        except Exception as e:
+            status, error, detail = FAIL, str(e)[:200], None
+        result = {'status': status, 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+        if error:
+            result['error'] = error
+        if detail:
+            result['detail'] = detail
+        with self._lock:
+            self.result = result
+            self.checked_at = time.monotonic()
+            self._running = False
+        self._done.set()
+
+    def refresh(self):
+        with self._lock:
+            start = not self._running
+            if start:
+                self._running = True
+                self._done.clear()
+        if start:
+            threading.Thread(target=self._run, name=f'probe-{self.name}', daemon=True).start()
+
+    def check(self) -> dict:
+        # Never waits: a probe that has not reported yet is 'pending' until its run finishes
+        if self.result is None:
+            self.refresh()
+            return {'status': PENDING, 'age_seconds': None}
+        if time.monotonic() - self.checked_at >= self.ttl:
+            self.refresh()
+        return dict(self.result, age_seconds=round(time.monotonic() - self.checked_at, 1))
+
+probes = {}
+
+def probe(name: str, fn, ttl: float = 10.0, timeout: float = 2.0) -> Probe:
+    probes[name] = Probe(name, fn, ttl, timeout)
+    return probes[name]
+
+def refresh_all(wait: bool = True):
+    for p in probes.values():
+        p.refresh()
+    if wait:
+        for p in probes.values():
+            p._done.wait(p.timeout)
+
+def readiness() -> dict:
+    checks = {name: p.check() for name, p in probes.items()}
+    failed = sorted(name for name, r in checks.items() if name in READY_REQUIRED and r['status'] == FAIL)
+    pending = sorted(name for name, r in checks.items() if name in READY_REQUIRED and r['status'] == PENDING)
+    return {
+        'ready': not failed and not pending and not draining.is_set(),
+        'draining': draining.is_set(),
+        'failed': failed,
+        'pending': pending,
+        'checks': checks,
+    }
+
+def liveness() -> dict:
+    return {'status': OK, 'pid': os.getpid(), 'uptime_seconds': round(time.time() - STARTED_AT, 1)}
+
+def _probe_values(key):
+    out = {}
+    for name, p in probes.items():
+        if p.result is not None:
+            out[(name,)] = (1 if p.result['status'] == OK else 0) if key == 'ok' else p.result['latency_ms'] / 1000
+    return out
+
+gauge('health_probe_ok', 'Last result of each readiness probe (1 ok, 0 failing or unavailable)', ('probe',), fn=lambda: _probe_values('ok'))
+gauge('health_probe_latency_seconds', 'Duration of the last run of each readiness probe', ('probe',), fn=lambda: _probe_values('latency'))
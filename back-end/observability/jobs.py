@@ -0,0 +1,52 @@
+import contextvars
+import threading
+import time
+from .metrics import counter, gauge
+from .tracing import span
+
+JOBS_STARTED = counter('background_jobs_started_total', 'Background jobs started by kind', ('kind',))
+JOBS_FAILED = counter('background_jobs_failed_total', 'Background jobs that raised by kind', ('kind',))
+
+_active = {}
+_active_lock = threading.Lock()
+_idle = threading.Condition(_active_lock)
+
+def active_jobs():
+    with _active_lock:
+        return {(kind,): n for kind, n in _active.items()}
+
+gauge('background_jobs_active', 'Background jobs currently running by kind', ('kind',), fn=active_jobs)
+
+def _run(kind, target, args):
+    try:
+        with span(f'job.{kind}'):
+            target(*args)
+    except Exception as e:
+        JOBS_FAILED.inc((kind,))
+        print(f"job_error {kind}: {e}", flush=True)
+    finally:
+        with _active_lock:
+            _active[kind] -= 1
+            _idle.notify_all()
+
+def spawn(kind: str, target, *args) -> threading.Thread:
+    with _active_lock:
+        _active[kind] = _active.get(kind, 0) + 1
+    JOBS_STARTED.inc((kind,))
+    # The job runs in a copy of the caller's context so its span links back to the request
+    ctx = contextvars.copy_context()
+    t = threading.Thread(target=ctx.run, args=(_run, kind, target, args), name=f'job-{kind}', daemon=True)
+    t.start()
+    return t
+
+def drain(timeout: float) -> dict:
+    # Waits for running jobs (translations, audio generation) to finish, including jobs they
+    # spawn meanwhile. Returns the kinds still running at the deadline.
+    deadline = time.monotonic() + timeout
+    with _active_lock:
+        while any(_active.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _idle.wait(remaining)
+        return {kind: n for kind, n in _active.items() if n}
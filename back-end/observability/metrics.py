@@ -0,0 +1,187 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from .tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def _format_value(v):
+    if v == float('inf'):
+        return '+Inf'
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return repr(v) if isinstance(v, float) else str(v)
+
+def _collect_fn(metric):
+    try:
+        value = metric.fn()
+    except Exception:
+        return []
+    items = value.items() if isinstance(value, dict) else [((), value)]
+    return [(metric.name, _format_labels(metric.label_names, k if isinstance(k, tuple) else (k,)), v) for k, v in items if v is not None]
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=(), fn=None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        # fn reads a running total kept elsewhere (the DB pool, the password pool)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        if self.fn is not None:
+            return _collect_fn(self)
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.label_names, k), v) for k, v in items]
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        # Counts are stored per bucket and only made cumulative at scrape time
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def collect(self):
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        out = []
+        for labels, (counts, total, count) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                running += c
+                out.append((self.name + '_bucket', _format_labels(self.label_names, labels, ('le', _format_value(float(bound)))), running))
+            out.append((self.name + '_sum', _format_labels(self.label_names, labels), total))
+            out.append((self.name + '_count', _format_labels(self.label_names, labels), count))
+        return out
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, label_names=(), fn=None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def collect(self):
+        if self.fn is not None:
+            return _collect_fn(self)
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.label_names, k if isinstance(k, tuple) else (k,)), v) for k, v in items if v is not None]
+
+def _register(metric):
+    with _registry_lock:
+        for existing in _registry:
+            if existing.name == metric.name:
+                return existing
+        _registry.append(metric)
+    return metric
+
+def counter(name, help_text, label_names=(), fn=None):
+    return _register(Counter(name, help_text, label_names, fn))
+
+def histogram(name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, label_names, buckets))
+
+def gauge(name, help_text, label_names=(), fn=None):
+    return _register(Gauge(name, help_text, label_names, fn))
+
+def render() -> bytes:
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    for m in metrics:
+        lines.append(f'# HELP {m.name} {m.help}')
+        lines.append(f'# TYPE {m.name} {m.kind}')
+        for name, labels, value in m.collect():
+            lines.append(f'{name}{labels} {_format_value(value)}')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+HTTP_REQUESTS = counter('http_requests_total', 'HTTP requests by route, method and status code', ('route', 'method', 'status'))
+HTTP_LATENCY = histogram('http_request_duration_seconds', 'HTTP request latency by route and method', ('route', 'method'))
+EXTERNAL_LATENCY = histogram('external_call_duration_seconds', 'Latency of calls to external providers', ('provider', 'outcome'))
+CACHE_REQUESTS = counter('cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+
+def _cache_hit_ratio():
+    totals = {}
+    for (cache, result), v in list(CACHE_REQUESTS._values.items()):
+        hits, total = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (v if result == 'hit' else 0), total + v)
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+gauge('cache_hit_ratio', 'Fraction of cache lookups served from memory', ('cache',), fn=_cache_hit_ratio)
+gauge('process_threads', 'Live Python threads in this process', fn=threading.active_count)
+
+def observe_request(route: str, method: str, status: int, seconds: float):
+    HTTP_REQUESTS.inc((route, method, str(status)))
+    HTTP_LATENCY.observe(seconds, (route, method))
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc((cache, 'hit' if hit else 'miss'))
+
+@contextmanager
+def external_call(provider: str):
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        with span(f'external.{provider}'):
+            yield
+        outcome = 'ok'
+    finally:
+        EXTERNAL_LATENCY.observe(time.perf_counter() - started, (provider, outcome))
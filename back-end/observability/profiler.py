@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '60'))
+DEFAULT_INTERVAL = 0.005
+KEEP_RESULTS = 5
+
+# Handlers check this flag before touching the route map, so nothing is recorded
+# while no session is running.
+sampling = False
+
+_thread_routes = {}
+_sessions = OrderedDict()
+_lock = threading.Lock()
+
+def enter_route(route: str):
+    _thread_routes[threading.get_ident()] = route
+
+def exit_route():
+    _thread_routes.pop(threading.get_ident(), None)
+
+class ProfileSession:
+    def __init__(self, seconds: float, interval: float, route: str = None, threads=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.seconds = seconds
+        self.interval = interval
+        self.route = route
+        self.threads = set(threads) if threads else None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.samples = 0
+        self.stacks = {}
+        self._thread = None
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    def _run(self):
+        global sampling
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        try:
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for tid, frame in sys._current_frames().items():
+                    if tid == own:
+                        continue
+                    name = names.get(tid, str(tid))
+                    if self.threads and name not in self.threads:
+                        continue
+                    if self.route and _thread_routes.get(tid) != self.route:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                        frame = frame.f_back
+                    key = (name, tuple(reversed(stack)))
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+                time.sleep(self.interval)
+        finally:
+            with _lock:
+                sampling = any(not s.done for s in _sessions.values() if s is not self)
+            self.finished_at = time.time()
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's folded format: "thread;outer;...;inner count"
+        lines = []
+        for (thread, frames), count in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+            names = [thread] + [f"{n} ({os.path.basename(f)}:{l})" for n, f, l in frames]
+            lines.append(f"{';'.join(names)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self) -> dict:
+        frame_index = {}
+        frames = []
+        profiles = {}
+        for (thread, stack), count in self.stacks.items():
+            idx = []
+            for fr in stack:
+                if fr not in frame_index:
+                    frame_index[fr] = len(frames)
+                    frames.append({'name': fr[0], 'file': fr[1], 'line': fr[2]})
+                idx.append(frame_index[fr])
+            p = profiles.setdefault(thread, {'samples': [], 'weights': []})
+            p['samples'].append(idx)
+            p['weights'].append(count * self.interval)
+        duration = (self.finished_at or time.time()) - self.started_at
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f'lexipark profile {self.id}' + (f' route={self.route}' if self.route else ''),
+            'exporter': 'lexipark-profiler',
+            'shared': {'frames': frames},
+            'profiles': [
+                {'type': 'sampled', 'name': thread, 'unit': 'seconds', 'startValue': 0, 'endValue': duration,
+                 'samples': p['samples'], 'weights': p['weights']}
+                for thread, p in profiles.items()
+            ],
+        }
+
+    def summary(self) -> dict:
+        return {
+            'profile_id': self.id,
+            'status': 'done' if self.done else 'running',
+            'seconds': self.seconds,
+            'route': self.route,
+            'samples': self.samples,
+            'ready_in': 0 if self.done else max(self.started_at + self.seconds - time.time(), 0),
+        }
+
+def start(seconds: float, interval: float = DEFAULT_INTERVAL, route: str = None, threads=None):
+    global sampling
+    seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+    interval = min(max(float(interval), 0.001), 0.1)
+    with _lock:
+        if any(not s.done for s in _sessions.values()):
+            return None
+        session = ProfileSession(seconds, interval, route, threads)
+        _sessions[session.id] = session
+        while len(_sessions) > KEEP_RESULTS:
+            _sessions.popitem(last=False)
+        sampling = True
+    session._thread = threading.Thread(target=session._run, name='profiler', daemon=True)
+    session._thread.start()
+    return session
+
+def get(profile_id: str):
+    return _sessions.get(profile_id)
@@ -0,0 +1,134 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from .metrics import gauge
+
+# Heavy optional dependencies (pandas/MeCab, gTTS, openai, deep_translator, ASR) are imported
+# on first use instead of at module load, so the sockets are bound and serving within a moment
+# of process start. warm() then imports them in the background; /readyz reports when that is
+# done. Every import, deferred or not, is timed here.
+_UNSET = object()
+_lock = threading.Lock()
+timings = {}
+errors = {}
+task_seconds = {}
+deferred_imports = []
+warm_tasks = []
+ready = threading.Event()
+warm_started = None
+warm_seconds = None
+
+def _record(label: str, seconds: float, error: str = None):
+    with _lock:
+        # Several names can come from one module; only the first import pays for it
+        timings.setdefault(label, round(seconds, 4))
+        if error:
+            errors[label] = error
+
+@contextmanager
+def timed(label: str):
+    # For imports that stay eager (the database layer, websockets)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _record(label, time.perf_counter() - started, str(e))
+        raise
+    _record(label, time.perf_counter() - started)
+
+class Deferred:
+    # Stands in for a module or module attribute until first touched. It is falsy when the
+    # import failed, so `if save_freq:` guards keep working; calling or reading attributes
+    # loads it.
+    def __init__(self, label: str, module: str, attr: str = None):
+        self._label = label
+        self._module = module
+        self._attr = attr
+        self._value = _UNSET
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        if self._value is _UNSET:
+            with self._load_lock:
+                if self._value is _UNSET:
+                    started = time.perf_counter()
+                    try:
+                        value = importlib.import_module(self._module)
+                        if self._attr:
+                            value = getattr(value, self._attr)
+                        _record(self._label, time.perf_counter() - started)
+                    except Exception as e:
+                        value = None
+                        _record(self._label, time.perf_counter() - started, str(e))
+                        print(f"{self._label}_import_error", str(e), flush=True)
+                    self._value = value
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _UNSET
+
+    def __bool__(self):
+        return self.load() is not None
+
+    def __call__(self, *args, **kwargs):
+        value = self.load()
+        if value is None:
+            raise ImportError(f'{self._module} is not available: {errors.get(self._label)}')
+        return value(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        value = self.load()
+        if value is None:
+            raise AttributeError(f'{self._module} is not available')
+        return getattr(value, name)
+
+def deferred(label: str, module: str, attr: str = None) -> Deferred:
+    d = Deferred(label, module, attr)
+    deferred_imports.append(d)
+    return d
+
+def on_warm(name: str, fn):
+    # Extra warm-up work (cache preloads) run after the deferred imports
+    warm_tasks.append((name, fn))
+
+def _warm():
+    global warm_seconds
+    for d in deferred_imports:
+        d.load()
+    for name, fn in warm_tasks:
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            print(f"warmup_error {name}: {e}", flush=True)
+        with _lock:
+            task_seconds[name] = round(time.perf_counter() - started, 4)
+    warm_seconds = round(time.perf_counter() - warm_started, 4)
+    print(f"warm-up done in {warm_seconds:.2f}s", flush=True)
+    ready.set()
+
+def warm() -> threading.Thread:
+    global warm_started
+    warm_started = time.perf_counter()
+    t = threading.Thread(target=_warm, name='warmup', daemon=True)
+    t.start()
+    return t
+
+def status() -> dict:
+    with _lock:
+        return {
+            'ready': ready.is_set(),
+            'warmup_seconds': warm_seconds,
+            'pending': sorted({d._label for d in deferred_imports if not d.loaded}),
+            'import_seconds': dict(timings),
+            'import_errors': dict(errors),
+            'task_seconds': dict(task_seconds),
+        }
+
+gauge('import_duration_seconds', 'Time spent importing each dependency at startup or first use', ('module',),
+      fn=lambda: {(label,): seconds for label, seconds in timings.items()})
+gauge('startup_ready', '1 once deferred imports and warm-up tasks have finished', fn=lambda: 1 if ready.is_set() else 0)
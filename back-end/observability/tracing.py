@@ -0,0 +1,221 @@
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TRACING_ENABLED = os.getenv('TRACING', '1') != '0'
+# Share of requests traced; every query and MeCab call in a traced request becomes a span
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.01'))
+# Spans waiting for the writer thread; past this they are dropped and counted in `dropped`
+TRACE_QUEUE_MAX = int(os.getenv('TRACE_QUEUE_MAX', '10000'))
+# Each supervised worker writes its own file, so rotation never races another process
+_worker = os.getenv('SERVER_WORKER_INDEX')
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(backend_root, 'logs', f'traces.{_worker}.jsonl' if _worker else 'traces.jsonl'))
+# The file is rotated to TRACE_FILE.1 .. .N past this size; disk use is capped at (N + 1) times it
+TRACE_FILE_MAX_BYTES = int(float(os.getenv('TRACE_FILE_MAX_MB', '32')) * 1024 * 1024)
+TRACE_FILE_BACKUPS = int(os.getenv('TRACE_FILE_BACKUPS', '1'))
+RECENT_TRACE_LIMIT = int(os.getenv('TRACE_RECENT_LIMIT', '500'))
+# Incoming X-Request-ID values are reused as trace ids only when they look like one
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._:-]{8,64}')
+
+_current = contextvars.ContextVar('trace_span', default=None)
+
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+_export_queue = queue.Queue(TRACE_QUEUE_MAX)
+dropped = 0
+_writer = None
+_writer_lock = threading.Lock()
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start', 'end', 'attrs', 'thread')
+
+    def __init__(self, trace_id, parent_id, name, attrs):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.end = None
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round((self.end - self.start) * 1000, 3) if self.end else None,
+            'thread': self.thread,
+            'attrs': self.attrs,
+        }
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def valid_request_id(value) -> bool:
+    return bool(value) and REQUEST_ID_PATTERN.fullmatch(value) is not None
+
+def request_id_from(header) -> str:
+    return header if valid_request_id(header) else new_request_id()
+
+def current_trace_id():
+    s = _current.get()
+    return s.trace_id if s else None
+
+def trace_files():
+    # Newest first: the live file, then its rotated copies
+    return [TRACE_FILE] + [f'{TRACE_FILE}.{i}' for i in range(1, TRACE_FILE_BACKUPS + 1)]
+
+def _rotate():
+    files = trace_files()
+    if len(files) == 1:
+        os.remove(TRACE_FILE)
+        return
+    for older, newer in zip(reversed(files[1:]), reversed(files[:-1])):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+
+def _write_loop():
+    os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+    while True:
+        with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+            size = f.tell()
+            while size < TRACE_FILE_MAX_BYTES:
+                item = _export_queue.get()
+                line = json.dumps(item, ensure_ascii=False) + '\n'
+                f.write(line)
+                size += len(line.encode('utf-8'))
+                if _export_queue.empty():
+                    f.flush()
+        try:
+            _rotate()
+        except OSError as e:
+            print(f"trace_rotate_error: {e}", flush=True)
+
+def pending() -> int:
+    return _export_queue.qsize()
+
+def _export(s: Span):
+    # Spans are kept in memory for the viewer and handed to a writer thread so the
+    # request path never blocks on file I/O; when the disk falls behind, spans are dropped
+    # from the file rather than queued without bound.
+    global _writer, dropped
+    d = s.to_dict()
+    with _recent_lock:
+        spans = _recent.get(s.trace_id)
+        if spans is None:
+            spans = _recent[s.trace_id] = []
+            while len(_recent) > RECENT_TRACE_LIMIT:
+                _recent.popitem(last=False)
+        spans.append(d)
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name='trace-writer', daemon=True)
+                _writer.start()
+    try:
+        _export_queue.put_nowait(d)
+    except queue.Full:
+        dropped += 1
+
+@contextmanager
+def start_trace(name: str, trace_id: str = None, **attrs):
+    if not TRACING_ENABLED or (TRACE_SAMPLE_RATE < 1.0 and random.random() >= TRACE_SAMPLE_RATE):
+        yield None
+        return
+    s = Span(trace_id or new_request_id(), None, name, attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.attrs['error'] = str(e)[:200]
+        raise
+    finally:
+        _current.reset(token)
+        s.end = time.time()
+        _export(s)
+
+@contextmanager
+def span(name: str, **attrs):
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(parent.trace_id, parent.span_id, name, attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.attrs['error'] = str(e)[:200]
+        raise
+    finally:
+        _current.reset(token)
+        s.end = time.time()
+        _export(s)
+
+def traced(name: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_trace(trace_id: str):
+    # Only this process's files are searched; the scan is bounded by the rotation cap
+    with _recent_lock:
+        spans = list(_recent.get(trace_id, []))
+    if spans:
+        return sorted(spans, key=lambda d: d['start'])
+    needle = f'"trace_id": "{trace_id}"'
+    for path in trace_files():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if needle in line:
+                        try:
+                            spans.append(json.loads(line))
+                        except ValueError:
+                            continue
+        except OSError:
+            continue
+        if spans:
+            break
+    return sorted(spans, key=lambda d: d['start'])
+
+def render_trace_text(spans) -> str:
+    # Indented waterfall: offset from trace start, duration, span name
+    if not spans:
+        return 'trace not found\n'
+    by_parent = {}
+    ids = {s['span_id'] for s in spans}
+    for s in spans:
+        parent = s['parent_id'] if s['parent_id'] in ids else None
+        by_parent.setdefault(parent, []).append(s)
+    t0 = min(s['start'] for s in spans)
+    lines = []
+
+    def walk(parent, depth):
+        for s in by_parent.get(parent, []):
+            duration = s['duration_ms'] if s['duration_ms'] is not None else 0
+            lines.append(f"{(s['start'] - t0) * 1000:9.1f}ms {duration:9.1f}ms  {'  ' * depth}{s['name']} [{s['thread']}]")
+            walk(s['span_id'], depth + 1)
+
+    walk(None, 0)
+    return '\n'.join(lines) + '\n'
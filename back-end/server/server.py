@@ -1,63 +1,65 @@
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import asyncio
+import contextvars
 import json
+import math
 import threading
 import base64
 import os
+import select
+import signal
+import socket
 import sys
 import urllib.parse
 import urllib.request
-import pandas as pd
-from datetime import datetime
-try:
-    from deep_translator import GoogleTranslator
-except Exception:
-    GoogleTranslator = None
+import time
 
 backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, backend_root)
 
-try:
-    from audio_to_text import process_frames as at_process_frames
-    from audio_to_text import set_lang as at_set_lang
-    from audio_to_text import set_rate as at_set_rate
-    from audio_to_text import set_channels as at_set_channels
-    from audio_to_text import force_final as at_force_final
-except Exception as e:
-    at_process_frames = None
-    at_set_lang = None
-    at_set_rate = None
-    at_set_channels = None
-    at_force_final = None
-    print("asr_import_error", str(e), flush=True)
-
-try:
-    from logic.text.analysis import save_freq
-except Exception as e:
-    save_freq = None
-    print("analysis_import_error", str(e), flush=True)
-
-try:
-    from logic.text.translate import translation_api_call
-except Exception as e:
-    translation_api_call = None
-    print("openai_translation_import_error", str(e), flush=True)
+from observability import startup
+from observability import health
 
-try:
-    from logic.tss.tss import speak, save_to_file
-except Exception as e:
-    speak = None
-    save_to_file = None
-    print("tss_import_error", str(e), flush=True)
+# Imported on first use or by the background warm-up, never at module load (see startup.py)
+GoogleTranslator = startup.deferred('deep_translator', 'deep_translator', 'GoogleTranslator')
+at_process_frames = startup.deferred('asr', 'audio_to_text', 'process_frames')
+save_freq = startup.deferred('analysis', 'logic.text.analysis', 'save_freq')
+translation_api_call = startup.deferred('openai_translation', 'logic.text.translate', 'translation_api_call')
+save_to_file = startup.deferred('tss', 'logic.tss.tss', 'save_to_file')
+generate_audio_file = startup.deferred('generate_audio', 'generate_audio', 'generate_audio_file')
+websockets = startup.deferred('websockets', 'websockets')
 
 try:
-    from database.connection import db_pool
-    from database.queries import get_user_vocab, get_global_vocab, upsert_global_vocab, increment_global_vocab_count, upsert_user_vocab, get_vocab_translation, record_remember, record_dont_remember, is_admin, save_recording
-    from api.auth import handle_register, handle_login
-    from api.middleware import require_auth, create_auth_response
-    from api.admin import handle_admin_login, handle_admin_list_users, handle_admin_delete_user, handle_admin_add_user, handle_admin_list_vocab, handle_admin_delete_vocab, handle_admin_update_translation
+    with startup.timed('database'):
+        from database.connection import db_pool, PoolTimeout
+        from database.queries import get_user_vocab, get_global_vocab, upsert_global_vocab, increment_global_vocab_count, upsert_user_vocab, get_vocab_translation, record_remember, record_dont_remember, is_admin, warm_global_vocab_cache, get_translation_gaps, update_global_vocab_translation
+        from database import vocab_cache
+        from database.counters import global_vocab_counts
+        from database.passwords import pool as password_pool, bcrypt
+        from api.auth import handle_register, handle_login
+        from api.middleware import require_auth, create_auth_response
+        from api.admin import handle_admin_login, handle_admin_list_users, handle_admin_delete_user, handle_admin_add_user, handle_admin_list_vocab, handle_admin_delete_vocab, handle_admin_update_translation, handle_admin_audio_status, handle_admin_profile, handle_admin_search_vocab, admin_export_lines
+        from api.search import handle_vocab_search
 except Exception as e:
     db_pool = None
+    # An empty tuple matches nothing in an except clause
+    PoolTimeout = ()
+    vocab_cache = None
+    get_user_vocab = None
+    get_global_vocab = None
+    upsert_global_vocab = None
+    increment_global_vocab_count = None
+    upsert_user_vocab = None
+    get_vocab_translation = None
+    record_remember = None
+    record_dont_remember = None
+    is_admin = None
+    global_vocab_counts = None
+    password_pool = None
+    bcrypt = None
+    get_translation_gaps = None
+    update_global_vocab_translation = None
+    warm_global_vocab_cache = None
     handle_register = None
     handle_login = None
     require_auth = None
@@ -69,666 +71,594 @@ except Exception as e:
     handle_admin_list_vocab = None
     handle_admin_delete_vocab = None
     handle_admin_update_translation = None
-    save_recording = None
+    handle_admin_audio_status = None
+    handle_admin_profile = None
+    handle_admin_search_vocab = None
+    admin_export_lines = None
+    handle_vocab_search = None
     print("auth_import_error", str(e), flush=True)
 
 try:
-    from generate_audio import generate_audio_file
-except Exception:
-    generate_audio_file = None
+    from api.recordings import handle_recording_stream, handle_recording_json, is_streaming_upload, RECORDING_MAX_BYTES
+except Exception as e:
+    handle_recording_stream = None
+    handle_recording_json = None
+    is_streaming_upload = None
+    RECORDING_MAX_BYTES = 0
+    print("recordings_import_error", str(e), flush=True)
 
 try:
-    import websockets
-except Exception:
-    websockets = None
+    from storage.recordings import start_lifecycle_thread as start_recording_lifecycle
+except Exception as e:
+    start_recording_lifecycle = None
+    print("recording_storage_import_error", str(e), flush=True)
+
+from observability import metrics
+from observability import tracing
+from observability import profiler
+from observability.jobs import spawn as spawn_job, drain as drain_jobs
+from api.encoding import dumps
+from api import compression
+from api.router import Router, Request, Response, json_response, json_array_response, not_found, unavailable, DEFAULT_MAX_BODY
+from api import ratelimit
+
+# Streamed bodies are written in chunks of about this size rather than a syscall per row
+STREAM_CHUNK_BYTES = 64 * 1024
+# A client that stops reading a stream for this long is dropped rather than holding the thread
+STREAM_WRITE_TIMEOUT = float(os.getenv('STREAM_WRITE_TIMEOUT', '10'))
+NDJSON_TYPE = 'application/x-ndjson'
+
+FRONT_END_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end')
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'database', 'data')
+
+router = Router(user_auth=require_auth, admin_auth=is_admin, limiter=ratelimit.limit, saturated=PoolTimeout)
+
+def text_cost(base: int):
+    # MeCab and translation work grow with the text; each started 1000 characters adds a unit
+    return lambda req: base + len(str(req.json.get('text', ''))) // 1000
+
+HANDLER_LATENCY = metrics.histogram('http_handler_duration_seconds', 'Route handler time, excluding body read and response write', ('route', 'method'))
+
+@router.on_timing
+def observe_handler(route, status, seconds):
+    HANDLER_LATENCY.observe(seconds, (route.metric, route.method))
+
+# Bytes before and after Content-Encoding for compressed responses; the difference is the saving
+COMPRESSION_IN = metrics.counter('http_compression_input_bytes_total', 'Response bytes before compression', ('encoding',))
+COMPRESSION_OUT = metrics.counter('http_compression_output_bytes_total', 'Response bytes sent after compression', ('encoding',))
+COMPRESSION_SKIPPED = metrics.counter('http_compression_skipped_total', 'Compressible responses sent uncompressed', ('reason',))
+metrics.gauge('http_compression_cache_bytes', 'Compressed static files held in memory', fn=lambda: compression.static_cache.bytes)
+
+def metric_route(route, path: str) -> str:
+    # Registered routes are reported by their path; everything else collapses into a few
+    # labels so arbitrary request paths cannot blow up metric cardinality.
+    if route is None:
+        return 'other'
+    if route.path is None and path.endswith(('.js', '.css', '.html')):
+        return 'static'
+    return route.metric
+
+if db_pool:
+    metrics.gauge('db_pool_connections_in_use', 'Connections currently checked out of the pool', fn=lambda: db_pool.in_use)
+    metrics.gauge('db_pool_connections_max', 'Configured pool size', fn=lambda: db_pool.maxconn)
+    metrics.counter('db_pool_exhausted_total', 'Checkouts that timed out waiting for a connection', fn=lambda: db_pool.exhausted)
+    metrics.gauge('db_pool_connections_idle', 'Open connections waiting in the pool', fn=lambda: db_pool.stats()['idle'])
+    metrics.gauge('db_pool_waiting', 'Threads currently blocked on checkout', fn=lambda: db_pool.waiting)
+    metrics.counter('db_pool_waits_total', 'Checkouts that had to wait for a connection', fn=lambda: db_pool.waits)
+    metrics.counter('db_pool_wait_seconds_total', 'Total time spent waiting for a connection', fn=lambda: round(db_pool.wait_seconds, 6))
+    metrics.counter('db_pool_replaced_total', 'Connections closed because they were broken or too old', label_names=('reason',),
+                    fn=lambda: {('broken',): db_pool.broken, ('max_age',): db_pool.recycled})
+    metrics.gauge('global_vocab_cache_rows', 'Rows held in the in-process global_vocab cache', fn=lambda: len(vocab_cache.cache))
+    metrics.gauge('global_vocab_count_pending', 'Words with unflushed global_vocab.count deltas', fn=lambda: len(global_vocab_counts.pending))
+    metrics.gauge('global_vocab_count_staleness_seconds', 'Age of the oldest unflushed count delta', fn=global_vocab_counts.staleness)
+    metrics.gauge('global_vocab_count_max_staleness_seconds', 'Largest delta age seen at flush time', fn=lambda: global_vocab_counts.max_staleness)
+    metrics.counter('global_vocab_count_flushed_rows_total', 'Rows updated by count flushes', fn=lambda: global_vocab_counts.flushed_rows)
+    metrics.counter('global_vocab_count_dropped_total', 'Count increments discarded while the flush buffer was full', fn=lambda: global_vocab_counts.dropped)
+    metrics.gauge('password_jobs_pending', 'bcrypt hashes and checks running or queued', fn=lambda: password_pool.pending)
+    metrics.gauge('password_jobs_queued', 'bcrypt hashes and checks waiting for a worker', fn=lambda: password_pool.queued)
+    metrics.counter('password_jobs_completed_total', 'bcrypt hashes and checks completed', fn=lambda: password_pool.completed)
+    metrics.counter('password_jobs_rejected_total', 'bcrypt jobs shed by admission control', fn=lambda: password_pool.rejected)
+    metrics.counter('password_busy_seconds_total', 'Time spent in bcrypt', fn=lambda: round(password_pool.busy_seconds, 6))
+    metrics.gauge('password_job_cost_seconds', 'Moving average duration of one bcrypt operation', fn=lambda: password_pool.cost)
+
+metrics.counter('trace_spans_dropped_total', 'Spans not written to the trace file because the writer fell behind', fn=lambda: tracing.dropped)
+metrics.gauge('trace_export_queue', 'Spans waiting for the trace writer', fn=tracing.pending)
 
 class SimpleHandler(BaseHTTPRequestHandler):
-    def _set_cors(self):
-        origin = self.headers.get('Origin', '*')
-        self.send_header('Access-Control-Allow-Origin', origin)
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, Accept')
-        self.send_header('Access-Control-Allow-Credentials', 'true')
-        self.send_header('Access-Control-Max-Age', '3600')
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
 
-    def do_OPTIONS(self):
-        self.send_response(204)
-        self._set_cors()
-        self.end_headers()
+    def _observed(self, method):
+        self._status = 0
+        self._request_id = tracing.request_id_from(self.headers.get('X-Request-ID'))
+        url = urllib.parse.urlparse(self.path)
+        route = router.resolve(method, url.path)
+        label = metric_route(route, url.path)
+        started = time.perf_counter()
+        profiled = profiler.sampling
+        if profiled:
+            profiler.enter_route(label)
+        try:
+            with tracing.start_trace(f'{method} {label}', trace_id=self._request_id, route=label):
+                self._dispatch(route, Request(self, method, url.path, urllib.parse.parse_qs(url.query)))
+        finally:
+            if profiled:
+                profiler.exit_route()
+            metrics.observe_request(label, method, self._status or 500, time.perf_counter() - started)
 
     def do_GET(self):
-        url = urllib.parse.urlparse(self.path)
-        path = url.path
-        if path in ('/', '/debug'):
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'base.html')
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception:
-                body = b'OK'
-                ct = 'text/plain; charset=utf-8'
-        elif path == '/app':
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'base.html')
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception:
-                body = b'OK'
-                ct = 'text/plain; charset=utf-8'
-        elif path.startswith('/src/'):
-            try:
-                fname = path[1:]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', fname)
-                with open(p, 'rb') as f:
-                    body = f.read()
-                if fname.endswith('.js'):
-                    ct = 'application/javascript; charset=utf-8'
-                else:
-                    ct = 'text/plain; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path == '/style.css':
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'style.css')
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/css; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path.endswith('.js'):
-            try:
-                fname = path[1:]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', fname)
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'application/javascript; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path == '/admin' or path == '/admin.html':
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'admin.html')
-                abs_path = os.path.abspath(p)
-                if not os.path.exists(abs_path):
-                    print(f"Admin file not found at: {abs_path}", flush=True)
-                    self.send_error(404)
-                    return
-                with open(abs_path, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception as e:
-                print(f"Error serving admin.html: {e}", flush=True)
-                import traceback
-                traceback.print_exc()
-                self.send_error(404)
-                return
-        elif path.endswith('.html'):
-            try:
-                fname = path[1:]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', fname)
-                if not os.path.exists(p):
-                    print(f"File not found: {p} (requested: {path})", flush=True)
-                    self.send_error(404)
-                    return
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception as e:
-                print(f"Error serving HTML file {path}: {e}", flush=True)
-                self.send_error(404)
-                return
-        elif path.startswith('/templates/'):
-            try:
-                fname = path[len('/templates/'):]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'templates', fname)
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path.startswith('/data/'):
-            fname = urllib.parse.unquote(path[6:])
-            try:
-                fpath = os.path.join(os.path.dirname(__file__), '..', 'database', 'data', fname)
-                if os.path.exists(fpath) and os.path.isfile(fpath):
-                    with open(fpath, 'rb') as f:
-                        body = f.read()
-                    if fname.endswith('.csv'):
-                        ct = 'text/csv; charset=utf-8'
-                    elif fname.endswith('.mp3'):
-                        ct = 'audio/mpeg'
-                    else:
-                        ct = 'application/octet-stream'
-                else:
-                    print(f"File not found: {fpath} (requested: {path})", flush=True)
-                    self.send_error(404)
-                    return
-            except Exception as e:
-                print(f"Error serving file {path}: {e}", flush=True)
-                self.send_error(404)
-                return
-        elif path == '/vocab/list':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'items': [], 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            try:
-                native_lang = user.get('native_language', 'en') or 'en'
-                rows = get_user_vocab(user['id'], native_lang) if get_user_vocab else []
-                body = json.dumps({'items': rows}, ensure_ascii=False).encode('utf-8')
-                ct = 'application/json; charset=utf-8'
-            except Exception:
-                body = json.dumps({'items': []}).encode('utf-8')
-                ct = 'application/json; charset=utf-8'
-        else:
-            body = b'OK'
-            ct = 'text/plain; charset=utf-8'
-        
-        self.send_response(200)
-        self.send_header('Content-Type', ct)
+        self._observed('GET')
+
+    def do_POST(self):
+        self._observed('POST')
+
+    def _dispatch(self, route, req):
+        try:
+            response = router.dispatch(route, req)
+        except Exception as e:
+            print(f"handler_error {req.method} {req.path}: {e}", flush=True)
+            if self._status:
+                return
+            response = json_response({'success': False, 'error': 'server_error', 'details': str(e)}, 500)
+        self._send(response)
+
+    def _encoding_for(self, response):
+        # Content-Encoding to apply, or None. Vary is set on every compressible response so
+        # caches keep the identity and compressed variants apart.
+        if not compression.compressible(response.content_type) or 'Content-Encoding' in response.headers:
+            return None
+        response.headers['Vary'] = 'Accept-Encoding'
+        encoding = compression.negotiate(self.headers.get('Accept-Encoding'))
+        if encoding is None:
+            COMPRESSION_SKIPPED.inc(('not_accepted',))
+        elif response.stream is None and len(response.body) < compression.MIN_BYTES:
+            COMPRESSION_SKIPPED.inc(('too_small',))
+            return None
+        return encoding
+
+    def _send(self, response):
+        encoding = self._encoding_for(response)
+        if response.stream is not None:
+            self._send_stream(response, encoding)
+            return
+        body = response.body
+        if encoding:
+            if response.cache_key is not None:
+                body, hit = compression.static_cache.get(response.cache_key, body, encoding)
+                metrics.record_cache('compressed_static', hit)
+            else:
+                body = compression.compress(body, encoding)
+            COMPRESSION_IN.inc((encoding,), len(response.body))
+            COMPRESSION_OUT.inc((encoding,), len(body))
+            response.headers['Content-Encoding'] = encoding
+        self.send_response(response.status)
+        self.send_header('Content-Type', response.content_type)
         self.send_header('Content-Length', str(len(body)))
+        for name, value in response.headers.items():
+            self.send_header(name, value)
         self._set_cors()
         self.end_headers()
         self.wfile.write(body)
 
-    def do_POST(self):
-        if self.path == '/register':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_register(b) if handle_register else {'success': False, 'error': 'auth_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/login':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            print(f"Login request received: {len(b)} bytes", flush=True)
-            try:
-                import json as json_module
-                req_data = json_module.loads(b.decode('utf-8'))
-                print(f"Login attempt for user: {req_data.get('username', 'unknown')}", flush=True)
-            except Exception as e:
-                print(f"Error parsing login request: {e}", flush=True)
-            out = handle_login(b) if handle_login else {'success': False, 'error': 'auth_not_available'}
-            print(f"Login response: success={out.get('success', False)}, error={out.get('error', 'none')}", flush=True)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/upload':
-            n = int(self.headers.get('Content-Length', 0))
-            _ = self.rfile.read(n)
-            body = b'audio received'
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain; charset=utf-8')
-            self.send_header('Content-Length', str(len(body)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(body)
-            return
-        elif self.path == '/translate':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_translate(b)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/analyze':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'words': [], 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_analyze(b)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/vocab/ingest':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            native_lang = user.get('native_language', 'en') or 'en'
-            out = handle_vocab_ingest(b, user['id'], native_lang)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/learn/remember':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                base = str(j.get('base', ''))
-                pos = str(j.get('pos', ''))
-                if base and pos:
-                    success = record_remember(user['id'], base, pos) if record_remember else False
-                    out = {'success': success}
-                else:
-                    out = {'success': False, 'error': 'missing_fields'}
-            except Exception:
-                out = {'success': False, 'error': 'bad_json'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/learn/dont-remember':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                base = str(j.get('base', ''))
-                pos = str(j.get('pos', ''))
-                if base and pos:
-                    success = record_dont_remember(user['id'], base, pos) if record_dont_remember else False
-                    out = {'success': success}
-                else:
-                    out = {'success': False, 'error': 'missing_fields'}
-            except Exception:
-                out = {'success': False, 'error': 'bad_json'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/tts':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_tts(b)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/recording/save':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                audio_base64 = j.get('audio', '')
-                role = j.get('role', 'speak')
-                transcript = j.get('transcript')
-                language = j.get('language')
-                
-                if not audio_base64:
-                    out = {'success': False, 'error': 'no_audio'}
-                else:
-                    # Save audio file
-                    import uuid
-                    recordings_dir = os.path.join(backend_root, 'database', 'data', 'recordings')
-                    os.makedirs(recordings_dir, exist_ok=True)
-                    
-                    audio_filename = f"{user['id']}_{uuid.uuid4().hex}.webm"
-                    audio_path = os.path.join(recordings_dir, audio_filename)
-                    
-                    audio_data = base64.b64decode(audio_base64)
-                    with open(audio_path, 'wb') as f:
-                        f.write(audio_data)
-                    
-                    # Save to database
-                    relative_path = os.path.join('recordings', audio_filename)
-                    success = save_recording(user['id'], role, relative_path, transcript, language) if save_recording else False
-                    out = {'success': success}
-            except Exception as e:
-                print(f"Error saving recording: {e}", flush=True)
-                import traceback
-                traceback.print_exc()
-                out = {'success': False, 'error': str(e)[:100]}
-            
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/login':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_admin_login(b) if handle_admin_login else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/users':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n) if n > 0 else b'{}'
-            try:
-                j = json.loads(b.decode('utf-8'))
-                username = j.get('username', '')
-                password = j.get('password', '')
-                if not is_admin(username, password) if is_admin else False:
-                    body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except Exception:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            out = handle_admin_list_users() if handle_admin_list_users else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
+    def _set_cors(self):
+        origin = self.headers.get('Origin', '*')
+        self.send_header('Access-Control-Allow-Origin', origin)
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, Accept, X-Recording-Role, X-Recording-Language, X-Recording-Transcript')
+        self.send_header('Access-Control-Allow-Credentials', 'true')
+        self.send_header('Access-Control-Max-Age', '3600')
+        self.send_header('Access-Control-Expose-Headers', 'X-Request-ID')
+        self.send_header('X-Request-ID', getattr(self, '_request_id', ''))
+
+    def _send_stream(self, response, encoding=None):
+        # No Content-Length: the body ends when the connection closes. The first chunk is
+        # pulled before the status line so a failing query can still answer 500.
+        lines = response.stream
+        try:
+            first = next(lines, b'')
+        except router.saturated as e:
+            print(f"unavailable stream: {e}", flush=True)
+            self._send(unavailable())
             return
-        elif self.path == '/admin/users/delete':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                username = j.get('admin_username', '')
-                password = j.get('admin_password', '')
-                if not is_admin(username, password) if is_admin else False:
-                    body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except Exception:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            out = handle_admin_delete_user(b) if handle_admin_delete_user else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
+        except Exception as e:
+            self._send(json_response({'success': False, 'error': 'server_error', 'details': str(e)}, 500))
             return
-        elif self.path == '/admin/users/add':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                username = j.get('admin_username', '')
-                password = j.get('admin_password', '')
-                if not is_admin(username, password) if is_admin else False:
-                    body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except Exception:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            out = handle_admin_add_user(b) if handle_admin_add_user else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
+        compressor = compression.StreamCompressor(encoding) if encoding else None
+        if compressor:
+            response.headers['Content-Encoding'] = encoding
+        self.send_response(response.status)
+        self.send_header('Content-Type', response.content_type)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self._set_cors()
+        self.end_headers()
+        self.close_connection = True
+        self.connection.settimeout(STREAM_WRITE_TIMEOUT)
+
+        def write(data, last=False):
+            if compressor:
+                out = compressor.chunk(data) + (compressor.finish() if last else b'')
+                COMPRESSION_IN.inc((encoding,), len(data))
+                COMPRESSION_OUT.inc((encoding,), len(out))
+                data = out
             self.wfile.write(data)
-            return
-        elif self.path == '/admin/vocab':
-            try:
-                n = int(self.headers.get('Content-Length', 0))
-                b = self.rfile.read(n) if n > 0 else b'{}'
-                try:
-                    j = json.loads(b.decode('utf-8'))
-                    username = j.get('username', '')
-                    password = j.get('password', '')
-                    if not is_admin(username, password) if is_admin else False:
-                        body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                        self.send_response(401)
-                        self.send_header('Content-Type', 'application/json; charset=utf-8')
-                        self.send_header('Content-Length', str(len(body)))
-                        self._set_cors()
-                        self.end_headers()
-                        self.wfile.write(body)
-                        return
-                except Exception as e:
-                    body = json.dumps({'success': False, 'error': 'unauthorized', 'details': str(e)}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-                out = handle_admin_list_vocab() if handle_admin_list_vocab else {'success': False, 'error': 'admin_not_available'}
-                data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(data)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(data)
-                return
-            except Exception as e:
-                body = json.dumps({'success': False, 'error': 'server_error', 'details': str(e)}).encode('utf-8')
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-        elif self.path == '/admin/vocab/delete':
-            try:
-                n = int(self.headers.get('Content-Length', 0))
-                b = self.rfile.read(n)
-                try:
-                    j = json.loads(b.decode('utf-8'))
-                    username = j.get('admin_username', '')
-                    password = j.get('admin_password', '')
-                    if not is_admin(username, password) if is_admin else False:
-                        body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                        self.send_response(401)
-                        self.send_header('Content-Type', 'application/json; charset=utf-8')
-                        self.send_header('Content-Length', str(len(body)))
-                        self._set_cors()
-                        self.end_headers()
-                        self.wfile.write(body)
-                        return
-                except Exception as e:
-                    body = json.dumps({'success': False, 'error': 'unauthorized', 'details': str(e)}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-                out = handle_admin_delete_vocab(b) if handle_admin_delete_vocab else {'success': False, 'error': 'admin_not_available'}
-                data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(data)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(data)
-                return
-            except Exception as e:
-                body = json.dumps({'success': False, 'error': 'server_error', 'details': str(e)}).encode('utf-8')
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-        elif self.path == '/admin/translations/update':
+
+        chunk = [first]
+        size = len(first)
+        try:
+            for line in lines:
+                chunk.append(line)
+                size += len(line)
+                if size >= STREAM_CHUNK_BYTES:
+                    write(b''.join(chunk))
+                    chunk, size = [], 0
+            write(b''.join(chunk), last=True)
+        except OSError:
+            pass
+        except Exception as e:
+            # Status is already sent; for NDJSON a trailing error object tells the client the
+            # export is cut short, a JSON document is simply left incomplete
+            print(f"stream_error: {e}", flush=True)
+            trailer = dumps({'error': str(e)}) + b'\n' if response.content_type.startswith(NDJSON_TYPE) else b''
             try:
-                n = int(self.headers.get('Content-Length', 0))
-                b = self.rfile.read(n)
-                try:
-                    j = json.loads(b.decode('utf-8'))
-                    username = j.get('admin_username', '')
-                    password = j.get('admin_password', '')
-                    if not is_admin(username, password) if is_admin else False:
-                        body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                        self.send_response(401)
-                        self.send_header('Content-Type', 'application/json; charset=utf-8')
-                        self.send_header('Content-Length', str(len(body)))
-                        self._set_cors()
-                        self.end_headers()
-                        self.wfile.write(body)
-                        return
-                except Exception as e:
-                    body = json.dumps({'success': False, 'error': 'unauthorized', 'details': str(e)}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-                out = handle_admin_update_translation(b) if handle_admin_update_translation else {'success': False, 'error': 'admin_not_available'}
-                data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(data)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(data)
-                return
-            except Exception as e:
-                body = json.dumps({'success': False, 'error': 'server_error', 'details': str(e)}).encode('utf-8')
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
+                write(b''.join(chunk) + trailer, last=True)
+            except OSError:
+                pass
+        finally:
+            lines.close()
 
-        body = json.dumps({'success': False, 'error': 'not_found'}).encode('utf-8')
-        self.send_response(404)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(body)))
+    def do_OPTIONS(self):
+        self.send_response(204)
         self._set_cors()
         self.end_headers()
-        self.wfile.write(body)
 
-def start_http(port: int):
-    HTTPServer(('', port), SimpleHandler).serve_forever()
+def read_file(path: str):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def front_end_file(name: str, ct: str) -> Response:
+    path = os.path.join(FRONT_END_DIR, name)
+    body = read_file(path)
+    if body is None:
+        print(f"File not found: {os.path.abspath(path)}", flush=True)
+        return not_found()
+    return Response(body, ct, cache_key=static_key(path, body))
+
+def static_key(path: str, body: bytes):
+    # mtime and size change when a file is edited in place, which invalidates its cached
+    # compressed copies
+    try:
+        return (path, os.stat(path).st_mtime_ns, len(body))
+    except OSError:
+        return None
+
+def auth_status(out: dict) -> Response:
+    # Password work over its admission limit is shed with 503 so clients back off; without
+    # bcrypt installed no sign-in can succeed, which is also a 503 rather than a wrong password
+    if out.get('retry_after') is not None:
+        return json_response(out, 503, {'Retry-After': str(max(1, math.ceil(out['retry_after'])))})
+    if out.get('error') == 'auth_unavailable':
+        return json_response(out, 503)
+    return json_response(out)
+
+@router.get('/', '/debug', '/app', body=False)
+def get_base_page(req):
+    path = os.path.join(FRONT_END_DIR, 'base.html')
+    body = read_file(path)
+    if body is None:
+        return Response(b'OK')
+    return Response(body, 'text/html; charset=utf-8', cache_key=static_key(path, body))
+
+@router.get('/admin', '/admin.html', body=False)
+def get_admin_page(req):
+    return front_end_file('admin.html', 'text/html; charset=utf-8')
+
+@router.get('/style.css', body=False)
+def get_style(req):
+    return front_end_file('style.css', 'text/css; charset=utf-8')
+
+@router.get('/src/', body=False, metric='static')
+def get_src(req):
+    fname = req.path[1:]
+    return front_end_file(fname, 'application/javascript; charset=utf-8' if fname.endswith('.js') else 'text/plain; charset=utf-8')
+
+@router.get('/templates/', body=False, metric='static')
+def get_template(req):
+    return front_end_file(os.path.join('templates', req.path[len('/templates/'):]), 'text/html; charset=utf-8')
+
+@router.get('/data/', body=False, metric='data')
+def get_data_file(req):
+    fname = urllib.parse.unquote(req.path[len('/data/'):])
+    fpath = os.path.join(DATA_DIR, fname)
+    body = read_file(fpath) if os.path.isfile(fpath) else None
+    if body is None:
+        print(f"File not found: {fpath} (requested: {req.path})", flush=True)
+        return not_found()
+    if fname.endswith('.csv'):
+        ct = 'text/csv; charset=utf-8'
+    elif fname.endswith('.mp3'):
+        ct = 'audio/mpeg'
+    else:
+        ct = 'application/octet-stream'
+    return Response(body, ct, cache_key=static_key(fpath, body))
+
+def get_other(req):
+    if req.path.endswith('.js'):
+        return front_end_file(req.path[1:], 'application/javascript; charset=utf-8')
+    if req.path.endswith('.html'):
+        return front_end_file(req.path[1:], 'text/html; charset=utf-8')
+    return Response(b'OK')
+
+router.set_fallback('GET', get_other)
+
+@router.get('/metrics', body=False)
+def get_metrics(req):
+    return Response(metrics.render(), 'text/plain; version=0.0.4; charset=utf-8')
+
+def probe_db():
+    if not db_pool:
+        raise health.Unavailable('database layer not loaded')
+    with db_pool.connection(timeout=1) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        conn.rollback()
+    return {'in_use': db_pool.in_use, 'max': db_pool.maxconn}
+
+def probe_tagger():
+    if not save_freq:
+        raise health.Unavailable('analysis module not loaded')
+    if getattr(sys.modules.get('logic.text.analysis'), 'mecab', None) is None:
+        raise health.Unavailable('MeCab is not installed')
+    # save_freq answers an empty frame when the dictionary cannot be loaded
+    if save_freq('안녕하세요').empty:
+        raise RuntimeError('tagger returned no tokens')
+
+def probe_bcrypt():
+    if not bcrypt:
+        raise health.Unavailable('bcrypt is not installed; sign-in and registration answer 503')
+
+def probe_asr():
+    if not at_process_frames:
+        raise health.Unavailable('ASR module not loaded')
+
+def probe_reachable(url: str, available):
+    def fn():
+        if not available():
+            raise health.Unavailable('client not configured')
+        try:
+            urllib.request.urlopen(urllib.request.Request(url, method='HEAD'), timeout=PROBE_HTTP_TIMEOUT).close()
+        except urllib.error.HTTPError:
+            # Any HTTP answer, 401 and 404 included, means the provider is reachable
+            pass
+    return fn
+
+PROBE_HTTP_TIMEOUT = 2.0
+health.probe('db', probe_db, ttl=5)
+health.probe('tagger', probe_tagger, ttl=30, timeout=5)
+health.probe('asr', probe_asr, ttl=300)
+health.probe('bcrypt', probe_bcrypt, ttl=300)
+health.probe('translator_google', probe_reachable('https://translate.google.com/', lambda: bool(GoogleTranslator)), ttl=60, timeout=PROBE_HTTP_TIMEOUT)
+health.probe('translator_openai', probe_reachable('https://api.openai.com/v1/models', lambda: bool(translation_api_call) and bool(os.getenv('OPENAI_API_KEY'))),
+             ttl=60, timeout=PROBE_HTTP_TIMEOUT)
+startup.on_warm('health_probes', health.refresh_all)
+
+@router.get('/healthz', body=False)
+def get_healthz(req):
+    # Liveness only: answering at all means the serving thread is not wedged
+    return json_response(dict(health.liveness(), worker=os.getenv('SERVER_WORKER_INDEX')))
+
+@router.get('/readyz', body=False)
+def get_readyz(req):
+    # 503 until warm-up is done and while any probe in READY_REQUIRED fails. Probe results are
+    # cached (see health.py), so polling this costs nothing downstream.
+    out = health.readiness()
+    out['ready'] = out['ready'] and startup.ready.is_set()
+    out['warmup'] = startup.status()
+    return json_response(out, 200 if out['ready'] else 503)
+
+
+@router.get('/quota', body=False, auth='user')
+def get_quota(req):
+    return json_response(dict(ratelimit.quota_status(req.user['id']), success=True))
+
+@router.get('/vocab/list', body=False, auth='user', unauthorized={'items': []})
+def get_vocab_list(req):
+    try:
+        native_lang = req.user.get('native_language', 'en') or 'en'
+        rows = get_user_vocab(req.user['id'], native_lang) if get_user_vocab else []
+        return json_array_response({'items': rows}, 'items')
+    except PoolTimeout:
+        raise
+    except Exception:
+        return json_response({'items': []})
+
+@router.get('/vocab/search', body=False, auth='user', unauthorized={'items': []})
+def get_vocab_search(req):
+    if not handle_vocab_search:
+        return json_response({'success': False, 'error': 'search_not_available', 'items': []})
+    return json_response(handle_vocab_search(req.query, req.user))
+
+@router.post('/register')
+def post_register(req):
+    limited = ratelimit.password_attempt(req, '/register')
+    if limited:
+        return limited
+    return auth_status(handle_register(req.json) if handle_register else {'success': False, 'error': 'auth_not_available'})
+
+@router.post('/login')
+def post_login(req):
+    print(f"Login attempt for user: {req.json.get('username', 'unknown')}", flush=True)
+    limited = ratelimit.password_attempt(req, '/login', req.json.get('username'))
+    if limited:
+        return limited
+    out = handle_login(req.json) if handle_login else {'success': False, 'error': 'auth_not_available'}
+    print(f"Login response: success={out.get('success', False)}, error={out.get('error', 'none')}", flush=True)
+    return auth_status(out)
+
+@router.post('/upload', json_body=False, max_body=max(RECORDING_MAX_BYTES, DEFAULT_MAX_BODY))
+def post_upload(req):
+    return Response(b'audio received')
+
+@router.post('/translate', auth='optional', cost=text_cost(1))
+def post_translate(req):
+    return json_response(handle_translate(req.json))
+
+@router.post('/analyze', auth='user', unauthorized={'words': []}, cost=text_cost(2))
+def post_analyze(req):
+    return json_response(handle_analyze(req.json))
+
+@router.post('/vocab/ingest', auth='user', cost=text_cost(5))
+def post_vocab_ingest(req):
+    native_lang = req.user.get('native_language', 'en') or 'en'
+    return json_response(handle_vocab_ingest(req.json, req.user['id'], native_lang))
+
+def learn_route(record):
+    def handler(req):
+        base = str(req.json.get('base', ''))
+        pos = str(req.json.get('pos', ''))
+        if not base or not pos:
+            return json_response({'success': False, 'error': 'missing_fields'})
+        return json_response({'success': record(req.user['id'], base, pos) if record else False})
+    return handler
+
+router.add('POST', '/learn/remember', learn_route(record_remember), auth='user')
+router.add('POST', '/learn/dont-remember', learn_route(record_dont_remember), auth='user')
+
+@router.post('/tts', auth='optional', cost=text_cost(3))
+def post_tts(req):
+    return json_response(handle_tts(req.json))
+
+# The body is left unread: raw audio is streamed to disk by the recordings module
+@router.post('/recording/save', auth='user', body=False)
+def post_recording_save(req):
+    status = 200
+    if not handle_recording_stream:
+        out = {'success': False, 'error': 'recordings_not_available'}
+    elif is_streaming_upload(req.headers.get('Content-Type', '')):
+        # Raw audio body: streamed to disk in chunks, metadata in X-Recording-* headers
+        status, out = handle_recording_stream(req.rfile, req.headers, req.user)
+    else:
+        n = int(req.headers.get('Content-Length', 0))
+        if n > RECORDING_MAX_BYTES * 4 // 3 + 65536:
+            req.handler.close_connection = True
+            status, out = 413, {'success': False, 'error': 'too_large', 'max_bytes': RECORDING_MAX_BYTES}
+        else:
+            out = handle_recording_json(req.rfile.read(n), req.user)
+    return json_response(out, status)
+
+@router.post('/admin/login')
+def post_admin_login(req):
+    return json_response(handle_admin_login(req.json) if handle_admin_login else {'success': False, 'error': 'admin_not_available'})
+
+def admin_route(fn, array_key=None):
+    def handler(req):
+        out = fn(req.json) if fn else {'success': False, 'error': 'admin_not_available'}
+        return json_array_response(out, array_key) if array_key in out else json_response(out)
+    return handler
+
+router.add('POST', '/admin/users/delete', admin_route(handle_admin_delete_user), auth='admin')
+router.add('POST', '/admin/users/add', admin_route(handle_admin_add_user), auth='admin')
+router.add('POST', '/admin/vocab/search', admin_route(handle_admin_search_vocab), auth='admin')
+router.add('POST', '/admin/vocab/delete', admin_route(handle_admin_delete_vocab), auth='admin')
+router.add('POST', '/admin/translations/update', admin_route(handle_admin_update_translation), auth='admin')
+router.add('POST', '/admin/audio', admin_route(handle_admin_audio_status), auth='admin')
+
+def admin_export(req, kind: str) -> Response:
+    try:
+        lines = admin_export_lines(kind, req.json.get('cursor'))
+    except (ValueError, TypeError):
+        return json_response({'success': False, 'error': 'invalid_params'}, 400)
+    return Response(content_type=NDJSON_TYPE + '; charset=utf-8', stream=lines)
+
+@router.post('/admin/users', auth='admin')
+def post_admin_users(req):
+    if req.json.get('format') == 'ndjson' and admin_export_lines:
+        return admin_export(req, 'users')
+    return admin_route(handle_admin_list_users, 'users')(req)
+
+@router.post('/admin/vocab', auth='admin')
+def post_admin_vocab(req):
+    if req.json.get('format') == 'ndjson' and admin_export_lines:
+        return admin_export(req, 'vocab')
+    return admin_route(handle_admin_list_vocab, 'vocab')(req)
+
+@router.post('/admin/trace', auth='admin')
+def post_admin_trace(req):
+    # Span attributes carry request details, so the viewer sits behind admin credentials
+    trace_id = req.json.get('trace_id')
+    if not tracing.valid_request_id(trace_id):
+        return json_response({'success': False, 'error': 'invalid_trace_id'}, 400)
+    spans = tracing.get_trace(trace_id)
+    if req.json.get('format') == 'text':
+        return Response(tracing.render_trace_text(spans).encode('utf-8'))
+    return json_response({'success': True, 'trace_id': trace_id, 'spans': spans})
+
+@router.post('/admin/profile', auth='admin')
+def post_admin_profile(req):
+    # Sampling runs in the background so the request threads keep serving the
+    # traffic being profiled; poll with ?id=<profile_id> for the result.
+    out = handle_admin_profile(req.query) if handle_admin_profile else {'success': False, 'error': 'admin_not_available'}
+    if req.param('raw') == '1' and 'profile' in out:
+        if out['format'] == 'speedscope':
+            return json_response(out['profile'])
+        return Response(out['profile'].encode('utf-8'))
+    return json_response(out)
+
+router.set_fallback('POST', lambda req: json_response({'success': False, 'error': 'not_found'}, 404))
+
+# Connections handled at once per worker process. Past this the accept loop waits for a
+# request thread to finish, so further connections queue in the listen backlog.
+HTTP_THREADS = int(os.getenv('HTTP_THREADS', '16'))
+
+class ThreadedHTTPServer(HTTPServer):
+    # Each connection is handled on a thread of its own, so a slow route (a bcrypt check, a
+    # translation call) holds up only its own client
+    def __init__(self, address, handler, threads: int = HTTP_THREADS):
+        super().__init__(address, handler)
+        self._slots = threading.BoundedSemaphore(max(threads, 1))
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        t = threading.Thread(target=self._handle, args=(request, client_address), name='http-request', daemon=True)
+        with self._active_lock:
+            self._active.add(t)
+        t.start()
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._active_lock:
+                self._active.discard(threading.current_thread())
+            self._slots.release()
+
+    def join_requests(self, timeout: float) -> int:
+        # Waits up to timeout for requests in flight; returns how many are still running
+        deadline = time.monotonic() + timeout
+        with self._active_lock:
+            threads = list(self._active)
+        for t in threads:
+            t.join(max(deadline - time.monotonic(), 0))
+        return sum(t.is_alive() for t in threads)
+
+class ReusePortHTTPServer(ThreadedHTTPServer):
+    # Several worker processes bind the same port; the kernel balances connections across them
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def make_http_server(port: int, reuse_port: bool = False) -> ThreadedHTTPServer:
+    return (ReusePortHTTPServer if reuse_port else ThreadedHTTPServer)(('', port), SimpleHandler)
 
 def build_msg(d: dict) -> str:
     return json.dumps(d, ensure_ascii=False)
@@ -739,25 +669,34 @@ def parse_json(s: str) -> dict:
     except Exception:
         return {}
 
+WS_MESSAGE_LATENCY = metrics.histogram('ws_message_duration_seconds', 'WebSocket message handling latency by message type', ('type',))
+
 async def ws_handler(websocket, path):
     try:
         async for message in websocket:
-            data = parse_json(message)
-            if data.get('type') == 'ping':
-                await websocket.send(build_msg({'type': 'pong'}))
-            elif data.get('type') == 'audio':
-                frames = data.get('frames', [])
-                if at_process_frames:
-                    result = at_process_frames(frames)
-                    await websocket.send(build_msg({'type': 'transcript', 'text': result}))
+            started = time.perf_counter()
+            profiled = profiler.sampling
+            if profiled:
+                profiler.enter_route('ws')
+            data = {}
+            try:
+                data = parse_json(message)
+                if data.get('type') == 'ping':
+                    await websocket.send(build_msg({'type': 'pong'}))
+                elif data.get('type') == 'audio':
+                    frames = data.get('frames', [])
+                    if at_process_frames:
+                        result = at_process_frames(frames)
+                        await websocket.send(build_msg({'type': 'transcript', 'text': result}))
+            finally:
+                if profiled:
+                    profiler.exit_route()
+                kind = data.get('type') if isinstance(data, dict) else None
+                WS_MESSAGE_LATENCY.observe(time.perf_counter() - started, (kind if kind in ('ping', 'audio') else 'other',))
     except Exception as e:
         print(f"ws_error: {e}", flush=True)
 
-def handle_translate(b: bytes) -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'text': '', 'error': 'bad_json'}
+def handle_translate(j: dict) -> dict:
     text = str(j.get('text', '')).strip()
     source = str(j.get('source', 'auto')).strip()
     target = str(j.get('target', 'en')).strip()
@@ -769,7 +708,8 @@ def handle_translate(b: bytes) -> dict:
         try:
             # Map language codes if needed
             source_lang = source if source != 'auto' else 'en'
-            result = translation_api_call(text, source_lang, target)
+            with metrics.external_call('openai'):
+                result = translation_api_call(text, source_lang, target)
             return {'text': result, 'error': ''}
         except Exception as e:
             print(f"OpenAI translation failed: {e}, falling back to Google Translator", flush=True)
@@ -778,20 +718,17 @@ def handle_translate(b: bytes) -> dict:
     # Fallback to Google Translator if OpenAI fails or is unavailable
     try:
         if GoogleTranslator:
-            result = GoogleTranslator(source=source, target=target).translate(text)
+            with metrics.external_call('google_translate'):
+                result = GoogleTranslator(source=source, target=target).translate(text)
             return {'text': result, 'error': ''}
         else:
             return {'text': 'Translation service unavailable', 'error': 'no_translator'}
     except Exception as e:
         return {'text': '', 'error': str(e)[:100]}
 
-def handle_analyze(b: bytes) -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'words': [], 'error': 'bad_json'}
+def handle_analyze(j: dict) -> dict:
     text = str(j.get('text', '')).strip()
-    if not text or save_freq is None:
+    if not text or not save_freq:
         return {'words': [], 'error': 'no_text_or_deps'}
     try:
         df = save_freq(text)
@@ -805,67 +742,43 @@ def get_translation(word: str, existing_translation, target_lang: str = 'en'):
         return existing_translation
     if GoogleTranslator:
         try:
-            return GoogleTranslator(source='ko', target=target_lang).translate(word)
+            with metrics.external_call('google_translate'):
+                return GoogleTranslator(source='ko', target=target_lang).translate(word)
         except Exception:
             return ''
     return ''
 
-async def translate_base_to_all_languages(base: str, pos: str):
-    global_vocab = get_global_vocab(base, pos) if get_global_vocab else None
-    if not global_vocab:
-        return
-    
-    translations = {
-        'en': global_vocab.get('translation_en'),
-        'ru': global_vocab.get('translation_ru'),
-        'zh': global_vocab.get('translation_zh'),
-        'vi': global_vocab.get('translation_vi')
-    }
-    
-    has_any_translation = any(translations.values())
-    if not has_any_translation:
-        return
-    
-    source_lang = None
-    source_text = None
-    for lang, text in translations.items():
-        if text:
-            source_lang = lang
-            source_text = text
-            break
-    
-    if not source_text or not GoogleTranslator:
+async def translate_missing_languages(gaps: dict):
+    # gaps comes from get_translation_gaps: every missing language of every word in one batch
+    if not gaps or not GoogleTranslator or not update_global_vocab_translation:
         return
     
-    def translate_to_lang_sync(target_lang: str):
-        if translations[target_lang]:
-            return
+    def translate_to_lang_sync(base: str, pos: str, source_lang: str, source_text: str, target_lang: str):
         try:
-            translated = GoogleTranslator(source=source_lang, target=target_lang).translate(source_text)
+            with metrics.external_call('google_translate'):
+                translated = GoogleTranslator(source=source_lang, target=target_lang).translate(source_text)
             if translated:
-                upsert_global_vocab(base, pos, translated, '', target_lang)
+                update_global_vocab_translation(base, pos, translated, target_lang, 'google')
         except Exception:
             pass
     
-    target_langs = [lang for lang in ['en', 'ru', 'zh', 'vi'] if not translations[lang]]
-    if target_langs:
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        await asyncio.gather(*[loop.run_in_executor(None, translate_to_lang_sync, lang) for lang in target_langs])
-
-def handle_vocab_ingest(b: bytes, user_id: int, native_language: str = 'en') -> dict:
+    work = [(base, pos, g['source_lang'], g['source_text'], lang) for (base, pos), g in gaps.items() for lang in g['missing']]
     try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'success': False, 'error': 'bad_json'}
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    # Executor threads do not inherit contextvars, so carry the trace context explicitly
+    await asyncio.gather(*[loop.run_in_executor(None, contextvars.copy_context().run, translate_to_lang_sync, *w) for w in work])
+
+def handle_vocab_ingest(j: dict, user_id: int, native_language: str = 'en') -> dict:
     text = str(j.get('text', '')).strip()
-    if not text or save_freq is None:
+    if not text or not save_freq:
         return {'success': False, 'error': 'no_text_or_deps'}
-    df = save_freq(text)
+    with tracing.span('analysis.save_freq', chars=len(text)):
+        df = save_freq(text)
     df = df.rename(columns={'word': 'base'})[['base','pos','count']]
+    known = []
     for _, row in df.iterrows():
         base = str(row['base'])
         pos = str(row['pos'])
@@ -881,37 +794,38 @@ def handle_vocab_ingest(b: bytes, user_id: int, native_language: str = 'en') ->
                 if translation:
                     upsert_global_vocab(base, pos, translation, '', native_language) if upsert_global_vocab else None
             
-            threading.Thread(target=lambda: asyncio.run(translate_base_to_all_languages(base, pos)), daemon=True).start()
+            known.append((base, pos))
         else:
             existing_translation = get_vocab_translation(base, pos, native_language) if get_vocab_translation else None
             translation = get_translation(base, existing_translation, native_language)
             upsert_global_vocab(base, pos, translation, '', native_language) if upsert_global_vocab else None
             
             if generate_audio_file:
-                threading.Thread(target=lambda: generate_audio_and_update(base, pos), daemon=True).start()
+                spawn_job('generate_audio', generate_audio_and_update, base, pos)
         
         upsert_user_vocab(user_id, base, pos, count_delta) if upsert_user_vocab else None
     
+    gaps = get_translation_gaps(known) if known and get_translation_gaps else {}
+    if gaps:
+        spawn_job('translate_all_languages', lambda gaps: asyncio.run(translate_missing_languages(gaps)), gaps)
+    
     return {'success': True}
 
 def generate_audio_and_update(base, pos):
     if generate_audio_file:
         generate_audio_file(base, pos)
 
-def handle_tts(b: bytes) -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'success': False, 'error': 'bad_json'}
+def handle_tts(j: dict) -> dict:
     text = str(j.get('text', '')).strip()
     lang = str(j.get('lang', 'ko')).strip()
-    if not text or save_to_file is None:
+    if not text or not save_to_file:
         return {'success': False, 'error': 'no_text_or_deps'}
     try:
         import tempfile
         import uuid
         temp_filename = os.path.join(tempfile.gettempdir(), f'tts_{uuid.uuid4().hex}.mp3')
-        filename = save_to_file(text, lang=lang, filename=temp_filename)
+        with metrics.external_call('gtts'):
+            filename = save_to_file(text, lang=lang, filename=temp_filename)
         with open(filename, 'rb') as f:
             audio_data = f.read()
         import base64
@@ -924,921 +838,110 @@ def handle_tts(b: bytes) -> dict:
     except Exception as e:
         return {'success': False, 'error': str(e)[:100]}
 
-def start_ws(port: int):
+# Shutdown gets this long in total to finish requests and background jobs before giving up on them
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', '25'))
+# Seconds /readyz reports draining while still serving, so a load balancer polling it moves
+# new traffic elsewhere before the listeners close
+SHUTDOWN_READY_GRACE = float(os.getenv('SHUTDOWN_READY_GRACE', '0'))
+
+ws_stop = threading.Event()
+
+def start_ws(port: int, reuse_port: bool = False, listening: threading.Event = None):
     if not websockets:
+        if listening:
+            listening.set()
         return
     
     async def run_ws():
         # Create the server while an event loop is running to satisfy websockets' get_running_loop
-        await websockets.serve(ws_handler, 'localhost', port)
-        # Keep the coroutine alive forever
-        await asyncio.Event().wait()
+        server = await websockets.serve(ws_handler, 'localhost', port, reuse_port=reuse_port or None)
+        if listening:
+            listening.set()
+        await asyncio.get_running_loop().run_in_executor(None, ws_stop.wait)
+        # Stops listening and closes every open session with 1001 (going away)
+        server.close()
+        await server.wait_closed()
     
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     loop.run_until_complete(run_ws())
 
-if __name__ == '__main__':
+def drain_http(httpd: ThreadedHTTPServer):
+    # serve_forever has returned, but connections already queued on the listening socket would
+    # be reset by close(); accept those first
+    httpd.timeout = 0
+    while select.select([httpd], [], [], 0)[0]:
+        httpd.handle_request()
+
+def shutdown(httpd: ThreadedHTTPServer, ws_thread: threading.Thread):
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    print("shutting down: draining requests", flush=True)
+    health.draining.set()
+    if SHUTDOWN_READY_GRACE:
+        time.sleep(SHUTDOWN_READY_GRACE)
+    # Stops accepting; requests already on their threads are waited for below
+    httpd.shutdown()
+    drain_http(httpd)
+    httpd.server_close()
+    left = httpd.join_requests(max(deadline - time.monotonic(), 0))
+    if left:
+        print(f"shutdown: deadline reached with {left} requests still running", flush=True)
+    ws_stop.set()
+    ws_thread.join(max(deadline - time.monotonic(), 0))
+    # Translations and audio generation started by ingests; MP3s are written under a temporary
+    # name, so a job abandoned at the deadline leaves no truncated file behind
+    left = drain_jobs(max(deadline - time.monotonic(), 0))
+    if left:
+        print(f"shutdown: deadline reached with background jobs still running: {left}", flush=True)
+    if global_vocab_counts:
+        global_vocab_counts.flush()
     if db_pool:
-        db_pool.init_pool()
-    
-    http_thread = threading.Thread(target=start_http, args=(8000,), daemon=True)
-    ws_thread = threading.Thread(target=start_ws, args=(8765,), daemon=True)
-    
-    http_thread.start()
-    ws_thread.start()
-        
-    http_thread.join()
-    ws_thread.join()
-
-from http.server import BaseHTTPRequestHandler, HTTPServer
-import asyncio
-import json
-import threading
-import base64
-import os
-import sys
-import urllib.parse
-import urllib.request
-import pandas as pd
-from datetime import datetime
-try:
-    from deep_translator import GoogleTranslator
-except Exception:
-    GoogleTranslator = None
-
-backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-sys.path.insert(0, backend_root)
-
-try:
-    from audio_to_text import process_frames as at_process_frames
-    from audio_to_text import set_lang as at_set_lang
-    from audio_to_text import set_rate as at_set_rate
-    from audio_to_text import set_channels as at_set_channels
-    from audio_to_text import force_final as at_force_final
-except Exception as e:
-    at_process_frames = None
-    at_set_lang = None
-    at_set_rate = None
-    at_set_channels = None
-    at_force_final = None
-    print("asr_import_error", str(e), flush=True)
-
-try:
-    from logic.text.analysis import save_freq
-except Exception as e:
-    save_freq = None
-    print("analysis_import_error", str(e), flush=True)
-
-try:
-    from logic.text.translate import translation_api_call
-except Exception as e:
-    translation_api_call = None
-    print("openai_translation_import_error", str(e), flush=True)
-
-try:
-    from logic.tss.tss import speak, save_to_file
-except Exception as e:
-    speak = None
-    save_to_file = None
-    print("tss_import_error", str(e), flush=True)
-
-try:
-    from database.connection import db_pool
-    from database.queries import get_user_vocab, get_global_vocab, upsert_global_vocab, increment_global_vocab_count, upsert_user_vocab, get_vocab_translation, record_remember, record_dont_remember, is_admin
-    from api.auth import handle_register, handle_login
-    from api.middleware import require_auth, create_auth_response
-    from api.admin import handle_admin_login, handle_admin_list_users, handle_admin_delete_user, handle_admin_add_user, handle_admin_list_vocab, handle_admin_delete_vocab, handle_admin_update_translation
-except Exception as e:
-    db_pool = None
-    handle_register = None
-    handle_login = None
-    require_auth = None
-    create_auth_response = None
-    handle_admin_login = None
-    handle_admin_list_users = None
-    handle_admin_delete_user = None
-    handle_admin_add_user = None
-    handle_admin_list_vocab = None
-    handle_admin_delete_vocab = None
-    handle_admin_update_translation = None
-    print("auth_import_error", str(e), flush=True)
-
-try:
-    from generate_audio import generate_audio_file
-except Exception:
-    generate_audio_file = None
-
-try:
-    import websockets
-except Exception:
-    websockets = None
-
-class SimpleHandler(BaseHTTPRequestHandler):
-    def _set_cors(self):
-        origin = self.headers.get('Origin', '*')
-        self.send_header('Access-Control-Allow-Origin', origin)
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, Accept')
-        self.send_header('Access-Control-Allow-Credentials', 'true')
-        self.send_header('Access-Control-Max-Age', '3600')
-
-    def do_OPTIONS(self):
-        self.send_response(204)
-        self._set_cors()
-        self.end_headers()
-
-    def do_GET(self):
-        url = urllib.parse.urlparse(self.path)
-        path = url.path
-        if path in ('/', '/debug'):
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'base.html')
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception:
-                body = b'OK'
-                ct = 'text/plain; charset=utf-8'
-        elif path == '/app':
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'base.html')
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception:
-                body = b'OK'
-                ct = 'text/plain; charset=utf-8'
-        elif path.startswith('/src/'):
-            try:
-                fname = path[1:]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', fname)
-                with open(p, 'rb') as f:
-                    body = f.read()
-                if fname.endswith('.js'):
-                    ct = 'application/javascript; charset=utf-8'
-                else:
-                    ct = 'text/plain; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path == '/style.css':
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'style.css')
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/css; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path.endswith('.js'):
-            try:
-                fname = path[1:]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', fname)
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'application/javascript; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path == '/admin' or path == '/admin.html':
-            try:
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'admin.html')
-                abs_path = os.path.abspath(p)
-                if not os.path.exists(abs_path):
-                    print(f"Admin file not found at: {abs_path}", flush=True)
-                    self.send_error(404)
-                    return
-                with open(abs_path, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception as e:
-                print(f"Error serving admin.html: {e}", flush=True)
-                import traceback
-                traceback.print_exc()
-                self.send_error(404)
-                return
-        elif path.endswith('.html'):
-            try:
-                fname = path[1:]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', fname)
-                if not os.path.exists(p):
-                    print(f"File not found: {p} (requested: {path})", flush=True)
-                    self.send_error(404)
-                    return
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception as e:
-                print(f"Error serving HTML file {path}: {e}", flush=True)
-                self.send_error(404)
-                return
-        elif path.startswith('/templates/'):
-            try:
-                fname = path[len('/templates/'):]
-                p = os.path.join(os.path.dirname(__file__), '..', '..', 'front-end', 'templates', fname)
-                with open(p, 'rb') as f:
-                    body = f.read()
-                ct = 'text/html; charset=utf-8'
-            except Exception:
-                self.send_error(404)
-                return
-        elif path.startswith('/data/'):
-            fname = urllib.parse.unquote(path[6:])
-            try:
-                fpath = os.path.join(os.path.dirname(__file__), '..', 'database', 'data', fname)
-                if os.path.exists(fpath) and os.path.isfile(fpath):
-                    with open(fpath, 'rb') as f:
-                        body = f.read()
-                    if fname.endswith('.csv'):
-                        ct = 'text/csv; charset=utf-8'
-                    elif fname.endswith('.mp3'):
-                        ct = 'audio/mpeg'
-                    else:
-                        ct = 'application/octet-stream'
-                else:
-                    print(f"File not found: {fpath} (requested: {path})", flush=True)
-                    self.send_error(404)
-                    return
-            except Exception as e:
-                print(f"Error serving file {path}: {e}", flush=True)
-                self.send_error(404)
-                return
-        elif path == '/vocab/list':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'items': [], 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            try:
-                native_lang = user.get('native_language', 'en') or 'en'
-                rows = get_user_vocab(user['id'], native_lang) if get_user_vocab else []
-                body = json.dumps({'items': rows}, ensure_ascii=False).encode('utf-8')
-                ct = 'application/json; charset=utf-8'
-            except Exception:
-                body = json.dumps({'items': []}).encode('utf-8')
-                ct = 'application/json; charset=utf-8'
-        else:
-            body = b'OK'
-            ct = 'text/plain; charset=utf-8'
-        
-        self.send_response(200)
-        self.send_header('Content-Type', ct)
-        self.send_header('Content-Length', str(len(body)))
-        self._set_cors()
-        self.end_headers()
-        self.wfile.write(body)
-
-    def do_POST(self):
-        if self.path == '/register':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_register(b) if handle_register else {'success': False, 'error': 'auth_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/login':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            print(f"Login request received: {len(b)} bytes", flush=True)
-            try:
-                import json as json_module
-                req_data = json_module.loads(b.decode('utf-8'))
-                print(f"Login attempt for user: {req_data.get('username', 'unknown')}", flush=True)
-            except Exception as e:
-                print(f"Error parsing login request: {e}", flush=True)
-            out = handle_login(b) if handle_login else {'success': False, 'error': 'auth_not_available'}
-            print(f"Login response: success={out.get('success', False)}, error={out.get('error', 'none')}", flush=True)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/upload':
-            n = int(self.headers.get('Content-Length', 0))
-            _ = self.rfile.read(n)
-            body = b'audio received'
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain; charset=utf-8')
-            self.send_header('Content-Length', str(len(body)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(body)
-            return
-        elif self.path == '/translate':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_translate(b)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/analyze':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'words': [], 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_analyze(b)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/vocab/ingest':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            native_lang = user.get('native_language', 'en') or 'en'
-            out = handle_vocab_ingest(b, user['id'], native_lang)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/learn/remember':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                base = str(j.get('base', ''))
-                pos = str(j.get('pos', ''))
-                if base and pos:
-                    success = record_remember(user['id'], base, pos) if record_remember else False
-                    out = {'success': success}
-                else:
-                    out = {'success': False, 'error': 'missing_fields'}
-            except Exception:
-                out = {'success': False, 'error': 'bad_json'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/learn/dont-remember':
-            user = require_auth(dict(self.headers)) if require_auth else None
-            if not user:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                base = str(j.get('base', ''))
-                pos = str(j.get('pos', ''))
-                if base and pos:
-                    success = record_dont_remember(user['id'], base, pos) if record_dont_remember else False
-                    out = {'success': success}
-                else:
-                    out = {'success': False, 'error': 'missing_fields'}
-            except Exception:
-                out = {'success': False, 'error': 'bad_json'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/tts':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_tts(b)
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/login':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            out = handle_admin_login(b) if handle_admin_login else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/users':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n) if n > 0 else b'{}'
-            try:
-                j = json.loads(b.decode('utf-8'))
-                username = j.get('username', '')
-                password = j.get('password', '')
-                if not is_admin(username, password) if is_admin else False:
-                    body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except Exception:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            out = handle_admin_list_users() if handle_admin_list_users else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/users/delete':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                username = j.get('admin_username', '')
-                password = j.get('admin_password', '')
-                if not is_admin(username, password) if is_admin else False:
-                    body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except Exception:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            out = handle_admin_delete_user(b) if handle_admin_delete_user else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/users/add':
-            n = int(self.headers.get('Content-Length', 0))
-            b = self.rfile.read(n)
-            try:
-                j = json.loads(b.decode('utf-8'))
-                username = j.get('admin_username', '')
-                password = j.get('admin_password', '')
-                if not is_admin(username, password) if is_admin else False:
-                    body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-            except Exception:
-                body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-            out = handle_admin_add_user(b) if handle_admin_add_user else {'success': False, 'error': 'admin_not_available'}
-            data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(data)))
-            self._set_cors()
-            self.end_headers()
-            self.wfile.write(data)
-            return
-        elif self.path == '/admin/vocab':
-            try:
-                n = int(self.headers.get('Content-Length', 0))
-                b = self.rfile.read(n) if n > 0 else b'{}'
-                try:
-                    j = json.loads(b.decode('utf-8'))
-                    username = j.get('username', '')
-                    password = j.get('password', '')
-                    if not is_admin(username, password) if is_admin else False:
-                        body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                        self.send_response(401)
-                        self.send_header('Content-Type', 'application/json; charset=utf-8')
-                        self.send_header('Content-Length', str(len(body)))
-                        self._set_cors()
-                        self.end_headers()
-                        self.wfile.write(body)
-                        return
-                except Exception as e:
-                    body = json.dumps({'success': False, 'error': 'unauthorized', 'details': str(e)}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-                out = handle_admin_list_vocab() if handle_admin_list_vocab else {'success': False, 'error': 'admin_not_available'}
-                data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(data)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(data)
-                return
-            except Exception as e:
-                body = json.dumps({'success': False, 'error': 'server_error', 'details': str(e)}).encode('utf-8')
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-        elif self.path == '/admin/vocab/delete':
-            try:
-                n = int(self.headers.get('Content-Length', 0))
-                b = self.rfile.read(n)
-                try:
-                    j = json.loads(b.decode('utf-8'))
-                    username = j.get('admin_username', '')
-                    password = j.get('admin_password', '')
-                    if not is_admin(username, password) if is_admin else False:
-                        body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                        self.send_response(401)
-                        self.send_header('Content-Type', 'application/json; charset=utf-8')
-                        self.send_header('Content-Length', str(len(body)))
-                        self._set_cors()
-                        self.end_headers()
-                        self.wfile.write(body)
-                        return
-                except Exception as e:
-                    body = json.dumps({'success': False, 'error': 'unauthorized', 'details': str(e)}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-                out = handle_admin_delete_vocab(b) if handle_admin_delete_vocab else {'success': False, 'error': 'admin_not_available'}
-                data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(data)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(data)
-                return
-            except Exception as e:
-                body = json.dumps({'success': False, 'error': 'server_error', 'details': str(e)}).encode('utf-8')
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-        elif self.path == '/admin/translations/update':
-            try:
-                n = int(self.headers.get('Content-Length', 0))
-                b = self.rfile.read(n)
-                try:
-                    j = json.loads(b.decode('utf-8'))
-                    username = j.get('admin_username', '')
-                    password = j.get('admin_password', '')
-                    if not is_admin(username, password) if is_admin else False:
-                        body = json.dumps({'success': False, 'error': 'unauthorized'}).encode('utf-8')
-                        self.send_response(401)
-                        self.send_header('Content-Type', 'application/json; charset=utf-8')
-                        self.send_header('Content-Length', str(len(body)))
-                        self._set_cors()
-                        self.end_headers()
-                        self.wfile.write(body)
-                        return
-                except Exception as e:
-                    body = json.dumps({'success': False, 'error': 'unauthorized', 'details': str(e)}).encode('utf-8')
-                    self.send_response(401)
-                    self.send_header('Content-Type', 'application/json; charset=utf-8')
-                    self.send_header('Content-Length', str(len(body)))
-                    self._set_cors()
-                    self.end_headers()
-                    self.wfile.write(body)
-                    return
-                out = handle_admin_update_translation(b) if handle_admin_update_translation else {'success': False, 'error': 'admin_not_available'}
-                data = json.dumps(out, ensure_ascii=False).encode('utf-8')
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(data)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(data)
-                return
-            except Exception as e:
-                body = json.dumps({'success': False, 'error': 'server_error', 'details': str(e)}).encode('utf-8')
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Content-Length', str(len(body)))
-                self._set_cors()
-                self.end_headers()
-                self.wfile.write(body)
-                return
-
-        body = json.dumps({'success': False, 'error': 'not_found'}).encode('utf-8')
-        self.send_response(404)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(body)))
-        self._set_cors()
-        self.end_headers()
-        self.wfile.write(body)
-
-def start_http(port: int):
-    HTTPServer(('', port), SimpleHandler).serve_forever()
-
-def build_msg(d: dict) -> str:
-    return json.dumps(d, ensure_ascii=False)
-
-def parse_json(s: str) -> dict:
-    try:
-        return json.loads(s)
-    except Exception:
-        return {}
-
-async def ws_handler(websocket, path):
-    try:
-        async for message in websocket:
-            data = parse_json(message)
-            if data.get('type') == 'ping':
-                await websocket.send(build_msg({'type': 'pong'}))
-            elif data.get('type') == 'audio':
-                frames = data.get('frames', [])
-                if at_process_frames:
-                    result = at_process_frames(frames)
-                    await websocket.send(build_msg({'type': 'transcript', 'text': result}))
-    except Exception as e:
-        print(f"ws_error: {e}", flush=True)
-
-def handle_translate(b: bytes) -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'text': '', 'error': 'bad_json'}
-    text = str(j.get('text', '')).strip()
-    source = str(j.get('source', 'auto')).strip()
-    target = str(j.get('target', 'en')).strip()
-    if not text:
-        return {'text': '', 'error': 'no_text'}
-    
-    # Try OpenAI API first (for Browser STT transcripts)
-    if translation_api_call:
-        try:
-            # Map language codes if needed
-            source_lang = source if source != 'auto' else 'en'
-            result = translation_api_call(text, source_lang, target)
-            return {'text': result, 'error': ''}
-        except Exception as e:
-            print(f"OpenAI translation failed: {e}, falling back to Google Translator", flush=True)
-            # Fall through to Google Translator fallback
-    
-    # Fallback to Google Translator if OpenAI fails or is unavailable
-    try:
-        if GoogleTranslator:
-            result = GoogleTranslator(source=source, target=target).translate(text)
-            return {'text': result, 'error': ''}
-        else:
-            return {'text': 'Translation service unavailable', 'error': 'no_translator'}
-    except Exception as e:
-        return {'text': '', 'error': str(e)[:100]}
-
-def handle_analyze(b: bytes) -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'words': [], 'error': 'bad_json'}
-    text = str(j.get('text', '')).strip()
-    if not text or save_freq is None:
-        return {'words': [], 'error': 'no_text_or_deps'}
-    try:
-        df = save_freq(text)
-        words = df[['word']].to_dict('records')
-        return {'words': words, 'error': ''}
-    except Exception as e:
-        return {'words': [], 'error': str(e)[:100]}
+        busy = db_pool.closeall()
+        if busy:
+            print(f"shutdown: {busy} database connections still checked out", flush=True)
+    print("shutdown complete", flush=True)
 
-def get_translation(word: str, existing_translation, target_lang: str = 'en'):
-    if existing_translation:
-        return existing_translation
-    if GoogleTranslator:
-        try:
-            return GoogleTranslator(source='ko', target=target_lang).translate(word)
-        except Exception:
-            return ''
-    return ''
+if __name__ == '__main__':
+    import supervisor
+    if supervisor.WORKERS > 1 and supervisor.WORKER_INDEX is None:
+        sys.exit(supervisor.Supervisor([sys.executable, os.path.abspath(__file__)], supervisor.WORKERS).run())
+    worker = supervisor.WORKER_INDEX
 
-async def translate_base_to_all_languages(base: str, pos: str):
-    global_vocab = get_global_vocab(base, pos) if get_global_vocab else None
-    if not global_vocab:
-        return
-    
-    translations = {
-        'en': global_vocab.get('translation_en'),
-        'ru': global_vocab.get('translation_ru'),
-        'zh': global_vocab.get('translation_zh'),
-        'vi': global_vocab.get('translation_vi')
-    }
+    # Each worker opens its own pool and LISTEN connection; global_vocab changes made by one
+    # worker reach the caches of the others through vocab_cache's NOTIFY channel
+    if db_pool:
+        db_pool.init_pool()
     
-    has_any_translation = any(translations.values())
-    if not has_any_translation:
-        return
+    if vocab_cache:
+        vocab_cache.start_listener()
+        startup.on_warm('global_vocab_cache', lambda: print(f"global_vocab cache: {warm_global_vocab_cache()} rows preloaded", flush=True))
     
-    source_lang = None
-    source_text = None
-    for lang, text in translations.items():
-        if text:
-            source_lang = lang
-            source_text = text
-            break
+    # One lifecycle sweeper is enough for all workers
+    if start_recording_lifecycle and os.getenv('RECORDING_LIFECYCLE', '1') != '0' and worker in (None, 0):
+        start_recording_lifecycle()
     
-    if not source_text or not GoogleTranslator:
-        return
+    httpd = make_http_server(8000, reuse_port=worker is not None)
+    ws_listening = threading.Event()
+    http_thread = threading.Thread(target=httpd.serve_forever, name='http', daemon=True)
+    ws_thread = threading.Thread(target=start_ws, args=(8765, worker is not None, ws_listening), name='ws', daemon=True)
     
-    def translate_to_lang_sync(target_lang: str):
-        if translations[target_lang]:
-            return
-        try:
-            translated = GoogleTranslator(source=source_lang, target=target_lang).translate(source_text)
-            if translated:
-                upsert_global_vocab(base, pos, translated, '', target_lang)
-        except Exception:
-            pass
-    
-    target_langs = [lang for lang in ['en', 'ru', 'zh', 'vi'] if not translations[lang]]
-    if target_langs:
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        await asyncio.gather(*[loop.run_in_executor(None, translate_to_lang_sync, lang) for lang in target_langs])
-
-def handle_vocab_ingest(b: bytes, user_id: int, native_language: str = 'en') -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'success': False, 'error': 'bad_json'}
-    text = str(j.get('text', '')).strip()
-    if not text or save_freq is None:
-        return {'success': False, 'error': 'no_text_or_deps'}
-    df = save_freq(text)
-    df = df.rename(columns={'word': 'base'})[['base','pos','count']]
-    for _, row in df.iterrows():
-        base = str(row['base'])
-        pos = str(row['pos'])
-        count_delta = int(row['count'])
-        
-        global_vocab = get_global_vocab(base, pos) if get_global_vocab else None
-        
-        if global_vocab:
-            increment_global_vocab_count(base, pos) if increment_global_vocab_count else None
-            existing_translation = get_vocab_translation(base, pos, native_language) if get_vocab_translation else None
-            if not existing_translation:
-                translation = get_translation(base, None, native_language)
-                if translation:
-                    upsert_global_vocab(base, pos, translation, '', native_language) if upsert_global_vocab else None
-            
-            threading.Thread(target=lambda: asyncio.run(translate_base_to_all_languages(base, pos)), daemon=True).start()
-        else:
-            existing_translation = get_vocab_translation(base, pos, native_language) if get_vocab_translation else None
-            translation = get_translation(base, existing_translation, native_language)
-            upsert_global_vocab(base, pos, translation, '', native_language) if upsert_global_vocab else None
-            
-            if generate_audio_file:
-                threading.Thread(target=lambda: generate_audio_and_update(base, pos), daemon=True).start()
-        
-        upsert_user_vocab(user_id, base, pos, count_delta) if upsert_user_vocab else None
-    
-    return {'success': True}
-
-def generate_audio_and_update(base, pos):
-    if generate_audio_file:
-        generate_audio_file(base, pos)
-
-def handle_tts(b: bytes) -> dict:
-    try:
-        j = json.loads(b.decode('utf-8'))
-    except Exception:
-        return {'success': False, 'error': 'bad_json'}
-    text = str(j.get('text', '')).strip()
-    lang = str(j.get('lang', 'ko')).strip()
-    if not text or save_to_file is None:
-        return {'success': False, 'error': 'no_text_or_deps'}
-    try:
-        import tempfile
-        import uuid
-        temp_filename = os.path.join(tempfile.gettempdir(), f'tts_{uuid.uuid4().hex}.mp3')
-        filename = save_to_file(text, lang=lang, filename=temp_filename)
-        with open(filename, 'rb') as f:
-            audio_data = f.read()
-        import base64
-        encoded = base64.b64encode(audio_data).decode('utf-8')
-        try:
-            os.remove(filename)
-        except Exception:
-            pass
-        return {'success': True, 'audio': encoded, 'error': ''}
-    except Exception as e:
-        return {'success': False, 'error': str(e)[:100]}
-
-def start_ws(port: int):
-    if websockets:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        server = loop.run_until_complete(websockets.serve(ws_handler, 'localhost', port))
-        loop.run_forever()
-
-if __name__ == '__main__':
-    if db_pool:
-        db_pool.init_pool()
-    
-    http_thread = threading.Thread(target=start_http, args=(8000,), daemon=True)
-    ws_thread = threading.Thread(target=start_ws, args=(8765,), daemon=True)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
     
     http_thread.start()
     ws_thread.start()
-        
-    http_thread.join()
-    ws_thread.join()
+    # Serving starts now; heavy imports and the cache preload finish in the background
+    startup.warm()
+    
+    if worker is not None:
+        # A rolling reload stops the old worker only once this one is fully warm
+        ws_listening.wait(30)
+        startup.ready.wait(supervisor.READY_TIMEOUT)
+        supervisor.notify_ready()
+    
+    # Signal handlers run on the main thread, which only waits here
+    while not stop.wait(1):
+        pass
+    shutdown(httpd, ws_thread)
+    sys.exit(0)
@@ -0,0 +1,152 @@
+import os
+import select
+import signal
+import socket
+import subprocess
+import time
+
+# SERVER_WORKERS=N (N > 1) runs server.py as a supervisor over N worker processes. Every worker
+# binds ports 8000 and 8765 itself with SO_REUSEPORT and the kernel spreads new connections
+# across them; workers share nothing but the database. Linux only: elsewhere SO_REUSEPORT
+# either does not exist or does not balance.
+WORKERS = int(os.getenv('SERVER_WORKERS', '1'))
+WORKER_INDEX = int(os.environ['SERVER_WORKER_INDEX']) if os.getenv('SERVER_WORKER_INDEX') else None
+READY_TIMEOUT = float(os.getenv('SERVER_READY_TIMEOUT', '60'))
+# Keep above the workers' SHUTDOWN_TIMEOUT plus SHUTDOWN_READY_GRACE, or draining gets cut short
+STOP_TIMEOUT = float(os.getenv('SERVER_STOP_TIMEOUT', '30'))
+# A worker that exits sooner than this after starting counts as a crash loop and backs off
+MIN_UPTIME = 10.0
+MAX_BACKOFF = 30.0
+
+def reuse_port_supported() -> bool:
+    return hasattr(socket, 'SO_REUSEPORT')
+
+def notify_ready():
+    # Tells the supervisor this worker is listening; a no-op when not supervised
+    fd = os.getenv('SERVER_READY_FD')
+    if fd:
+        os.write(int(fd), b'1')
+        os.close(int(fd))
+        del os.environ['SERVER_READY_FD']
+
+class Worker:
+    def __init__(self, index: int, proc: subprocess.Popen, ready_fd: int):
+        self.index = index
+        self.proc = proc
+        self.ready_fd = ready_fd
+        self.started = time.monotonic()
+
+class Supervisor:
+    # Workers are fresh interpreters rather than bare forks: no DB connection, lock or thread
+    # state crosses a fork, and a rolling reload (SIGHUP) picks up code changed on disk.
+    def __init__(self, argv, workers: int):
+        self.argv = argv
+        self.count = workers
+        self.workers = {}
+        self.crashes = {}
+        self.retry_at = {}
+        self.reload_requested = False
+        self.stopping = False
+
+    def log(self, msg: str):
+        print(f"supervisor: {msg}", flush=True)
+
+    def spawn(self, index: int) -> Worker:
+        r, w = os.pipe()
+        env = dict(os.environ, SERVER_WORKER_INDEX=str(index), SERVER_READY_FD=str(w))
+        env.pop('SERVER_WORKERS', None)
+        try:
+            proc = subprocess.Popen(self.argv, env=env, pass_fds=(w,))
+        finally:
+            os.close(w)
+        self.log(f"worker {index} started (pid {proc.pid})")
+        return Worker(index, proc, r)
+
+    def wait_ready(self, worker: Worker, timeout: float = READY_TIMEOUT) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([worker.ready_fd], [], [], min(deadline - time.monotonic(), 1.0))
+            if readable:
+                # EOF without a byte means the worker exited before it was listening
+                return os.read(worker.ready_fd, 1) == b'1'
+            if worker.proc.poll() is not None:
+                return False
+        return False
+
+    def stop(self, worker: Worker, timeout: float = STOP_TIMEOUT):
+        if worker.proc.poll() is None:
+            worker.proc.send_signal(signal.SIGTERM)
+            try:
+                worker.proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.log(f"worker {worker.index} (pid {worker.proc.pid}) did not stop in {timeout:.0f}s, killing")
+                worker.proc.kill()
+                worker.proc.wait()
+        os.close(worker.ready_fd)
+
+    def rolling_reload(self):
+        # One slot at a time: the replacement is listening before the old worker is told to
+        # stop, so capacity never drops below N. A replacement that fails to come up aborts
+        # the reload and leaves the remaining old workers serving.
+        self.log("rolling reload")
+        for index in sorted(self.workers):
+            new = self.spawn(index)
+            if not self.wait_ready(new):
+                self.log(f"worker {index} replacement did not become ready; reload aborted")
+                self.stop(new, 5)
+                return
+            old, self.workers[index] = self.workers[index], new
+            self.stop(old)
+        self.log("reload complete")
+
+    def reap(self):
+        now = time.monotonic()
+        for index, worker in list(self.workers.items()):
+            code = worker.proc.poll()
+            if code is None:
+                continue
+            os.close(worker.ready_fd)
+            del self.workers[index]
+            if now - worker.started < MIN_UPTIME:
+                self.crashes[index] = self.crashes.get(index, 0) + 1
+            else:
+                self.crashes[index] = 0
+            delay = min(2 ** self.crashes[index] - 1, MAX_BACKOFF)
+            self.retry_at[index] = now + delay
+            self.log(f"worker {index} (pid {worker.proc.pid}) exited with {code}; restarting in {delay:.0f}s")
+        for index, at in list(self.retry_at.items()):
+            if at <= now:
+                del self.retry_at[index]
+                self.workers[index] = self.spawn(index)
+
+    def _on_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.reload_requested = True
+        else:
+            self.stopping = True
+
+    def run(self) -> int:
+        if not reuse_port_supported():
+            self.log("SO_REUSEPORT is not available on this platform; run with SERVER_WORKERS=1")
+            return 1
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self._on_signal)
+        for index in range(self.count):
+            self.workers[index] = self.spawn(index)
+        for worker in list(self.workers.values()):
+            if not self.wait_ready(worker):
+                self.log(f"worker {worker.index} did not become ready")
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_reload()
+            self.reap()
+            time.sleep(0.5)
+        # SIGTERM everyone first so the workers drain in parallel
+        self.log("stopping workers")
+        for worker in self.workers.values():
+            if worker.proc.poll() is None:
+                worker.proc.send_signal(signal.SIGTERM)
+        for worker in self.workers.values():
+            self.stop(worker)
+        return 0
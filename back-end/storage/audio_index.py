@@ -0,0 +1,149 @@
+import hashlib
+import os
+import threading
+import time
+from database.queries import (
+    upsert_audio_asset, mark_audio_assets_missing, get_audio_assets_under, sync_audio_references,
+    resolve_audio_references, get_audio_index_dirs, save_audio_index_dirs, start_audio_index_run,
+    finish_audio_index_run
+)
+from observability.jobs import spawn as spawn_job
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+data_dir = os.path.join(backend_root, 'database', 'data')
+
+# Top-level directories under database/data that hold audio, mapped to asset kind
+AUDIO_DIRS = {'audio': 'tts', 'recordings': 'recording'}
+AUDIO_EXTENSIONS = ('.mp3', '.webm', '.wav', '.ogg', '.opus')
+HASH_CHUNK_SIZE = 1024 * 1024
+# Covers filesystems that store mtimes in whole seconds
+MTIME_SETTLE_SECONDS = 2
+
+def normalize_audio_path(path: str) -> str:
+    path = path.replace('\\', '/')
+    if path.startswith('data/'):
+        path = path[len('data/'):]
+    return path
+
+def full_audio_path(path: str) -> str:
+    return os.path.join(data_dir, *normalize_audio_path(path).split('/'))
+
+def hash_file(full_path: str) -> str:
+    h = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def index_file(path: str, kind: str, referenced=True, content_hash: str = None) -> bool:
+    rel = normalize_audio_path(path)
+    full = full_audio_path(rel)
+    try:
+        st = os.stat(full)
+    except OSError:
+        mark_audio_assets_missing([rel])
+        return False
+    if content_hash is None:
+        content_hash = hash_file(full)
+    return upsert_audio_asset(rel, kind, st.st_size, content_hash, st.st_mtime, referenced)
+
+def verify_incremental(full: bool = False) -> dict:
+    # A directory gains or loses entries only when its own mtime moves, so a directory whose
+    # mtime matches the one recorded when it was last listed costs one stat and is not listed
+    # again; inside a listed directory a file is re-hashed only when its size or mtime differ
+    # from the index. A file rewritten in place leaves its directory's mtime alone, so --full
+    # lists every directory, and also rebuilds the referenced flags from global_vocab and
+    # recordings.
+    started = time.time()
+    run_id = start_audio_index_run()
+    if full:
+        sync_audio_references()
+    
+    dirs_scanned = 0
+    files_hashed = 0
+    missing = []
+    found = []
+    listed = {}
+    gone = []
+    for top, kind in AUDIO_DIRS.items():
+        indexed = get_audio_assets_under(top + '/')
+        known_dirs = {} if full else get_audio_index_dirs(top)
+        by_dir = {}
+        for p in indexed:
+            by_dir.setdefault(p.rsplit('/', 1)[0], []).append(p)
+        pending = [top] + sorted(d for d in set(by_dir) | set(known_dirs) if d != top)
+        visited = set()
+        while pending:
+            rel_dir = pending.pop()
+            if rel_dir in visited:
+                continue
+            visited.add(rel_dir)
+            abs_dir = os.path.join(data_dir, *rel_dir.split('/'))
+            try:
+                dir_mtime = os.stat(abs_dir).st_mtime
+            except OSError:
+                missing.extend(p for p in by_dir.get(rel_dir, []) if not indexed[p]['missing'])
+                if rel_dir in known_dirs:
+                    gone.append(rel_dir)
+                continue
+            if known_dirs.get(rel_dir) == dir_mtime:
+                continue
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            dirs_scanned += 1
+            # An mtime this close to the start may not move again when a file lands within the
+            # same timestamp tick, so such a directory is listed again next run
+            listed[rel_dir] = dir_mtime if dir_mtime < started - MTIME_SETTLE_SECONDS else None
+            seen = set()
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(rel)
+                    continue
+                if not entry.name.endswith(AUDIO_EXTENSIONS):
+                    continue
+                seen.add(rel)
+                st = entry.stat()
+                known = indexed.get(rel)
+                if known and not known['missing'] and known['size_bytes'] == st.st_size and known['mtime'] == st.st_mtime:
+                    continue
+                if not upsert_audio_asset(rel, kind, st.st_size, hash_file(entry.path), st.st_mtime, None):
+                    listed[rel_dir] = None
+                files_hashed += 1
+                if not known:
+                    found.append(rel)
+            missing.extend(p for p in by_dir.get(rel_dir, []) if p not in seen and not indexed[p]['missing'])
+    
+    # Files nothing wrote through index_file (copied in by hand, restored from a backup) would
+    # otherwise be listed as orphans until the next --full run
+    resolve_audio_references(found)
+    missing_found = mark_audio_assets_missing(missing)
+    save_audio_index_dirs(listed, gone)
+    if run_id is not None:
+        finish_audio_index_run(run_id, dirs_scanned, files_hashed, missing_found)
+    return {'dirs_scanned': dirs_scanned, 'files_hashed': files_hashed, 'missing_found': missing_found}
+
+_verify_lock = threading.Lock()
+
+def verify_running() -> bool:
+    return _verify_lock.locked()
+
+def _verify_job(full: bool):
+    try:
+        verify_incremental(full)
+    finally:
+        _verify_lock.release()
+
+def verify_in_background(full: bool = False) -> bool:
+    # Hashing can take minutes on a large tree; the admin page polls last_run instead.
+    # False when a verification is already running in this process.
+    if not _verify_lock.acquire(blocking=False):
+        return False
+    try:
+        spawn_job('audio_verify', _verify_job, full)
+    except BaseException:
+        _verify_lock.release()
+        raise
+    return True
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from database.queries import (
+    get_unsharded_recordings, get_recordings_missing_size, get_recordings_to_transcode, update_recording_storage,
+    record_transcode_failure, get_recordings_over_quota, delete_recordings, delete_audio_assets
+)
+from storage.audio_index import index_file, full_audio_path
+
+data_dir = os.path.join(backend_root, 'database', 'data')
+recordings_dir = os.path.join(data_dir, 'recordings')
+
+TRANSCODE_AFTER_DAYS = int(os.getenv('RECORDING_TRANSCODE_AFTER_DAYS', '30'))
+OPUS_BITRATE = os.getenv('RECORDING_OPUS_BITRATE', '24k')
+# ffmpeg failures before a recording is left in the 'failed' tier and no longer retried
+TRANSCODE_MAX_ATTEMPTS = int(os.getenv('RECORDING_TRANSCODE_MAX_ATTEMPTS', '3'))
+USER_QUOTA_BYTES = int(float(os.getenv('RECORDING_USER_QUOTA_MB', '500')) * 1024 * 1024)
+GLOBAL_QUOTA_BYTES = int(float(os.getenv('RECORDING_GLOBAL_QUOTA_MB', '20000')) * 1024 * 1024)
+LIFECYCLE_INTERVAL = int(os.getenv('RECORDING_LIFECYCLE_INTERVAL', str(6 * 3600)))
+BATCH_SIZE = 200
+
+def shard_relative_path(filename: str) -> str:
+    # Two levels of 256 buckets keep each directory small enough to list quickly
+    h = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return f"recordings/{h[:2]}/{h[2:4]}/{filename}"
+
+def new_recording_path(user_id: int, extension: str = '.webm'):
+    filename = f"{user_id}_{uuid.uuid4().hex}{extension}"
+    relative_path = shard_relative_path(filename)
+    full_path = full_audio_path(relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    return relative_path, full_path
+
+def remove_file(full_path: str) -> int:
+    try:
+        size = os.path.getsize(full_path)
+        os.remove(full_path)
+        return size
+    except OSError:
+        return 0
+
+def shard_existing() -> int:
+    moved = 0
+    while True:
+        rows = get_unsharded_recordings(BATCH_SIZE)
+        if not rows:
+            return moved
+        progressed = False
+        for row in rows:
+            old_rel = row['audio_path']
+            new_rel = shard_relative_path(os.path.basename(old_rel))
+            old_full = full_audio_path(old_rel)
+            new_full = full_audio_path(new_rel)
+            size = row['size_bytes']
+            if os.path.exists(old_full):
+                os.makedirs(os.path.dirname(new_full), exist_ok=True)
+                os.replace(old_full, new_full)
+                size = os.path.getsize(new_full)
+            if update_recording_storage(row['id'], new_rel, size):
+                progressed = True
+                moved += 1
+                delete_audio_assets([old_rel])
+                index_file(new_rel, 'recording')
+        if not progressed:
+            return moved
+
+def backfill_sizes() -> int:
+    # Rows saved before size_bytes existed would count as 0 against the quotas. A file that
+    # is gone is recorded as 0 so the row is not retried every run.
+    filled = 0
+    while True:
+        rows = get_recordings_missing_size(BATCH_SIZE)
+        if not rows:
+            return filled
+        progressed = False
+        for row in rows:
+            try:
+                size = os.path.getsize(full_audio_path(row['audio_path']))
+            except OSError:
+                size = 0
+            if update_recording_storage(row['id'], row['audio_path'], size):
+                progressed = True
+                filled += 1
+        if not progressed:
+            return filled
+
+def transcode_to_opus(src: str, dst: str) -> bool:
+    try:
+        subprocess.run(
+            ['ffmpeg', '-y', '-i', src, '-vn', '-ac', '1', '-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip', '-f', 'opus', dst],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return os.path.exists(dst)
+    except Exception:
+        return False
+
+def transcode_old(older_than: datetime) -> dict:
+    stats = {'transcoded': 0, 'missing': 0, 'failed': 0, 'bytes_reclaimed': 0}
+    if not shutil.which('ffmpeg'):
+        print("recording_lifecycle: ffmpeg not found, skipping transcode", flush=True)
+        return stats
+    # Rows that cannot be transcoded are moved to a terminal tier, so they stop taking the
+    # batch's slots ahead of everything recorded after them
+    for row in get_recordings_to_transcode(older_than, BATCH_SIZE):
+        old_rel = row['audio_path']
+        old_full = full_audio_path(old_rel)
+        if not os.path.exists(old_full):
+            update_recording_storage(row['id'], old_rel, 0, 'missing')
+            stats['missing'] += 1
+            continue
+        new_rel = os.path.splitext(old_rel)[0] + '.opus'
+        new_full = full_audio_path(new_rel)
+        tmp_full = new_full + '.part'
+        if not transcode_to_opus(old_full, tmp_full):
+            remove_file(tmp_full)
+            record_transcode_failure(row['id'], TRANSCODE_MAX_ATTEMPTS)
+            stats['failed'] += 1
+            continue
+        old_size = os.path.getsize(old_full)
+        new_size = os.path.getsize(tmp_full)
+        if new_size >= old_size:
+            # Already compact; keep the original and stop retrying it
+            remove_file(tmp_full)
+            update_recording_storage(row['id'], old_rel, old_size, 'opus')
+            continue
+        os.replace(tmp_full, new_full)
+        if update_recording_storage(row['id'], new_rel, new_size, 'opus'):
+            remove_file(old_full)
+            delete_audio_assets([old_rel])
+            index_file(new_rel, 'recording')
+            stats['transcoded'] += 1
+            stats['bytes_reclaimed'] += old_size - new_size
+        else:
+            remove_file(new_full)
+    return stats
+
+def enforce_quotas() -> dict:
+    stats = {'deleted': 0, 'bytes_reclaimed': 0}
+    rows = get_recordings_over_quota(USER_QUOTA_BYTES, GLOBAL_QUOTA_BYTES)
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i + BATCH_SIZE]
+        if delete_recordings([r['id'] for r in batch]) == 0:
+            continue
+        for r in batch:
+            stats['bytes_reclaimed'] += remove_file(full_audio_path(r['audio_path']))
+            stats['deleted'] += 1
+    return stats
+
+def run_lifecycle() -> dict:
+    started = time.time()
+    sharded = shard_existing()
+    backfilled = backfill_sizes()
+    transcode = transcode_old(datetime.now() - timedelta(days=TRANSCODE_AFTER_DAYS))
+    quota = enforce_quotas()
+    report = {
+        'sharded': sharded,
+        'sizes_backfilled': backfilled,
+        'transcoded': transcode['transcoded'],
+        'transcode_missing': transcode['missing'],
+        'transcode_failed': transcode['failed'],
+        'deleted': quota['deleted'],
+        'bytes_reclaimed': transcode['bytes_reclaimed'] + quota['bytes_reclaimed'],
+        'seconds': round(time.time() - started, 2),
+    }
+    print(f"recording_lifecycle: {report}", flush=True)
+    return report
+
+def start_lifecycle_thread(interval: int = LIFECYCLE_INTERVAL):
+    def loop():
+        while True:
+            try:
+                run_lifecycle()
+            except Exception as e:
+                print(f"recording_lifecycle_error: {e}", flush=True)
+            time.sleep(interval)
+    t = threading.Thread(target=loop, name='recording-lifecycle', daemon=True)
+    t.start()
+    return t
+
+if __name__ == '__main__':
+    from database.connection import db_pool
+    if not db_pool.init_pool():
+        print("Failed to initialize database connection")
+        sys.exit(1)
+    report = run_lifecycle()
+    print(f"Sharded: {report['sharded']}")
+    print(f"Transcoded to Opus: {report['transcoded']}")
+    print(f"Deleted over quota: {report['deleted']}")
+    print(f"Disk reclaimed: {report['bytes_reclaimed']:,} bytes ({report['bytes_reclaimed'] / (1024 * 1024):.2f} MB)")
@@ -1,6 +1,8 @@
 import { getBase } from './utils.js';
 
 let adminAuth = { username: null, password: null };
+let usersCursor = null;
+let vocabCursor = null;
 
 const base = getBase();
 
@@ -16,6 +18,7 @@ function showAdminPanel() {
   document.getElementById('logoutBtn').style.display = 'block';
   loadUsers();
   loadVocab();
+  loadAudioStatus();
 }
 
 async function login() {
@@ -47,18 +50,20 @@ async function login() {
   }
 }
 
-async function loadUsers() {
+async function loadUsers(more = false) {
   try {
     const response = await fetch(base + '/admin/users', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(adminAuth)
+      body: JSON.stringify({ ...adminAuth, cursor: more ? usersCursor : null })
     });
     
     const result = await response.json();
     
     if (result.success) {
-      renderUsers(result.users || []);
+      usersCursor = result.next_cursor || null;
+      renderUsers(result.users || [], more);
+      document.getElementById('usersMoreBtn').style.display = usersCursor ? 'inline-block' : 'none';
     } else {
       console.error('Failed to load users:', result.error);
     }
@@ -67,9 +72,9 @@ async function loadUsers() {
   }
 }
 
-function renderUsers(users) {
+function renderUsers(users, append = false) {
   const tbody = document.getElementById('usersTableBody');
-  tbody.innerHTML = users.map(user => `
+  const html = users.map(user => `
     <tr>
       <td>${user.id}</td>
       <td>${escapeHtml(user.username)}</td>
@@ -82,6 +87,11 @@ function renderUsers(users) {
       </td>
     </tr>
   `).join('');
+  if (append) {
+    tbody.insertAdjacentHTML('beforeend', html);
+  } else {
+    tbody.innerHTML = html;
+  }
 }
 
 async function deleteUser(userId) {
@@ -168,18 +178,20 @@ async function addUser() {
   }
 }
 
-async function loadVocab() {
+async function loadVocab(more = false) {
   try {
     const response = await fetch(base + '/admin/vocab', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(adminAuth)
+      body: JSON.stringify({ ...adminAuth, cursor: more ? vocabCursor : null })
     });
     
     const result = await response.json();
     
     if (result.success) {
-      renderVocab(result.vocab || []);
+      vocabCursor = result.next_cursor || null;
+      renderVocab(result.vocab || [], more);
+      document.getElementById('vocabMoreBtn').style.display = vocabCursor ? 'inline-block' : 'none';
     } else {
       console.error('Failed to load vocab:', result.error);
     }
@@ -188,9 +200,9 @@ async function loadVocab() {
   }
 }
 
-function renderVocab(vocab) {
+function renderVocab(vocab, append = false) {
   const tbody = document.getElementById('vocabTableBody');
-  tbody.innerHTML = vocab.map(item => `
+  const html = vocab.map(item => `
     <tr>
       <td>${escapeHtml(item.base || '')}</td>
       <td>${escapeHtml(item.pos || '')}</td>
@@ -212,6 +224,11 @@ function renderVocab(vocab) {
       </td>
     </tr>
   `).join('');
+  if (append) {
+    tbody.insertAdjacentHTML('beforeend', html);
+  } else {
+    tbody.innerHTML = html;
+  }
 }
 
 async function updateTranslation(wordBase, pos, targetLang, translation) {
@@ -266,6 +283,59 @@ async function deleteVocab(wordBase, pos) {
   }
 }
 
+let audioPollTimer = null;
+
+async function loadAudioStatus(verify = false) {
+  try {
+    const response = await fetch(base + '/admin/audio', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...adminAuth, verify })
+    });
+    
+    const result = await response.json();
+    
+    if (result.success) {
+      renderAudioStatus(result);
+      // Verification runs in the background on the server; poll until it finishes
+      clearTimeout(audioPollTimer);
+      if (result.verify_running) {
+        audioPollTimer = setTimeout(() => loadAudioStatus(false), 3000);
+      }
+    } else {
+      console.error('Failed to load audio status:', result.error);
+    }
+  } catch (e) {
+    console.error('Error loading audio status:', e);
+  }
+}
+
+function renderAudioStatus(result) {
+  const run = result.last_run;
+  let summary = run
+    ? `Last verified ${run.finished_at}: ${run.missing_total} missing, ${run.orphaned_total} orphaned`
+    : 'Audio index has not been built yet';
+  if (result.verify_running) {
+    summary += ' (verification in progress...)';
+  }
+  document.getElementById('audioSummary').textContent = summary;
+  const rows = [
+    ...(result.missing || []).map(item => ({ ...item, status: 'missing' })),
+    ...(result.orphaned || []).map(item => ({ ...item, status: 'orphaned' }))
+  ];
+  document.getElementById('audioTableBody').innerHTML = rows.map(item => `
+    <tr>
+      <td>${escapeHtml(item.path || '')}</td>
+      <td>${escapeHtml(item.kind || '')}</td>
+      <td>${item.status}</td>
+    </tr>
+  `).join('');
+}
+
+function verifyAudio() {
+  loadAudioStatus(true);
+}
+
 function escapeHtml(text) {
   const div = document.createElement('div');
   div.textContent = text;
@@ -273,11 +343,14 @@ function escapeHtml(text) {
 }
 
 window.deleteUser = deleteUser;
+window.loadUsers = loadUsers;
+window.loadVocab = loadVocab;
 window.deleteVocab = deleteVocab;
 window.updateTranslation = updateTranslation;
 window.showAddUserForm = showAddUserForm;
 window.hideAddUserForm = hideAddUserForm;
 window.addUser = addUser;
+window.verifyAudio = verifyAudio;
 
 document.getElementById('loginBtn').addEventListener('click', login);
 document.getElementById('adminPassword').addEventListener('keypress', (e) => {
@@ -146,6 +146,11 @@ function setDocStatus(text) {
 
 async function processDocument(arg) {
   const translated = await translate(arg.text, arg.source, arg.target);
+  if (translated && translated.retryAfter) {
+    const error = new Error(translated.error === 'quota_exceeded' ? 'doc.quota_exceeded' : 'doc.rate_limited');
+    error.retryAfter = translated.retryAfter;
+    throw error;
+  }
   const output = translated && translated.text ? translated.text.trim() : '';
   if (!output) {
     throw new Error('doc.status_error');
@@ -269,6 +274,12 @@ function resolveErrorMessage(error) {
   if (error.message === 'doc.status_error') {
     return t('doc.status_error');
   }
+  if (error.message === 'doc.rate_limited') {
+    return t('doc.rate_limited', { seconds: error.retryAfter });
+  }
+  if (error.message === 'doc.quota_exceeded') {
+    return t('doc.quota_exceeded');
+  }
   if (error.message === 'doc.status_success') {
     return t('doc.status_success');
   }
@@ -425,6 +425,13 @@ async function translateMessageAt(arg) {
   
   // Translate with OpenAI API
   const r = await translate(m.text, s, t);
+  if (r && r.retryAfter) {
+    showTranslationLimit(r);
+    if (r.error === 'rate_limited' && (arg.attempt || 0) < 3) {
+      setTimeout(() => translateMessageAt({ ...arg, attempt: (arg.attempt || 0) + 1 }), r.retryAfter * 1000);
+    }
+    return;
+  }
   const txt = r && r.text ? r.text : '';
   
   chat = insertOrReplaceTranslation({ chat, sourceIndex: i, role: m.role, text: txt });
@@ -443,6 +450,13 @@ async function translateMessageAt(arg) {
   }
 }
 
+function showTranslationLimit(r) {
+  if (!currentElements?.statusEl) return;
+  currentElements.statusEl.textContent = r.error === 'quota_exceeded'
+    ? 'Daily translation limit reached'
+    : `Translation paused: too many requests, retrying in ${r.retryAfter}s`;
+}
+
 function insertOrReplaceTranslation(arg) {
   const list = arg.chat || [];
   const i = arg.sourceIndex;
@@ -486,11 +500,20 @@ async function playTranslationAudio(text, lang) {
   
   const base = getBase();
   try {
+    const token = getAuthToken();
     const response = await fetch(base + '/tts', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': token ? ('Bearer ' + token) : ''
+      },
       body: JSON.stringify({ text: text.trim(), lang })
     });
+    if (response.status === 429) {
+      // Spoken translation is optional; the text translation is already on screen
+      console.warn('TTS rate limited, retry after', response.headers.get('Retry-After'), 's');
+      return;
+    }
     
     const result = await response.json();
     if (result.success && result.audio) {
@@ -504,20 +527,42 @@ async function playTranslationAudio(text, lang) {
   }
 }
 
+// Reverse proxies commonly cap a request header at 8 KiB
+const MAX_TRANSCRIPT_HEADER = 6 * 1024;
+
+function blobToBase64(blob) {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onloadend = () => resolve(reader.result.split(',')[1]);
+    reader.onerror = reject;
+    reader.readAsDataURL(blob);
+  });
+}
+
 async function saveRecording() {
   if (recordedChunks.length === 0) return;
   
   const blob = new Blob(recordedChunks, { type: 'audio/webm' });
-  const reader = new FileReader();
+  recordedChunks = [];
+  const token = getAuthToken();
+  const base = getBase();
+  const transcript = getFinalTranscript();
+  const lang = activeMode === 'speak' ? (nativeLang || 'en') : 'ko';
+  // Metadata travels in headers, not the URL, so transcripts stay out of access logs
+  const encodedTranscript = transcript ? encodeURIComponent(transcript) : '';
   
-  reader.onloadend = async () => {
-    const base64 = reader.result.split(',')[1];
-    const token = getAuthToken();
-    const base = getBase();
-    const transcript = getFinalTranscript();
-    const lang = activeMode === 'speak' ? (nativeLang || 'en') : 'ko';
-    
-    try {
+  try {
+    if (encodedTranscript.length <= MAX_TRANSCRIPT_HEADER) {
+      const headers = {
+        'Content-Type': 'audio/webm',
+        'Authorization': token ? ('Bearer ' + token) : '',
+        'X-Recording-Role': activeMode || 'speak'
+      };
+      if (lang) headers['X-Recording-Language'] = lang;
+      if (encodedTranscript) headers['X-Recording-Transcript'] = encodedTranscript;
+      await fetch(base + '/recording/save', { method: 'POST', headers, body: blob });
+    } else {
+      // Too long for a header: send everything as JSON in the body instead
       await fetch(base + '/recording/save', {
         method: 'POST',
         headers: {
@@ -525,18 +570,15 @@ async function saveRecording() {
           'Authorization': token ? ('Bearer ' + token) : ''
         },
         body: JSON.stringify({
-          audio: base64,
+          audio: await blobToBase64(blob),
           role: activeMode || 'speak',
-          transcript: transcript || null,
+          transcript,
           language: lang || null
         })
       });
-      console.log('Recording saved to database');
-    } catch (e) {
-      console.error('Error saving recording:', e);
     }
-  };
-  
-  reader.readAsDataURL(blob);
-  recordedChunks = [];
+    console.log('Recording saved to database');
+  } catch (e) {
+    console.error('Error saving recording:', e);
+  }
 }
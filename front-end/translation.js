@@ -1,13 +1,23 @@
 import { getBase } from './utils.js';
+import { getAuthToken } from './auth.js';
 
 async function translateBackend(p) {
   const base = getBase();
+  const token = getAuthToken();
   const r = await fetch(base + '/translate', {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': token ? ('Bearer ' + token) : ''
+    },
     body: JSON.stringify({ text: p.text, source: p.source, target: p.target })
   });
-  const j = await r.json();
+  const j = await r.json().catch(() => null);
+  if (r.status === 429) {
+    // rate_limited clears within seconds; quota_exceeded lasts until the daily reset
+    const retryAfter = Number(r.headers.get('Retry-After')) || (j && j.retry_after) || 1;
+    return { text: '', status: `HTTP ${r.status}`, error: (j && j.error) || 'rate_limited', retryAfter };
+  }
   return { text: j && j.text ? j.text : '', status: `HTTP ${r.status}` };
 }
 
@@ -47,6 +47,8 @@ const translations = {
     'doc.status_processing': 'Processing document...',
     'doc.status_success': 'Translation and cards ready',
     'doc.status_error': 'Translation failed. Try again.',
+    'doc.rate_limited': 'Too many requests. Try again in {seconds}s.',
+    'doc.quota_exceeded': 'Daily translation limit reached. Try again tomorrow.',
     'doc.translation_title': 'Translation',
     'doc.cards_title': 'Word Cards',
     'doc.no_words': 'No words detected yet',
@@ -102,6 +104,8 @@ const translations = {
     'doc.status_processing': 'Документ обрабатывается...',
     'doc.status_success': 'Перевод и карточки готовы',
     'doc.status_error': 'Не удалось перевести. Попробуйте снова.',
+    'doc.rate_limited': 'Слишком много запросов. Повторите через {seconds} с.',
+    'doc.quota_exceeded': 'Дневной лимит переводов исчерпан. Попробуйте завтра.',
     'doc.translation_title': 'Перевод',
     'doc.cards_title': 'Карточки слов',
     'doc.no_words': 'Слова не найдены',
@@ -157,6 +161,8 @@ const translations = {
     'doc.status_processing': '正在处理文档...',
     'doc.status_success': '译文与卡片已完成',
     'doc.status_error': '翻译失败，请重试。',
+    'doc.rate_limited': '请求过多，请在 {seconds} 秒后重试。',
+    'doc.quota_exceeded': '已达到今日翻译上限，请明天再试。',
     'doc.translation_title': '译文',
     'doc.cards_title': '单词卡片',
     'doc.no_words': '未检测到单词',
@@ -212,6 +218,8 @@ const translations = {
     'doc.status_processing': 'Đang xử lý tài liệu...',
     'doc.status_success': 'Bản dịch và thẻ đã sẵn sàng',
     'doc.status_error': 'Dịch thất bại. Thử lại.',
+    'doc.rate_limited': 'Quá nhiều yêu cầu. Thử lại sau {seconds} giây.',
+    'doc.quota_exceeded': 'Đã đạt giới hạn dịch trong ngày. Hãy thử lại vào ngày mai.',
     'doc.translation_title': 'Bản dịch',
     'doc.cards_title': 'Thẻ từ vựng',
     'doc.no_words': 'Không tìm thấy từ nào',
@@ -1,3 +1,5 @@
+import { getAuthToken } from './auth.js';
+
 
 export function getBase() {
   const protocol = location.protocol;
@@ -39,11 +41,19 @@ export function parseCSV(x) {
 }
 
 export async function speakText(text, lang = 'ko') {
+  const token = getAuthToken();
   const response = await fetch(`${getBase()}/tts`, {
     method: 'POST',
-    headers: {'Content-Type': 'application/json'},
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': token ? ('Bearer ' + token) : ''
+    },
     body: JSON.stringify({text, lang})
   });
+  if (response.status === 429) {
+    console.warn('TTS rate limited, retry after', response.headers.get('Retry-After'), 's');
+    return false;
+  }
   const result = await response.json();
   if (result.success && result.audio) {
     const audio = new Audio(`data:audio/mp3;base64,${result.audio}`);